@@ -0,0 +1,109 @@
+"""
+Benchmark cases
+
+Each case is set up once with realistic inputs and returns the function
+that is timed. Inputs are built outside the timed function so only the
+hot path is measured.
+
+    @case("vote_period")
+    def bench_vote_period():
+        return lambda: get_vote_period(5, 3741329)
+"""
+from decimal import Decimal
+
+import simplejson as json
+
+from oracle_voter.chain.core import Transaction
+from oracle_voter.chain.mocks.fixture_utils import (
+    mock_block_data,
+    mock_query_tx,
+)
+from oracle_voter.feeds.coinone import Coinone
+from oracle_voter.feeds.fixtures_coinone import get_orderbook_200
+from oracle_voter.markets.fixed import FixedPx
+from oracle_voter.markets.pricing import calc_microprice
+from oracle_voter.oracle.utils import get_vote_period
+
+DENOMS = ("ukrw", "umnt", "usdr", "uusd")
+FEEDER = "terra1kk2gcmy6d444jpsg3hyf84lxd3dx0naud0236f"
+VALIDATOR = "terravaloper1rhrptnx87ufpv62c7ngt9yqlz2hr77xr9nkcr9"
+
+# Name to setup function, in the order they run
+cases = dict()
+
+
+def case(name):
+    def register(setup):
+        cases[name] = setup
+        return setup
+    return register
+
+
+def coinone_orderbook():
+    # Recorded Coinone LUNA/KRW book, 150 asks and 55 bids
+    return get_orderbook_200()
+
+
+@case("prevote_hash")
+def bench_prevote_hash():
+    from oracle_voter.oracle.machine2 import Oracle
+    oracle = Oracle(vote_period=5, validator_addr=VALIDATOR)
+    px = FixedPx.from_decimal(Decimal("300.396"))
+    return lambda: oracle.get_prevote_hash("ukrw", px)
+
+
+@case("microprice")
+def bench_microprice():
+    _, orderbook = Coinone("").postpro_orders(coinone_orderbook())
+    return lambda: calc_microprice(orderbook)
+
+
+@case("coinone_postpro_orders")
+def bench_coinone_postpro_orders():
+    coinone = Coinone("")
+    http_res = coinone_orderbook()
+    return lambda: coinone.postpro_orders(http_res)
+
+
+@case("coinone_postpro_book")
+def bench_coinone_postpro_book():
+    coinone = Coinone("")
+    http_res = coinone_orderbook()
+    return lambda: coinone.postpro_book(http_res)
+
+
+@case("tx_build_json")
+def bench_tx_build_json():
+    def build():
+        tx = Transaction("soju-0013", 52, 77)
+        for denom in DENOMS:
+            tx.append_prevotemsg(
+                hashed="0d811a7ab9c3aae3db68fb3e902b89eb4749159c",
+                denom=denom,
+                feeder=FEEDER,
+                validator=VALIDATOR,
+            )
+        signed_tx = tx.build()
+        return json.dumps({"tx": signed_tx["value"], "mode": "sync"})
+    return build
+
+
+@case("vote_period")
+def bench_vote_period():
+    return lambda: get_vote_period(5, 3741329)
+
+
+@case("decode_block")
+def bench_decode_block():
+    raw = json.dumps(mock_block_data(
+        3741329,
+        f"{3741329:064X}",
+        f"{3741328:064X}",
+    ))
+    return lambda: json.loads(raw)
+
+
+@case("decode_tx")
+def bench_decode_tx():
+    raw = json.dumps(mock_query_tx(3741329, f"{3741329:064X}"))
+    return lambda: json.loads(raw)
@@ -0,0 +1,53 @@
+"""
+Stand-in exchange
+
+A single ticker at EXCHANGE quoting the denoms the voter prices, for
+the vote period benchmark and the simulated chain. Serve `quotes` at
+EXCHANGE through a client.MemoryTransport and give replay_rates() to
+the Oracle in place of supported_rates. LCD is the node address the
+Oracle is pointed at.
+"""
+from decimal import Decimal
+
+from oracle_voter.common.client import http_get
+
+LCD = "http://127.0.0.1:1317"
+EXCHANGE = "https://exchange.test/ticker"
+
+# Quoted by the exchange, derivatives as swap rates from krw
+quotes = {
+    "krw": "300.396",
+    "mnt": "2.25757",
+    "usd": "0.000839376",
+    "xdr": "0.000609423",
+}
+
+
+async def fetch_ticker(target):
+    res = await http_get(EXCHANGE, {"target": target})
+    return Decimal(res["price"])
+
+
+def make_feed(target):
+    async def feed():
+        return await fetch_ticker(target)
+    return feed
+
+
+def replay_rates():
+    def rate(denom, pair_type, target):
+        return {
+            "denom": denom,
+            "pair_type": pair_type,
+            "markets": [{
+                "exchange": "exchange.test",
+                "feed": make_feed(target),
+                "weight": 100,
+            }],
+        }
+    return [
+        rate("ukrw", "native", "krw"),
+        rate("umnt", "derivative", "mnt"),
+        rate("uusd", "derivative", "usd"),
+        rate("usdr", "derivative", "xdr"),
+    ]
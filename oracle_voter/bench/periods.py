@@ -0,0 +1,319 @@
+"""
+Vote period benchmark
+
+Drives an unmodified Oracle through whole vote periods against a
+SimNode in process, with the LCD, the exchange and signing each taking a
+latency drawn from its own distribution. Blocks come every block_time,
+the Oracle polls for them as the voter does, and everything runs on a
+virtual clock so a hundred periods take seconds. For every period the
+time from its first block to the vote and to the prevote broadcast is
+kept, and reported as p50/p95/p99.
+
+    oracle_voter bench periods --periods 100 --feed-latency lognormal:0.2:0.8
+
+Latencies are given as const:SECONDS, uniform:LOW:HIGH, exp:MEAN or
+lognormal:MEDIAN:SIGMA. Variants of the Oracle, e.g. another order of
+stages, are compared by passing their class as oracle_class.
+"""
+import argparse
+import asyncio
+import contextlib
+import math
+import os
+import random
+import time
+
+import simplejson as json
+
+from oracle_voter.bench.exchange import EXCHANGE, LCD, quotes, replay_rates
+from oracle_voter.chain.core import LCDNode
+from oracle_voter.chain.simnode import PREVOTE_MSG, SimNode
+from oracle_voter.common import client
+from oracle_voter.common.client import MemoryTransport
+from oracle_voter.wallet.replay import ReplayWallet
+
+FEEDER = "terra1kk2gcmy6d444jpsg3hyf84lxd3dx0naud0236f"
+VALIDATOR = "terravaloper1rhrptnx87ufpv62c7ngt9yqlz2hr77xr9nkcr9"
+
+# Runs start at the first block of the vote period of this height
+FIRST_HEIGHT = 3741330
+
+
+class Latency:
+
+    kinds = {
+        "const": 1,
+        "uniform": 2,
+        "exp": 1,
+        "lognormal": 2,
+    }
+
+    def __init__(self, kind, *args):
+        if kind not in self.kinds or len(args) != self.kinds[kind]:
+            raise ValueError(f"Unknown latency {kind}:{args}")
+        self.kind = kind
+        self.args = args
+
+    @classmethod
+    def parse(cls, spec):
+        kind, *args = spec.split(":")
+        try:
+            return cls(kind, *[float(arg) for arg in args])
+        except ValueError:
+            raise ValueError(
+                f"Latency {spec} is not const:S, uniform:LOW:HIGH, "
+                "exp:MEAN or lognormal:MEDIAN:SIGMA"
+            )
+
+    def sample(self, rng):
+        if self.kind == "const":
+            return self.args[0]
+        if self.kind == "uniform":
+            return rng.uniform(*self.args)
+        if self.kind == "exp":
+            return rng.expovariate(1.0 / self.args[0])
+        median, sigma = self.args
+        return rng.lognormvariate(math.log(median), sigma)
+
+    def __str__(self):
+        return ":".join([self.kind] + [f"{arg:g}" for arg in self.args])
+
+
+class LatencyWallet(ReplayWallet):
+    """ReplayWallet whose signing blocks the loop as terracli does"""
+
+    def __init__(self, account_addr, latency, rng):
+        super().__init__(account_addr)
+        self.latency = latency
+        self.random = rng
+
+    def offline_sign(self, payload, *args, **kwargs):
+        delay = self.latency.sample(self.random)
+        clock = getattr(asyncio.get_event_loop(), "clock", None)
+        if clock is not None:
+            clock.advance(delay)
+        else:
+            time.sleep(delay)
+        return super().offline_sign(payload, *args, **kwargs)
+
+
+def percentile(values, pct):
+    # Linear interpolation between the closest ranks
+    ordered = sorted(values)
+    if len(ordered) == 0:
+        return None
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(values):
+    return {
+        "n": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if len(values) > 0 else None,
+    }
+
+
+class PeriodBench:
+
+    def __init__(
+        self,
+        periods=20,
+        vote_period=5,
+        block_time=6.0,
+        jitter=0.5,
+        lcd_latency="lognormal:0.02:0.5",
+        feed_latency="lognormal:0.15:0.8",
+        sign_latency="const:0.25",
+        seed=1,
+        oracle_class=None,
+    ):
+        from oracle_voter.oracle.index import DenomIndex
+        if oracle_class is None:
+            from oracle_voter.oracle.machine2 import Oracle
+            oracle_class = Oracle
+        self.periods = periods
+        self.random = random.Random(seed)
+        self.lcd_latency = Latency.parse(lcd_latency)
+        self.feed_latency = Latency.parse(feed_latency)
+        self.node = SimNode(
+            vote_period=vote_period,
+            block_time=block_time,
+            jitter=jitter,
+            height=FIRST_HEIGHT - FIRST_HEIGHT % vote_period,
+            seed=seed,
+        )
+        self.wallet = LatencyWallet(
+            FEEDER,
+            Latency.parse(sign_latency),
+            self.random,
+        )
+        self.oracle = oracle_class(
+            vote_period=vote_period,
+            lcd_node=LCDNode(addr=LCD),
+            validator_addr=VALIDATOR,
+            wallet=self.wallet,
+            chain_id=self.node.chain_id,
+        )
+        # Feeds answered by handle_exchange
+        self.oracle.denom_index = DenomIndex(replay_rates())
+        # Height to the virtual time its block was made
+        self.block_at = dict()
+        self.samples = {"vote": list(), "prevote": list()}
+
+    def now(self):
+        return asyncio.get_event_loop().time()
+
+    def period_start(self):
+        vote_period = self.node.vote_period
+        first = int(self.oracle.current_vote_period) * vote_period
+        return self.block_at.get(first, None)
+
+    async def handle_lcd(self, method, url, params, data):
+        if method == "POST":
+            start = self.period_start()
+            msgs = json.loads(data)["tx"]["msg"]
+            tx_type = "prevote" if msgs[0]["type"] == PREVOTE_MSG else "vote"
+            if start is not None:
+                self.samples[tx_type].append(self.now() - start)
+        await asyncio.sleep(self.lcd_latency.sample(self.random))
+        return await self.node.handle(method, url, params, data)
+
+    async def handle_exchange(self, method, url, params, data):
+        await asyncio.sleep(self.feed_latency.sample(self.random))
+        return 200, {"price": quotes[params["target"]]}
+
+    async def produce_blocks(self, last_height):
+        node = self.node
+        self.block_at[node.height] = self.now()
+        while node.height < last_height:
+            delay = node.block_time + node.random.uniform(
+                -node.jitter,
+                node.jitter,
+            )
+            await asyncio.sleep(max(delay, 0.0))
+            node.produce_block()
+            self.block_at[node.height] = self.now()
+
+    async def run(self):
+        from oracle_voter.main import track_height
+        client.mount(LCD, MemoryTransport(self.handle_lcd))
+        client.mount(EXCHANGE, MemoryTransport(self.handle_exchange))
+        # Last block of the last period
+        last_height = self.node.height + \
+            self.periods * self.node.vote_period - 1
+        tracker = asyncio.ensure_future(track_height(self.oracle))
+        try:
+            await self.produce_blocks(last_height)
+            # Time for the Oracle to see the last block
+            await asyncio.sleep(self.node.block_time)
+        finally:
+            tracker.cancel()
+            await asyncio.gather(tracker, return_exceptions=True)
+            client.unmount(LCD)
+            client.unmount(EXCHANGE)
+        return self.report()
+
+    def report(self):
+        failed = [
+            result["raw_log"] for result in self.node.txs.values()
+            if result["code"] != 0
+        ]
+        return {
+            "periods": self.periods,
+            "lcd_latency": str(self.lcd_latency),
+            "feed_latency": str(self.feed_latency),
+            "sign_latency": str(self.wallet.latency),
+            "vote": summarize(self.samples["vote"]),
+            "prevote": summarize(self.samples["prevote"]),
+            # Broadcast after the period would have ended
+            "late_prevotes": len([
+                elapsed for elapsed in self.samples["prevote"]
+                if elapsed > self.node.vote_period * self.node.block_time
+            ]),
+            "txs": len(self.node.txs),
+            "failed_txs": len(failed),
+            "failed_logs": failed[0:5],
+        }
+
+
+def format_seconds(seconds):
+    return "-" if seconds is None else f"{seconds:.3f}s"
+
+
+def format_report(report):
+    lines = [
+        f"{report['periods']} periods, lcd {report['lcd_latency']}, "
+        f"feeds {report['feed_latency']}, sign {report['sign_latency']}",
+    ]
+    for tx_type in ("vote", "prevote"):
+        row = report[tx_type]
+        lines.append(
+            f"{tx_type:<8} n={row['n']:<4} "
+            f"p50 {format_seconds(row['p50'])} "
+            f"p95 {format_seconds(row['p95'])} "
+            f"p99 {format_seconds(row['p99'])} "
+            f"max {format_seconds(row['max'])}"
+        )
+    lines.append(
+        f"{report['txs']} txs, {report['failed_txs']} failed, "
+        f"{report['late_prevotes']} prevotes late"
+    )
+    for log in report["failed_logs"]:
+        lines.append(f"-- {log}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    from oracle_voter.common.virtualclock import run_virtual
+    parser = argparse.ArgumentParser(
+        prog="oracle_voter bench periods",
+        description="Time to vote and prevote over whole vote periods",
+    )
+    parser.add_argument("--periods", type=int, default=20)
+    parser.add_argument("--vote-period", type=int, default=5)
+    parser.add_argument("--block-time", type=float, default=6.0)
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--lcd-latency", default="lognormal:0.02:0.5")
+    parser.add_argument("--feed-latency", default="lognormal:0.15:0.8")
+    parser.add_argument("--sign-latency", default="const:0.25")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--report", default=None, help="JSON report file")
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show the Oracle's output",
+    )
+    args = parser.parse_args(argv)
+    try:
+        bench = PeriodBench(
+            periods=args.periods,
+            vote_period=args.vote_period,
+            block_time=args.block_time,
+            jitter=args.jitter,
+            lcd_latency=args.lcd_latency,
+            feed_latency=args.feed_latency,
+            sign_latency=args.sign_latency,
+            seed=args.seed,
+        )
+    except ValueError as err:
+        parser.error(str(err))
+
+    started = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        output = contextlib.nullcontext() if args.verbose else \
+            contextlib.redirect_stdout(devnull)
+        with output:
+            report = run_virtual(bench.run())
+    report["wall_seconds"] = time.perf_counter() - started
+
+    print(format_report(report))
+    print(f"{report['wall_seconds']:.2f}s wall")
+    if args.report is not None:
+        with open(args.report, "w") as out:
+            out.write(json.dumps(report, indent=2))
+    return 0
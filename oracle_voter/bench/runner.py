@@ -0,0 +1,182 @@
+"""
+Benchmark runner
+
+Times the cases in bench.cases with timeit, each for `repeat` rounds of
+at least min_time seconds, and reports the median and best time per call.
+Results can be saved as a JSON baseline
+
+    {"created": 1579497600.0, "python": "3.7.5", "machine": "x86_64",
+     "results": {"prevote_hash": {"median_ns": 2710.4, "min_ns": 2650.1,
+                                  "number": 20000, "repeat": 5}}}
+
+and later runs compared against it, a case whose median grew by more
+than the threshold is reported as a regression.
+
+    oracle_voter bench --save baseline.json
+    oracle_voter bench --compare baseline.json --threshold 0.3
+"""
+import argparse
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+import simplejson as json
+
+from oracle_voter.bench.cases import cases
+
+
+def calibrate(timer, min_time):
+    # Calls per round so a round takes at least min_time
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time:
+            return number
+        number *= 2
+
+
+def run_case(func, repeat=5, min_time=0.05):
+    timer = timeit.Timer(func)
+    number = calibrate(timer, min_time)
+    rounds = [
+        duration / number * 1e9
+        for duration in timer.repeat(repeat=repeat, number=number)
+    ]
+    return {
+        "median_ns": statistics.median(rounds),
+        "min_ns": min(rounds),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(names=None, repeat=5, min_time=0.05, out=sys.stdout):
+    results = dict()
+    for name, setup in cases.items():
+        if names and not any(part in name for part in names):
+            continue
+        results[name] = run_case(setup(), repeat, min_time)
+        print(format_result(name, results[name]), file=out)
+    return {
+        "created": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def format_ns(ns):
+    if ns >= 1e6:
+        return f"{ns / 1e6:.2f}ms"
+    if ns >= 1e3:
+        return f"{ns / 1e3:.2f}us"
+    return f"{ns:.0f}ns"
+
+
+def format_result(name, result):
+    return (
+        f"{name:<24} {format_ns(result['median_ns']):>10} "
+        f"(min {format_ns(result['min_ns'])}, "
+        f"{result['number']} x {result['repeat']})"
+    )
+
+
+def compare(baseline, current, threshold=0.2):
+    # Rows of (name, baseline ns, current ns, change, status)
+    rows = list()
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name, None)
+        if before is None:
+            rows.append((name, None, result["median_ns"], None, "new"))
+            continue
+        change = result["median_ns"] / before["median_ns"] - 1.0
+        status = "ok"
+        if change > threshold:
+            status = "REGRESSION"
+        elif change < -threshold:
+            status = "faster"
+        rows.append((
+            name,
+            before["median_ns"],
+            result["median_ns"],
+            change,
+            status,
+        ))
+    return rows
+
+
+def format_comparison(rows):
+    lines = [f"{'case':<24} {'baseline':>10} {'current':>10} {'change':>8}"]
+    for name, before, after, change, status in rows:
+        lines.append(
+            f"{name:<24} "
+            f"{'-' if before is None else format_ns(before):>10} "
+            f"{format_ns(after):>10} "
+            f"{'-' if change is None else f'{change:+.1%}':>8} {status}"
+        )
+    return "\n".join(lines)
+
+
+def load_baseline(path):
+    with open(path) as source:
+        return json.load(source)
+
+
+def save_baseline(path, current):
+    with open(path, "w") as out:
+        out.write(json.dumps(current, indent=2, sort_keys=True))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[0:1] == ["periods"]:
+        from oracle_voter.bench.periods import main as periods_main
+        return periods_main(argv[1:])
+    parser = argparse.ArgumentParser(
+        prog="oracle_voter bench",
+        description="Microbenchmarks of the voter's hot paths",
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help="only run cases whose name contains one of these",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.05,
+        help="seconds per round",
+    )
+    parser.add_argument("--save", metavar="baseline.json", default=None)
+    parser.add_argument("--compare", metavar="baseline.json", default=None)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="median growth reported as a regression",
+    )
+    parser.add_argument(
+        "--list",
+        action="store_true",
+        help="list the cases",
+    )
+    args = parser.parse_args(argv)
+    if args.list:
+        print("\n".join(cases))
+        return 0
+
+    current = run(args.names, args.repeat, args.min_time)
+    if args.save is not None:
+        save_baseline(args.save, current)
+    if args.compare is None:
+        return 0
+    rows = compare(load_baseline(args.compare), current, args.threshold)
+    print()
+    print(format_comparison(rows))
+    regressions = [row[0] for row in rows if row[4] == "REGRESSION"]
+    if len(regressions) > 0:
+        print(f"{len(regressions)} regressed: {', '.join(regressions)}")
+        return 1
+    return 0
@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from oracle_voter.bench.exchange import EXCHANGE, LCD
+from oracle_voter.bench.periods import Latency, PeriodBench, percentile
+from oracle_voter.common import client
+from oracle_voter.common.virtualclock import run_virtual
+
+
+def test_latency():
+    rng = random.Random(1)
+    assert Latency.parse("const:0.25").sample(rng) == 0.25
+    assert 0.1 <= Latency.parse("uniform:0.1:0.2").sample(rng) <= 0.2
+    samples = sorted(
+        Latency.parse("lognormal:0.2:0.5").sample(rng) for _ in range(999)
+    )
+    assert 0.18 < samples[499] < 0.22
+    assert str(Latency.parse("exp:0.5")) == "exp:0.5"
+    for spec in ("const", "normal:1:2", "uniform:a:b"):
+        with pytest.raises(ValueError):
+            Latency.parse(spec)
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 101)]
+    assert percentile(values, 50) == 50.5
+    assert percentile(values, 99) == pytest.approx(99.01)
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_periods():
+    bench = PeriodBench(
+        periods=4,
+        jitter=0.0,
+        lcd_latency="const:0.01",
+        feed_latency="const:0.2",
+        sign_latency="const:0.25",
+    )
+    report = run_virtual(bench.run())
+    assert LCD not in client.transports
+    assert EXCHANGE not in client.transports
+    assert report["prevote"]["n"] == 4
+    # Nothing to reveal in the first period
+    assert report["vote"]["n"] == 3
+    assert report["failed_txs"] == 0
+    assert report["late_prevotes"] == 0
+    # Found within a 0.5s poll, then lookups and signing
+    assert 0.26 < report["vote"]["p50"] < 0.8
+    # The reveal, the 0.3s pause, feeds and signing
+    assert report["prevote"]["p50"] > report["vote"]["p50"] + 0.75
+    assert report["prevote"]["p99"] < 2.0
+
+
+def test_slow_prevotes_miss_their_period():
+    bench = PeriodBench(
+        periods=3,
+        jitter=0.0,
+        feed_latency="const:16",
+    )
+    report = run_virtual(bench.run())
+    # Natives then derivatives, 32s of feeds in a 30s period
+    assert report["prevote"]["p50"] > 32.0
+    assert report["late_prevotes"] == report["prevote"]["n"]
@@ -0,0 +1,67 @@
+import io
+import os
+import tempfile
+
+import simplejson as json
+
+from oracle_voter.bench import runner
+from oracle_voter.bench.cases import cases
+
+
+def test_cases_run():
+    # Every case sets up and runs once
+    for name, setup in cases.items():
+        setup()()
+    assert "prevote_hash" in cases
+    assert "coinone_postpro_orders" in cases
+
+
+def test_run_selected_cases():
+    out = io.StringIO()
+    current = runner.run(["decode"], repeat=2, min_time=0.001, out=out)
+    assert sorted(current["results"]) == ["decode_block", "decode_tx"]
+    result = current["results"]["decode_tx"]
+    assert result["repeat"] == 2
+    assert 0 < result["min_ns"] <= result["median_ns"]
+    assert out.getvalue().startswith("decode_block")
+
+
+def test_compare():
+    baseline = {"results": {
+        "decode_block": {"median_ns": 1000.0},
+        "decode_tx": {"median_ns": 1000.0},
+        "vote_period": {"median_ns": 1000.0},
+    }}
+    current = {"results": {
+        "decode_block": {"median_ns": 1100.0},
+        "decode_tx": {"median_ns": 1500.0},
+        "vote_period": {"median_ns": 500.0},
+        "microprice": {"median_ns": 3000.0},
+    }}
+    rows = runner.compare(baseline, current, threshold=0.2)
+    status = {row[0]: row[4] for row in rows}
+    assert status == {
+        "decode_block": "ok",
+        "decode_tx": "REGRESSION",
+        "vote_period": "faster",
+        "microprice": "new",
+    }
+    report = runner.format_comparison(rows)
+    assert "+50.0% REGRESSION" in report
+
+
+def test_main_saves_and_compares():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "baseline.json")
+        args = ["vote_period", "--repeat", "1", "--min-time", "0.001"]
+        assert runner.main(args + ["--save", path]) == 0
+        with open(path) as source:
+            baseline = json.load(source)
+        assert list(baseline["results"]) == ["vote_period"]
+        assert runner.main(args + ["--compare", path, "--threshold", "100"]) \
+            == 0
+
+        baseline["results"]["vote_period"]["median_ns"] = 0.001
+        with open(path, "w") as out:
+            out.write(json.dumps(baseline))
+        assert runner.main(args + ["--compare", path]) == 1
@@ -1,9 +1,16 @@
 from decimal import Decimal
 from oracle_voter.common import client
 from oracle_voter.common.client import HttpError
+from oracle_voter.common.metrics import registry, timed
 
 EIGHTEEN_PLACES = Decimal(10) ** -18
 
+NODE_SECONDS = registry.histogram(
+    "node_request_seconds",
+    "Chain node call latency by endpoint",
+    ("endpoint",),
+)
+
 
 class Transaction:
 
@@ -121,9 +128,15 @@ class LCDNode:
     def __init__(
         self,
         addr="http://127.0.0.1:1317",
+        transport=None,
     ):
         self.addr = addr
+        # e.g. client.UnixTransport for an LCD on the same host
+        self.transport = transport
+        if transport is not None:
+            client.mount(addr, transport)
 
+    @timed(NODE_SECONDS, label="endpoint")
     async def get_tx(self, tx_hash):
         try:
             target_url = f"{self.addr}/txs/{tx_hash}"
@@ -136,6 +149,7 @@ class LCDNode:
         except HttpError:
             return None
 
+    @timed(NODE_SECONDS, label="endpoint")
     async def broadcast_tx_async(self, tx):
         try:
             target_url = f"{self.addr}/txs"
@@ -150,6 +164,7 @@ class LCDNode:
         except HttpError:
             return None
 
+    @timed(NODE_SECONDS, label="endpoint")
     async def get_latest_block(self):
         try:
             target_url = f"{self.addr}/blocks/latest"
@@ -160,6 +175,7 @@ class LCDNode:
         except HttpError:
             return None
 
+    @timed(NODE_SECONDS, label="endpoint")
     async def get_account(self, account):
         try:
             target_url = f"{self.addr}/auth/accounts/{account}"
@@ -169,6 +185,7 @@ class LCDNode:
         except HttpError:
             return None
 
+    @timed(NODE_SECONDS, label="endpoint")
     async def get_oracle_rates(self):
         try:
             target_url = f"{self.addr}/oracle/denoms/exchange_rates"
@@ -178,6 +195,7 @@ class LCDNode:
         except HttpError:
             return None
 
+    @timed(NODE_SECONDS, label="endpoint")
     async def get_oracle_active_denoms(self):
         try:
             target_url = f"{self.addr}/oracle/denoms/actives"
@@ -187,6 +205,7 @@ class LCDNode:
         except HttpError:
             return None
 
+    @timed(NODE_SECONDS, label="endpoint")
     async def get_oracle_prevotes_validator(
         self,
         denom="",
@@ -200,6 +219,7 @@ class LCDNode:
         except HttpError:
             return None
 
+    @timed(NODE_SECONDS, label="endpoint")
     async def get_oracle_votes_validator(
         self,
         denom="",
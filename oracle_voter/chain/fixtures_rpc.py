@@ -0,0 +1,110 @@
+import base64
+
+import simplejson as json
+from aiohttp import web
+
+from oracle_voter.chain.mocks.fixture_utils import (
+    mock_account_info,
+    mock_active_denoms,
+)
+
+
+def abci_response(height, value):
+    return {
+        "response": {
+            "code": 0,
+            "log": "",
+            "height": f"{height}",
+            "value": base64.b64encode(
+                bytes(json.dumps(value), "utf-8")
+            ).decode(),
+        },
+    }
+
+
+def rpc_block(height):
+    return {
+        "block_id": {"hash": "AA", "parts": {"total": "1", "hash": "xxx"}},
+        "block": {
+            "header": {"chain_id": "soju-0013", "height": f"{height}"},
+            "data": {"txs": None},
+        },
+    }
+
+
+def rpc_tx(tx_hash, height, log, code=0):
+    return {
+        "hash": tx_hash,
+        "height": f"{height}",
+        "index": 0,
+        "tx_result": {
+            "code": code,
+            "log": log,
+            "gas_wanted": "200000",
+            "gas_used": "95000",
+        },
+        "tx": "",
+    }
+
+
+class RPCStandIn:
+    """Tendermint JSON-RPC server answering from canned results"""
+
+    def __init__(self, height, feeder_addr):
+        self.height = height
+        self.feeder_addr = feeder_addr
+        self.requests = list()
+        self.app = web.Application()
+        self.app.router.add_post("/", self.handle)
+
+    def result(self, method, params):
+        if method == "block":
+            return rpc_block(self.height)
+        if method == "status":
+            return {"sync_info": {"latest_block_height": f"{self.height}"}}
+        if method == "tx":
+            tx_hash = base64.b64decode(params["hash"]).hex().upper()
+            if tx_hash.startswith("FF"):
+                return None
+            return rpc_tx(
+                tx_hash,
+                self.height - 1,
+                '[{"msg_index":0,"success":true,"log":""}]',
+            )
+        if method == "broadcast_tx_sync":
+            return {"code": 0, "log": "[]", "hash": "AB12"}
+        if method == "abci_query":
+            path = params["path"]
+            if path == "custom/acc/account":
+                data = json.loads(bytes.fromhex(params["data"]))
+                value = mock_account_info(
+                    data["Address"],
+                    "public_key",
+                    52,
+                    self.height,
+                    77,
+                )["result"]
+            elif path == "custom/oracle/activeDenoms":
+                value = mock_active_denoms(self.height)["result"]
+            else:
+                return {"response": {"code": 0, "height": "0"}}
+            return abci_response(self.height, value)
+        return None
+
+    async def handle(self, request):
+        calls = json.loads(await request.text())
+        self.requests.append(calls)
+        responses = list()
+        for call in calls:
+            result = self.result(call["method"], call["params"])
+            response = {"jsonrpc": "2.0", "id": call["id"]}
+            if result is None:
+                response["error"] = {
+                    "code": -32603,
+                    "message": "Internal error",
+                    "data": "not found",
+                }
+            else:
+                response["result"] = result
+            responses.append(response)
+        return web.Response(text=json.dumps(responses))
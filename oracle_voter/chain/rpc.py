@@ -0,0 +1,287 @@
+"""
+Tendermint RPC node
+
+Talks JSON-RPC straight to the Tendermint RPC server (port 26657) and
+returns the same shapes as LCDNode, so it can be given to the Oracle in
+its place. Calls made concurrently, e.g. the tx lookups and the latest
+block of one height, go out as a single JSON-RPC batch request, at the
+scheduler priority of its most urgent call.
+
+Module queries (accounts, oracle rates, prevotes) use abci_query on the
+custom query paths. Broadcasting a StdTx needs its amino encoding, which
+only the LCD server does, so broadcast_tx_async goes through an LCDNode
+when one is given; already encoded txs go to broadcast_tx_sync.
+"""
+import asyncio
+import base64
+
+import simplejson as json
+
+from oracle_voter.chain.core import NODE_SECONDS
+from oracle_voter.common import client, scheduler
+from oracle_voter.common.client import HttpError
+from oracle_voter.common.metrics import timed
+
+
+class RPCError(HttpError):
+    def __init__(self, method, error):
+        message = error.get("message", "")
+        super().__init__(
+            f"RPC {method}: {message} {error.get('data', '')}",
+            error.get("code", -1),
+            error,
+        )
+
+
+class RPCNode:
+
+    def __init__(
+        self,
+        addr="http://127.0.0.1:26657",
+        lcd_node=None,
+        batch_window=0.0,
+        transport=None,
+    ):
+        self.addr = addr
+        self.transport = transport
+        if transport is not None:
+            client.mount(addr, transport)
+        # Used to broadcast StdTx JSON
+        self.lcd_node = lcd_node
+        # Seconds to wait for more calls before sending a batch
+        self.batch_window = batch_window
+        self.next_id = 0
+        self.queue = list()
+        self.flush_handle = None
+
+    """
+    JSON-RPC
+    """
+
+    def call(self, method, params=None):
+        self.next_id += 1
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self.queue.append((
+            self.next_id,
+            method,
+            params or {},
+            future,
+            scheduler.current_priority.get(),
+        ))
+        if self.flush_handle is None:
+            self.flush_handle = loop.call_later(
+                self.batch_window,
+                lambda: asyncio.ensure_future(self.flush()),
+            )
+        return future
+
+    async def flush(self):
+        self.flush_handle = None
+        queued, self.queue = self.queue, list()
+        if len(queued) == 0:
+            return
+        payload = [{
+            "jsonrpc": "2.0",
+            "id": call_id,
+            "method": method,
+            "params": params,
+        } for call_id, method, params, _, _ in queued]
+        # Sent at the priority of its most urgent call, not of whichever
+        # call happened to start the batch
+        request_class = min(call[4] for call in queued)
+        try:
+            with scheduler.priority(request_class):
+                http_res = await client.http_post(
+                    self.addr,
+                    params={},
+                    post_data=json.dumps(payload),
+                )
+        except Exception as err:
+            for _, _, _, future, _ in queued:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        # Single responses are not wrapped in a list by every server
+        if isinstance(http_res, dict):
+            http_res = [http_res]
+        responses = {
+            response.get("id", None): response
+            for response in http_res or []
+        }
+        for call_id, method, _, future, _ in queued:
+            if future.done():
+                continue
+            response = responses.get(call_id, None)
+            if response is None:
+                future.set_exception(
+                    RPCError(method, {"message": "No response"})
+                )
+            elif response.get("error", None) is not None:
+                future.set_exception(RPCError(method, response["error"]))
+            else:
+                future.set_result(response.get("result", None))
+
+    async def batch(self, calls):
+        # Sends [(method, params)] as one request, results in order
+        futures = [self.call(method, params) for method, params in calls]
+        return await asyncio.gather(*futures, return_exceptions=True)
+
+    async def abci_query(self, path, data=None, default=None):
+        raw_data = b"" if data is None else bytes(json.dumps(data), "utf-8")
+        result = await self.call("abci_query", {
+            "path": path,
+            "data": raw_data.hex(),
+            "height": "0",
+            "prove": False,
+        })
+        response = result["response"]
+        if int(response.get("code", 0)) != 0:
+            raise RPCError("abci_query", {
+                "code": response["code"],
+                "message": path,
+                "data": response.get("log", ""),
+            })
+        value = response.get("value", None)
+        decoded = default
+        if value:
+            decoded = json.loads(base64.b64decode(value))
+        return {"height": response.get("height", "0"), "result": decoded}
+
+    """
+    LCDNode interface
+    """
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def get_status(self):
+        try:
+            return await self.call("status")
+        except HttpError:
+            return None
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def get_latest_block(self):
+        try:
+            result = await self.call("block")
+            return {
+                "block_meta": {
+                    "block_id": result["block_id"],
+                    "header": result["block"]["header"],
+                },
+                "block": result["block"],
+            }
+        except HttpError:
+            return None
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def get_tx(self, tx_hash):
+        try:
+            result = await self.call("tx", {
+                "hash": base64.b64encode(bytes.fromhex(tx_hash)).decode(),
+                "prove": False,
+            })
+        except HttpError:
+            return None
+        tx_result = result["tx_result"]
+        code = int(tx_result.get("code", 0))
+        raw_log = tx_result.get("log", "")
+        if code == 0:
+            try:
+                logs = json.loads(raw_log)
+            except json.JSONDecodeError:
+                logs = [{"msg_index": 0, "success": True, "log": raw_log}]
+        else:
+            logs = [{"msg_index": 0, "success": False, "log": raw_log}]
+        return {
+            "height": result["height"],
+            "txhash": tx_hash.upper(),
+            "code": code,
+            "raw_log": raw_log,
+            "logs": logs,
+            "gas_wanted": tx_result.get("gas_wanted", "0"),
+            "gas_used": tx_result.get("gas_used", "0"),
+        }
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def broadcast_tx_sync(self, tx_bytes):
+        try:
+            result = await self.call("broadcast_tx_sync", {
+                "tx": base64.b64encode(tx_bytes).decode(),
+            })
+            return {
+                "txhash": result["hash"],
+                "code": result.get("code", 0),
+                "raw_log": result.get("log", ""),
+            }
+        except HttpError:
+            return None
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def broadcast_tx_async(self, tx):
+        if self.lcd_node is None:
+            raise HttpError(
+                "StdTx JSON can only be broadcast through an LCD node",
+                400,
+                None,
+            )
+        return await self.lcd_node.broadcast_tx_async(tx)
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def get_account(self, account):
+        try:
+            return await self.abci_query(
+                "custom/acc/account",
+                {"Address": account},
+            )
+        except HttpError:
+            return None
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def get_oracle_rates(self):
+        try:
+            return await self.abci_query(
+                "custom/oracle/exchangeRates",
+                default=[],
+            )
+        except HttpError:
+            return None
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def get_oracle_active_denoms(self):
+        try:
+            return await self.abci_query(
+                "custom/oracle/activeDenoms",
+                default=[],
+            )
+        except HttpError:
+            return None
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def get_oracle_prevotes_validator(
+        self,
+        denom="",
+        validator_addr="",
+    ):
+        try:
+            return await self.abci_query(
+                "custom/oracle/prevotes",
+                {"denom": denom, "voter": validator_addr},
+                default=[],
+            )
+        except HttpError:
+            return None
+
+    @timed(NODE_SECONDS, label="endpoint")
+    async def get_oracle_votes_validator(
+        self,
+        denom="",
+        validator_addr="",
+    ):
+        try:
+            return await self.abci_query(
+                "custom/oracle/votes",
+                {"denom": denom, "voter": validator_addr},
+                default=[],
+            )
+        except HttpError:
+            return None
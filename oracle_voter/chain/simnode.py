@@ -0,0 +1,580 @@
+"""
+Simulated Terra node
+
+A local stand-in for a Terra LCD server and its Tendermint RPC, for
+running the Oracle end to end on one machine. Blocks are made every
+block_time seconds give or take jitter. Broadcast txs must carry the
+account's next sequence when their signatures say which one they were
+signed for (terracli output does not, ReplayWallet does), and are
+included in the next block. The oracle module is simulated as on chain:
+prevotes are kept per validator and denom, a vote must reveal a prevote
+from the previous vote period with a matching hash, and the votes of a
+period are tallied to the median at its last block.
+
+    node = SimNode(vote_period=5, block_time=1.0, jitter=0.2)
+    runner = await node.serve(1317)
+    asyncio.ensure_future(node.run())
+
+Latency and errors are injected per path with inject(), or POST
+/sim/faults {"path": "/txs", "latency": 2.0, "status": 500, "count": 3}
+while it runs; DELETE /sim/faults clears them. In process, handle()
+answers LCD requests for a client.MemoryTransport.
+
+    python -m oracle_voter.chain.simnode --port 1317 --block-time 1
+"""
+import argparse
+import asyncio
+import base64
+import random
+import statistics
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from hashlib import sha256
+from urllib.parse import urlsplit
+
+import simplejson as json
+from aiohttp import web
+
+from oracle_voter.oracle.utils import get_vote_period
+
+DEFAULT_RATES = {
+    "ukrw": "300.000000000000000000",
+    "umnt": "684.542466258089234543",
+    "usdr": "0.182737050935369655",
+    "uusd": "0.251817321037518416",
+}
+
+PREVOTE_MSG = "oracle/MsgExchangeRatePrevote"
+VOTE_MSG = "oracle/MsgExchangeRateVote"
+
+
+class TxError(Exception):
+    pass
+
+
+def vote_hash(salt, exchange_rate, denom, validator):
+    payload = f"{salt}:{exchange_rate}:{denom}:{validator}"
+    return sha256(bytes(payload, "utf-8")).hexdigest()[0:40]
+
+
+def format_rate(rate):
+    return str(Decimal(rate).quantize(Decimal(10) ** -18))
+
+
+class Fault:
+
+    def __init__(self, path, latency=0.0, status=None, count=None):
+        self.path = path
+        self.latency = latency
+        self.status = status
+        # Requests left to hit, forever when None
+        self.count = count
+
+
+class SimNode:
+
+    def __init__(
+        self,
+        vote_period=5,
+        block_time=6.0,
+        jitter=0.0,
+        chain_id="soju-0013",
+        height=1,
+        rates=None,
+        seed=None,
+    ):
+        self.vote_period = vote_period
+        self.block_time = block_time
+        self.jitter = jitter
+        self.chain_id = chain_id
+        self.random = random.Random(seed)
+        self.height = height
+        self.blocks = dict()
+        self.exchange_rates = dict(rates or DEFAULT_RATES)
+        self.actives = sorted(self.exchange_rates)
+
+        self.accounts = dict()
+        self.mempool = list()
+        self.txs = dict()
+        # (denom, validator) to the latest prevote and this period's vote
+        self.prevotes = dict()
+        self.votes = dict()
+        self.faults = list()
+        self.requests = 0
+
+        self.app = web.Application(middlewares=[self.fault_middleware])
+        router = self.app.router
+        router.add_get("/blocks/latest", self.handle_latest_block)
+        router.add_get("/blocks/{height}", self.handle_block)
+        router.add_get("/auth/accounts/{address}", self.handle_account)
+        router.add_get("/oracle/denoms/exchange_rates", self.handle_rates)
+        router.add_get("/oracle/denoms/actives", self.handle_actives)
+        router.add_get(
+            "/oracle/denoms/{denom}/prevotes/{validator}",
+            self.handle_prevotes,
+        )
+        router.add_get(
+            "/oracle/denoms/{denom}/votes/{validator}",
+            self.handle_votes,
+        )
+        router.add_post("/txs", self.handle_broadcast)
+        router.add_get("/txs/{txhash}", self.handle_tx)
+        router.add_post("/", self.handle_rpc)
+        router.add_post("/sim/faults", self.handle_add_fault)
+        router.add_delete("/sim/faults", self.handle_clear_faults)
+        self.make_block()
+
+    """
+    Chain
+    """
+
+    def vote_period_of(self, height):
+        return int(get_vote_period(self.vote_period, height))
+
+    def account(self, address):
+        account = self.accounts.get(address, None)
+        if account is None:
+            account = {
+                "address": address,
+                "account_number": len(self.accounts) + 1,
+                "sequence": 0,
+                "coins": [{"denom": "uluna", "amount": "100000000"}],
+            }
+            self.accounts[address] = account
+        return account
+
+    def make_block(self):
+        block_hash = sha256(
+            bytes(f"{self.chain_id}:{self.height}", "utf-8"),
+        ).hexdigest().upper()
+        prev = self.blocks.get(self.height - 1, None)
+        self.blocks[self.height] = {
+            "block_meta": {
+                "block_id": {
+                    "hash": block_hash,
+                    "parts": {"total": "1", "hash": block_hash},
+                },
+                "header": {
+                    "chain_id": self.chain_id,
+                    "height": f"{self.height}",
+                    "time": datetime.now(timezone.utc).isoformat(),
+                    "num_txs": "0",
+                    "last_block_id": {
+                        "hash": "" if prev is None else
+                        prev["block_meta"]["block_id"]["hash"],
+                    },
+                },
+            },
+            "block": {"data": {"txs": None}},
+        }
+        return self.blocks[self.height]
+
+    def produce_block(self):
+        self.height += 1
+        block = self.make_block()
+        included, self.mempool = self.mempool, list()
+        for txhash, tx in included:
+            self.txs[txhash] = self.deliver(txhash, tx)
+        block["block_meta"]["header"]["num_txs"] = str(len(included))
+        # Last block of the vote period
+        if self.vote_period_of(self.height + 1) > \
+                self.vote_period_of(self.height):
+            self.tally()
+        return block
+
+    async def run(self):
+        while True:
+            delay = self.block_time + self.random.uniform(
+                -self.jitter,
+                self.jitter,
+            )
+            await asyncio.sleep(max(delay, 0.0))
+            self.produce_block()
+
+    """
+    Txs
+    """
+
+    def check(self, tx):
+        # CheckTx, the sequence is taken when the tx enters the mempool
+        msgs = tx["msg"]
+        if len(msgs) == 0:
+            raise TxError("no msgs")
+        feeder = msgs[0]["value"]["feeder"]
+        account = self.account(feeder)
+        for signature in tx.get("signatures", None) or []:
+            sequence = signature.get("sequence", None)
+            if sequence is not None and \
+                    int(sequence) != account["sequence"]:
+                raise TxError(
+                    "unauthorized: signature verification failed; "
+                    f"expected sequence {account['sequence']}, "
+                    f"got {sequence}"
+                )
+        account["sequence"] += 1
+
+    def deliver_msg(self, msg):
+        value = msg["value"]
+        denom = value["denom"]
+        key = (denom, value["validator"])
+        if denom not in self.actives:
+            raise TxError(f"unknown denom {denom}")
+        if msg["type"] == PREVOTE_MSG:
+            return lambda: self.prevotes.__setitem__(key, {
+                "hash": value["hash"],
+                "denom": denom,
+                "voter": value["validator"],
+                "submit_block": f"{self.height}",
+            })
+        if msg["type"] != VOTE_MSG:
+            raise TxError(f"unknown msg {msg['type']}")
+        prevote = self.prevotes.get(key, None)
+        if prevote is None:
+            raise TxError(f"no prevote for {denom}")
+        prevote_period = self.vote_period_of(prevote["submit_block"])
+        if prevote_period != self.vote_period_of(self.height) - 1:
+            raise TxError(
+                f"prevote for {denom} is from vote period {prevote_period}"
+            )
+        expected = vote_hash(
+            value["salt"],
+            value["exchange_rate"],
+            denom,
+            value["validator"],
+        )
+        if expected != prevote["hash"]:
+            raise TxError(f"hash verification failed for {denom}")
+
+        def apply():
+            self.prevotes.pop(key, None)
+            self.votes[key] = {
+                "exchange_rate": value["exchange_rate"],
+                "denom": denom,
+                "voter": value["validator"],
+            }
+        return apply
+
+    def deliver(self, txhash, tx):
+        # Msgs of a tx are applied together or not at all
+        logs = list()
+        changes = list()
+        for idx, msg in enumerate(tx["msg"]):
+            try:
+                changes.append(self.deliver_msg(msg))
+                logs.append({"msg_index": idx, "success": True, "log": ""})
+            except (TxError, KeyError) as err:
+                logs.append({
+                    "msg_index": idx,
+                    "success": False,
+                    "log": str(err),
+                })
+        failed = any(not log["success"] for log in logs)
+        if not failed:
+            for apply in changes:
+                apply()
+        return {
+            "height": f"{self.height}",
+            "txhash": txhash,
+            "code": 4 if failed else 0,
+            "raw_log": json.dumps(logs),
+            "logs": logs,
+            "gas_wanted": "200000",
+            "gas_used": "95000",
+            "tx": {"type": "core/StdTx", "value": tx},
+        }
+
+    def broadcast(self, tx):
+        txhash = sha256(
+            bytes(json.dumps(tx, sort_keys=True), "utf-8"),
+        ).hexdigest().upper()
+        try:
+            self.check(tx)
+        except (TxError, KeyError) as err:
+            return {"height": "0", "txhash": txhash, "code": 4,
+                    "raw_log": str(err)}
+        self.mempool.append((txhash, tx))
+        return {"height": "0", "txhash": txhash}
+
+    def tally(self):
+        for denom in self.actives:
+            rates = [
+                Decimal(vote["exchange_rate"])
+                for key, vote in self.votes.items()
+                if key[0] == denom and Decimal(vote["exchange_rate"]) > 0
+            ]
+            if len(rates) > 0:
+                self.exchange_rates[denom] = format_rate(
+                    statistics.median(rates),
+                )
+        self.votes = dict()
+
+    """
+    Queries, shared by the LCD and RPC handlers
+    """
+
+    def query_account(self, address):
+        account = self.account(address)
+        return {
+            "type": "core/Account",
+            "value": {
+                "address": address,
+                "coins": account["coins"],
+                "public_key": None,
+                "account_number": f"{account['account_number']}",
+                "sequence": f"{account['sequence']}",
+            },
+        }
+
+    def query_rates(self):
+        return [
+            {"denom": denom, "amount": amount}
+            for denom, amount in sorted(self.exchange_rates.items())
+        ]
+
+    def query_prevotes(self, denom, validator):
+        prevote = self.prevotes.get((denom, validator), None)
+        return [] if prevote is None else [prevote]
+
+    def query_votes(self, denom, validator):
+        vote = self.votes.get((denom, validator), None)
+        return [] if vote is None else [vote]
+
+    def with_height(self, result):
+        return web.json_response({"height": f"{self.height}", "result": result})
+
+    """
+    Faults
+    """
+
+    def inject(self, path, latency=0.0, status=None, count=None):
+        fault = Fault(path, latency, status, count)
+        self.faults.append(fault)
+        return fault
+
+    def clear_faults(self):
+        self.faults = list()
+
+    @web.middleware
+    async def fault_middleware(self, request, handler):
+        self.requests += 1
+        for fault in list(self.faults):
+            if not request.path.startswith(fault.path) or \
+                    request.path.startswith("/sim/"):
+                continue
+            if fault.count is not None:
+                fault.count -= 1
+                if fault.count <= 0:
+                    self.faults.remove(fault)
+            if fault.latency > 0:
+                await asyncio.sleep(fault.latency)
+            if fault.status is not None:
+                return web.json_response(
+                    {"error": "injected fault"},
+                    status=fault.status,
+                )
+        return await handler(request)
+
+    async def handle_add_fault(self, request):
+        options = await request.json()
+        self.inject(
+            options["path"],
+            latency=float(options.get("latency", 0.0)),
+            status=options.get("status", None),
+            count=options.get("count", None),
+        )
+        return web.json_response({"faults": len(self.faults)})
+
+    async def handle_clear_faults(self, request):
+        self.clear_faults()
+        return web.json_response({"faults": 0})
+
+    """
+    LCD
+    """
+
+    async def handle_latest_block(self, request):
+        return web.json_response(self.blocks[self.height])
+
+    async def handle_block(self, request):
+        block = self.blocks.get(int(request.match_info["height"]), None)
+        if block is None:
+            return web.json_response({"error": "block not found"}, status=404)
+        return web.json_response(block)
+
+    async def handle_account(self, request):
+        return self.with_height(
+            self.query_account(request.match_info["address"]),
+        )
+
+    async def handle_rates(self, request):
+        return self.with_height(self.query_rates())
+
+    async def handle_actives(self, request):
+        return self.with_height(self.actives)
+
+    async def handle_prevotes(self, request):
+        return self.with_height(self.query_prevotes(
+            request.match_info["denom"],
+            request.match_info["validator"],
+        ))
+
+    async def handle_votes(self, request):
+        return self.with_height(self.query_votes(
+            request.match_info["denom"],
+            request.match_info["validator"],
+        ))
+
+    async def handle_broadcast(self, request):
+        payload = json.loads(await request.text())
+        return web.json_response(self.broadcast(payload["tx"]))
+
+    async def handle_tx(self, request):
+        result = self.txs.get(request.match_info["txhash"].upper(), None)
+        if result is None:
+            return web.json_response({"error": "tx not found"}, status=404)
+        return web.json_response(result)
+
+    async def handle(self, method, url, params=None, data=None):
+        # LCD requests in process, for client.MemoryTransport
+        parts = urlsplit(url).path.strip("/").split("/")
+        if method == "POST" and parts == ["txs"]:
+            return 200, self.broadcast(json.loads(data)["tx"])
+        if parts == ["blocks", "latest"]:
+            return 200, self.blocks[self.height]
+        if len(parts) == 2 and parts[0] == "txs":
+            result = self.txs.get(parts[1].upper(), None)
+            if result is None:
+                return 404, {"error": "tx not found"}
+            return 200, result
+        if len(parts) == 3 and parts[0:2] == ["auth", "accounts"]:
+            result = self.query_account(parts[2])
+        elif parts == ["oracle", "denoms", "exchange_rates"]:
+            result = self.query_rates()
+        elif parts == ["oracle", "denoms", "actives"]:
+            result = self.actives
+        elif len(parts) == 5 and parts[3] == "prevotes":
+            result = self.query_prevotes(parts[2], parts[4])
+        elif len(parts) == 5 and parts[3] == "votes":
+            result = self.query_votes(parts[2], parts[4])
+        else:
+            return 404, {"error": f"{url} not found"}
+        return 200, {"height": f"{self.height}", "result": result}
+
+    """
+    Tendermint RPC
+    """
+
+    def abci_query(self, path, data):
+        query = json.loads(bytes.fromhex(data)) if data else dict()
+        if path == "custom/acc/account":
+            value = self.query_account(query["Address"])
+        elif path == "custom/oracle/exchangeRates":
+            value = self.query_rates()
+        elif path == "custom/oracle/activeDenoms":
+            value = self.actives
+        elif path == "custom/oracle/prevotes":
+            value = self.query_prevotes(query["denom"], query["voter"])
+        elif path == "custom/oracle/votes":
+            value = self.query_votes(query["denom"], query["voter"])
+        else:
+            return {"response": {"code": 6, "log": f"unknown query {path}"}}
+        return {"response": {
+            "code": 0,
+            "log": "",
+            "height": f"{self.height}",
+            "value": base64.b64encode(
+                bytes(json.dumps(value), "utf-8"),
+            ).decode(),
+        }}
+
+    def rpc_result(self, method, params):
+        if method == "status":
+            return {"sync_info": {"latest_block_height": f"{self.height}"}}
+        if method == "block":
+            block = self.blocks[self.height]
+            return {
+                "block_id": block["block_meta"]["block_id"],
+                "block": {
+                    "header": block["block_meta"]["header"],
+                    "data": block["block"]["data"],
+                },
+            }
+        if method == "tx":
+            txhash = base64.b64decode(params["hash"]).hex().upper()
+            result = self.txs.get(txhash, None)
+            if result is None:
+                return None
+            return {
+                "hash": txhash,
+                "height": result["height"],
+                "index": 0,
+                "tx_result": {
+                    "code": result["code"],
+                    "log": result["raw_log"],
+                    "gas_wanted": result["gas_wanted"],
+                    "gas_used": result["gas_used"],
+                },
+                "tx": "",
+            }
+        if method == "abci_query":
+            return self.abci_query(params["path"], params.get("data", ""))
+        return None
+
+    async def handle_rpc(self, request):
+        calls = json.loads(await request.text())
+        batch = isinstance(calls, list)
+        responses = list()
+        for call in calls if batch else [calls]:
+            result = self.rpc_result(call["method"], call.get("params", {}))
+            response = {"jsonrpc": "2.0", "id": call.get("id", None)}
+            if result is None:
+                response["error"] = {
+                    "code": -32603,
+                    "message": "Internal error",
+                    "data": f"{call['method']} not found",
+                }
+            else:
+                response["result"] = result
+            responses.append(response)
+        return web.json_response(responses if batch else responses[0])
+
+    async def serve(self, port, host="127.0.0.1"):
+        runner = web.AppRunner(self.app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        return runner
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated Terra node")
+    parser.add_argument("--port", type=int, default=1317)
+    parser.add_argument("--vote-period", type=int, default=5)
+    parser.add_argument("--block-time", type=float, default=6.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--chain-id", default="soju-0013")
+    parser.add_argument("--height", type=int, default=1)
+    args = parser.parse_args()
+
+    node = SimNode(
+        vote_period=args.vote_period,
+        block_time=args.block_time,
+        jitter=args.jitter,
+        chain_id=args.chain_id,
+        height=args.height,
+    )
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(node.serve(args.port))
+    print(f"Simulated {args.chain_id} on http://127.0.0.1:{args.port}, "
+          f"{args.block_time}s blocks from height {node.height}")
+    started = time.time()
+    try:
+        loop.run_until_complete(node.run())
+    except KeyboardInterrupt:
+        print(f"Stopped at height {node.height} after "
+              f"{time.time() - started:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+from aiohttp.test_utils import TestServer
+
+from oracle_voter.chain.fixtures_rpc import RPCStandIn
+from oracle_voter.chain.rpc import RPCNode
+from oracle_voter.common import scheduler
+from oracle_voter.common.client import HttpError
+from oracle_voter.oracle.machine2 import Oracle
+from oracle_voter.wallet.cli import CLIWallet
+
+feeder_addr = "terra1kk2gcmy6d444jpsg3hyf84lxd3dx0naud0236f"
+
+
+async def with_stand_in(test):
+    stand_in = RPCStandIn(18549, feeder_addr)
+    server = TestServer(stand_in.app)
+    await server.start_server()
+    try:
+        node = RPCNode(str(server.make_url("/")))
+        await test(node, stand_in)
+    finally:
+        await server.close()
+
+
+def run(test):
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(with_stand_in(test))
+
+
+def test_concurrent_calls_are_batched():
+    async def test(node, stand_in):
+        block, tx_a, tx_b, account = await asyncio.gather(
+            node.get_latest_block(),
+            node.get_tx("AB12"),
+            node.get_tx("CD34"),
+            node.get_account(feeder_addr),
+        )
+        assert len(stand_in.requests) == 1
+        assert len(stand_in.requests[0]) == 4
+        assert block["block_meta"]["header"]["height"] == "18549"
+        assert tx_a["height"] == "18548"
+        assert tx_b["txhash"] == "CD34"
+        assert tx_a["logs"] == [{"msg_index": 0, "success": True, "log": ""}]
+        assert account["result"]["value"]["account_number"] == "52"
+        # Next height is a new batch
+        await node.get_latest_block()
+        assert len(stand_in.requests) == 2
+    run(test)
+
+
+def test_tx_checks_and_wallet_sync_are_batched():
+    async def test(node, stand_in):
+        # Deadlines set by other Oracles would shed the checks
+        scheduler.scheduler.set_deadline(None)
+        wallet = CLIWallet("feeder", "", feeder_addr, node)
+        oracle = Oracle(vote_period=5, lcd_node=node, wallet=wallet)
+        for tx_hash in ("AB12", "CD34"):
+            oracle.q_prevote_tx_hash.append((18549, tx_hash))
+            oracle.hist_prevotes[tx_hash] = {
+                "msgs": [],
+                "sent_height": 18547,
+                "vote_period": 3709,
+            }
+        # Inside a vote period already voted in, only the checks run
+        oracle.current_vote_period = 3709
+        await oracle.new_height(18549)
+        assert len(stand_in.requests) == 1
+        methods = [call["method"] for call in stand_in.requests[0]]
+        assert sorted(methods) == ["abci_query", "tx", "tx"]
+        assert oracle.hist_prevotes["AB12"]["result"] is True
+        assert wallet.account_seq == 77
+    run(test)
+
+
+def test_batch_sent_at_most_urgent_priority():
+    async def test(node, stand_in):
+        async def housekeeping():
+            with scheduler.priority(scheduler.HOUSEKEEPING):
+                return await node.get_account(feeder_addr)
+
+        # Housekeeping alone is shed this close to the deadline
+        scheduler.scheduler.set_deadline(scheduler.scheduler.now())
+        try:
+            account, actives = await asyncio.gather(
+                housekeeping(),
+                node.get_oracle_active_denoms(),
+            )
+        finally:
+            scheduler.scheduler.set_deadline(None)
+        assert len(stand_in.requests) == 1
+        assert actives["result"] == ["ukrw", "umnt", "usdr", "uusd"]
+        assert account["result"]["value"]["account_number"] == "52"
+    run(test)
+
+
+def test_batch_keeps_order_and_errors():
+    async def test(node, stand_in):
+        status, missing = await node.batch([
+            ("status", {}),
+            ("tx", {"hash": "/w==", "prove": False}),
+        ])
+        assert status["sync_info"]["latest_block_height"] == "18549"
+        assert isinstance(missing, HttpError)
+        assert await node.get_tx("FF01") is None
+    run(test)
+
+
+def test_abci_queries():
+    async def test(node, stand_in):
+        actives, prevotes = await asyncio.gather(
+            node.get_oracle_active_denoms(),
+            node.get_oracle_prevotes_validator("ukrw", "terravaloper1a"),
+        )
+        assert actives["result"] == ["ukrw", "umnt", "usdr", "uusd"]
+        assert prevotes["result"] == []
+        # Same response shapes as LCDNode
+        wallet = CLIWallet("feeder", "", feeder_addr, node)
+        await wallet.sync_state()
+        assert wallet.account_seq == 77
+    run(test)
+
+
+def test_broadcast():
+    async def test(node, stand_in):
+        res = await node.broadcast_tx_sync(b"\x01\x02")
+        assert res["txhash"] == "AB12"
+        with pytest.raises(HttpError):
+            await node.broadcast_tx_async("{}")
+    run(test)
+
+
+def test_unreachable_node():
+    node = RPCNode("http://127.0.0.1:1")
+    loop = asyncio.get_event_loop()
+    assert loop.run_until_complete(node.get_latest_block()) is None
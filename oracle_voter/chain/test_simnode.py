@@ -0,0 +1,263 @@
+import asyncio
+from unittest.mock import patch
+
+import aiohttp
+import simplejson as json
+from aiohttp.test_utils import TestServer
+
+from oracle_voter.chain.core import LCDNode
+from oracle_voter.chain.rpc import RPCNode
+from oracle_voter.chain.simnode import SimNode, vote_hash
+from oracle_voter.common import client
+from oracle_voter.common.client import MemoryTransport
+from oracle_voter.oracle.fixtures_replay import EXCHANGE, quotes, replay_rates
+from oracle_voter.oracle.machine2 import Oracle
+from oracle_voter.wallet.cli import CLIWallet
+from oracle_voter.wallet.replay import ReplayWallet
+
+feeder = "terra1kk2gcmy6d444jpsg3hyf84lxd3dx0naud0236f"
+validator = "terravaloper1rhrptnx87ufpv62c7ngt9yqlz2hr77xr9nkcr9"
+
+
+def prevote_msg(denom, hashed):
+    return {
+        "type": "oracle/MsgExchangeRatePrevote",
+        "value": {
+            "hash": hashed,
+            "denom": denom,
+            "feeder": feeder,
+            "validator": validator,
+        },
+    }
+
+
+def vote_msg(denom, rate, salt):
+    return {
+        "type": "oracle/MsgExchangeRateVote",
+        "value": {
+            "exchange_rate": rate,
+            "salt": salt,
+            "denom": denom,
+            "feeder": feeder,
+            "validator": validator,
+        },
+    }
+
+
+def std_tx(msgs, sequence=None):
+    signature = {"pub_key": None, "signature": ""}
+    if sequence is not None:
+        signature["sequence"] = str(sequence)
+    return {"msg": msgs, "fee": {}, "memo": "", "signatures": [signature]}
+
+
+def test_reveal_needs_prevote_of_last_period():
+    node = SimNode(vote_period=5, height=18549)
+    rate = "300.396000000000000000"
+    hashed = vote_hash("ab12", rate, "ukrw", validator)
+    prevote = node.broadcast(std_tx([prevote_msg("ukrw", hashed)]))
+    node.produce_block()
+    assert node.txs[prevote["txhash"]]["code"] == 0
+    assert node.query_prevotes("ukrw", validator)[0]["submit_block"] == \
+        "18550"
+
+    # Same vote period
+    early = node.broadcast(std_tx([vote_msg("ukrw", rate, "ab12")]))
+    node.produce_block()
+    assert node.txs[early["txhash"]]["code"] == 4
+
+    for _ in range(4):
+        node.produce_block()
+    assert node.height == 18555
+    wrong = node.broadcast(std_tx([
+        vote_msg("ukrw", "300.000000000000000000", "ab12"),
+    ]))
+    node.produce_block()
+    failed = node.txs[wrong["txhash"]]
+    assert failed["logs"][0]["success"] is False
+    assert "hash verification failed" in failed["logs"][0]["log"]
+
+    vote = node.broadcast(std_tx([vote_msg("ukrw", rate, "ab12")]))
+    node.produce_block()
+    assert node.txs[vote["txhash"]]["code"] == 0
+    assert node.query_prevotes("ukrw", validator) == []
+    # Tallied at the last block of the period
+    for _ in range(2):
+        node.produce_block()
+    assert node.exchange_rates["ukrw"] == rate
+    assert node.votes == {}
+
+
+def test_failed_msg_fails_tx():
+    node = SimNode(vote_period=5, height=18549)
+    res = node.broadcast(std_tx([
+        prevote_msg("ukrw", "aa"),
+        prevote_msg("ueur", "bb"),
+    ]))
+    node.produce_block()
+    result = node.txs[res["txhash"]]
+    assert [log["success"] for log in result["logs"]] == [True, False]
+    assert node.prevotes == {}
+
+
+def test_sequence_is_checked():
+    node = SimNode()
+    assert node.broadcast(std_tx([prevote_msg("ukrw", "aa")], 0))["txhash"]
+    rejected = node.broadcast(std_tx([prevote_msg("ukrw", "aa")], 0))
+    assert rejected["code"] == 4
+    assert "expected sequence 1" in rejected["raw_log"]
+    # Signatures without a sequence, as terracli makes them
+    node.broadcast(std_tx([prevote_msg("ukrw", "aa")]))
+    assert node.accounts[feeder]["sequence"] == 2
+    assert len(node.mempool) == 2
+
+
+async def with_server(node, test):
+    server = TestServer(node.app)
+    await server.start_server()
+    try:
+        await test(str(server.make_url("")).rstrip("/"))
+    finally:
+        await server.close()
+
+
+def run(node, test):
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(with_server(node, test))
+
+
+def test_lcd_and_rpc_queries():
+    node = SimNode(height=18549)
+
+    async def test(addr):
+        lcd = LCDNode(addr=addr)
+        rpc = RPCNode(addr=addr, lcd_node=lcd)
+        for chain_node in (lcd, rpc):
+            block = await chain_node.get_latest_block()
+            assert block["block_meta"]["header"]["height"] == "18549"
+            account = await chain_node.get_account(feeder)
+            assert account["result"]["value"]["account_number"] == "1"
+            actives = await chain_node.get_oracle_active_denoms()
+            assert actives["result"] == ["ukrw", "umnt", "usdr", "uusd"]
+            rates = await chain_node.get_oracle_rates()
+            assert rates["result"][0] == {
+                "denom": "ukrw",
+                "amount": "300.000000000000000000",
+            }
+        res = await rpc.broadcast_tx_async(json.dumps({
+            "tx": std_tx([prevote_msg("ukrw", "aa")]),
+            "mode": "sync",
+        }))
+        node.produce_block()
+        for chain_node in (lcd, rpc):
+            tx = await chain_node.get_tx(res["txhash"])
+            assert tx["height"] == "18550"
+            assert tx["logs"][0]["success"] is True
+    run(node, test)
+
+
+def test_injected_faults():
+    node = SimNode(height=18549)
+
+    async def test(addr):
+        lcd = LCDNode(addr=addr)
+        node.inject("/blocks", status=500, count=2)
+        assert await lcd.get_latest_block() is None
+        assert await lcd.get_latest_block() is None
+        block = await lcd.get_latest_block()
+        assert block["block_meta"]["header"]["height"] == "18549"
+
+        await client.http_post(f"{addr}/sim/faults", post_data=(
+            '{"path": "/oracle", "latency": 0.2}'
+        ))
+        started = asyncio.get_event_loop().time()
+        await lcd.get_oracle_active_denoms()
+        assert asyncio.get_event_loop().time() - started >= 0.2
+        async with aiohttp.ClientSession() as session:
+            await session.delete(f"{addr}/sim/faults")
+        assert node.faults == []
+    run(node, test)
+
+
+async def exchange(method, url, params, data):
+    return 200, {"price": quotes[params["target"]]}
+
+
+def test_oracle_votes_on_simnode():
+    # First block of a vote period, a prevote made at the last block
+    # would only be included in the next period
+    node = SimNode(vote_period=5, height=18550)
+    wallet = ReplayWallet(feeder)
+
+    async def test(addr):
+        oracle = Oracle(
+            vote_period=5,
+            lcd_node=LCDNode(addr=addr),
+            validator_addr=validator,
+            wallet=wallet,
+            chain_id=node.chain_id,
+        )
+        await oracle.retrieve_height()
+        for _ in range(11):
+            node.produce_block()
+            await oracle.retrieve_height()
+
+    client.mount(EXCHANGE, MemoryTransport(exchange))
+    try:
+        with patch(
+            "oracle_voter.oracle.machine2.supported_rates",
+            replay_rates(),
+        ):
+            run(node, test)
+    finally:
+        client.unmount(EXCHANGE)
+
+    results = list(node.txs.values())
+    # Prevotes of three periods, reveals of the last two
+    assert len(results) == 5
+    assert all(result["code"] == 0 for result in results)
+    assert node.accounts[feeder]["sequence"] == wallet.account_seq == 5
+    assert node.exchange_rates["ukrw"] == "300.396000000000000000"
+
+
+class SyncingWallet(CLIWallet):
+    """Syncs from the node as CLIWallet does, signs without terracli"""
+
+    def offline_sign(self, payload, *args):
+        return ReplayWallet(self.account_addr).offline_sign(payload, *args)
+
+
+def test_first_txs_wait_for_wallet_sync():
+    # Restarted with the feeder well past sequence 0, the account query
+    # answers after the first block is seen
+    node = SimNode(vote_period=5, height=18550)
+    node.account(feeder)["sequence"] = 42
+    node.inject("/auth/accounts", latency=1.0, count=1)
+
+    async def test(addr):
+        lcd = LCDNode(addr=addr)
+        wallet = SyncingWallet("feeder", "", feeder, lcd_node=lcd)
+        oracle = Oracle(
+            vote_period=5,
+            lcd_node=lcd,
+            validator_addr=validator,
+            wallet=wallet,
+            chain_id=node.chain_id,
+        )
+        await oracle.retrieve_height()
+        node.produce_block()
+        assert wallet.account_seq == 43
+
+    client.mount(EXCHANGE, MemoryTransport(exchange))
+    try:
+        with patch(
+            "oracle_voter.oracle.machine2.supported_rates",
+            replay_rates(),
+        ):
+            run(node, test)
+    finally:
+        client.unmount(EXCHANGE)
+
+    (prevote,) = node.txs.values()
+    assert prevote["code"] == 0
+    assert node.accounts[feeder]["sequence"] == 43
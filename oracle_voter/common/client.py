@@ -1,87 +1,230 @@
+import time
+from urllib.parse import urlsplit
+
 import aiohttp
 import simplejson as json
 from simplejson.errors import JSONDecodeError
 from aiohttp.client_exceptions import ClientConnectionError, ServerTimeoutError, ClientConnectorError
 
+from oracle_voter.common import ratelimit, scheduler
+from oracle_voter.common.errors import HttpError
+from oracle_voter.common.metrics import registry
 
-class HttpError(Exception):
-    def __init__(self, message, status_code, result):
-        super().__init__(message)
-        self.status_code = status_code
-        self.result = result
+HTTP_SECONDS = registry.histogram(
+    "http_request_seconds",
+    "Outbound HTTP request latency",
+    ("host", "method"),
+)
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total",
+    "Outbound HTTP requests by status code or failure",
+    ("host", "method", "status"),
+)
 
 
-async def http_get(url, params=dict()):
+"""
+Transports
+
+A transport sends one request and returns (status_code, raw_text,
+headers).
+Requests use the transport mounted on the longest matching url prefix,
+TCP otherwise.
+"""
+
+
+class TCPTransport:
+
+    def session(self):
+        return aiohttp.ClientSession()
+
+    async def request(self, method, url, params=dict(), data=None):
+        session = self.session()
+        try:
+            if method == "GET":
+                timeout = aiohttp.ClientTimeout(
+                    total=None,
+                    sock_connect=2,
+                    sock_read=2,
+                )
+                http_resp = await session.get(
+                    url,
+                    params=params,
+                    timeout=timeout,
+                )
+            else:
+                http_resp = await session.post(url, params=params, data=data)
+            raw_text = await http_resp.text()
+            return http_resp.status, raw_text, http_resp.headers
+        finally:
+            await session.close()
+
+
+class UnixTransport(TCPTransport):
+    """HTTP over a unix domain socket, the url host is ignored"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def session(self):
+        connector = aiohttp.UnixConnector(path=self.path)
+        return aiohttp.ClientSession(connector=connector)
+
+
+class MemoryTransport:
+    """Dispatches requests to an async handler in the same process
+
+    handler(method, url, params, data) returns (status_code, body) or
+    (status_code, body, headers), a body that is not a str is sent as JSON.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+
+    async def request(self, method, url, params=dict(), data=None):
+        response = await self.handler(method, url, params, data)
+        status_code, body = response[0:2]
+        headers = response[2] if len(response) > 2 else dict()
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        return status_code, body, headers
+
+
+default_transport = TCPTransport()
+transports = dict()
+# common.recorder.Recorder when requests are recorded
+recorder = None
+
+
+def mount(prefix, transport):
+    transports[prefix] = transport
+
+
+def unmount(prefix):
+    return transports.pop(prefix, None)
+
+
+def transport_for(url):
+    # An empty prefix is mounted for every url
+    matched = None
+    transport = default_transport
+    for prefix, mounted in transports.items():
+        if url.startswith(prefix) and (
+            matched is None or len(prefix) > len(matched)
+        ):
+            matched = prefix
+            transport = mounted
+    return transport
+
+
+async def http_request(method, url, params=dict(), data=None):
+    host = urlsplit(url).netloc
+    request_class = scheduler.current_priority.get()
+    try:
+        # Raises RequestShed for low priority requests near the deadline
+        await scheduler.scheduler.acquire(request_class)
+        try:
+            # Raises RateLimited when the host has no tokens left, only
+            # taken once the request is not shed
+            await ratelimit.limiter.acquire(url)
+        except BaseException:
+            scheduler.scheduler.release(request_class)
+            raise
+    except HttpError as err:
+        HTTP_REQUESTS.inc(host=host, method=method, status=err.status_code)
+        raise
+    started = time.perf_counter()
+    status = "error"
+    try:
+        result = await send_request(method, url, params, data)
+        status = 200
+        return result
+    except HttpError as err:
+        status = err.status_code
+        raise
+    finally:
+        scheduler.scheduler.release(request_class)
+        HTTP_SECONDS.observe(
+            time.perf_counter() - started,
+            host=host,
+            method=method,
+        )
+        HTTP_REQUESTS.inc(host=host, method=method, status=status)
+
+
+async def send_request(method, url, params, data):
     result = {}
-    session = aiohttp.ClientSession()
-    timeout = aiohttp.ClientTimeout(total=None, sock_connect=2, sock_read=2)
     try:
-        #
-        http_resp = await session.get(url, params=params, timeout=timeout)
-        # print(f"Fetching URL: {url}")
-        status_code = http_resp.status
-        # print(status_code)
-        raw_text = await http_resp.text()
-        # print(raw_text)
+        status_code, raw_text, headers = await transport_request(
+            method,
+            url,
+            params,
+            data,
+        )
+        if status_code in (429, 503) and (
+            status_code == 429 or "Retry-After" in headers
+        ):
+            raise ratelimit.limiter.throttled(
+                url,
+                ratelimit.parse_retry_after(headers.get("Retry-After", None)),
+            )
         if len(raw_text) > 0:
             result = json.loads(raw_text)
         if status_code != 200:
             raise HttpError(f"Url: {url}", status_code, result)
-        await session.close()
         return result
     except JSONDecodeError:
         # Problems decoding JSON
-        await session.close()
         return None
-    except HttpError as err:
-        await session.close()
-        raise err
 
     except ServerTimeoutError:
-        await session.close()
         raise HttpError(f"Url: {url}", 404, "Server Timed Out")
 
     except ClientConnectorError:
-        await session.close()
         raise HttpError(f"Url: {url}", 404, "Unable to connect")
 
     except ClientConnectionError:
-        await session.close()
         raise HttpError(f"Url: {url}", 404, "Unable to connect")
 
 
-async def http_post(url, params=dict(), post_data=dict()):
-    result = {}
-    session = aiohttp.ClientSession()
+async def transport_request(method, url, params, data):
+    transport = transport_for(url)
+    if recorder is None:
+        return await transport.request(method, url, params=params, data=data)
+    started = time.perf_counter()
     try:
-        #
-        http_resp = await session.post(url, params=params, data=post_data)
-        status_code = http_resp.status
-        raw_text = await http_resp.text()
-        if len(raw_text) > 0:
-            result = json.loads(raw_text)
-        if status_code != 200:
-            raise HttpError(f"Url: {url}", status_code, result)
-        await session.close()
-        return result
-    except JSONDecodeError:
-        # Problems decoding JSON
-        await session.close()
-        return None
+        status_code, raw_text, headers = await transport.request(
+            method,
+            url,
+            params=params,
+            data=data,
+        )
+    except Exception as err:
+        recorder.record(
+            method,
+            url,
+            params,
+            data,
+            None,
+            time.perf_counter() - started,
+            None,
+            error=repr(err),
+        )
+        raise
+    recorder.record(
+        method,
+        url,
+        params,
+        data,
+        status_code,
+        time.perf_counter() - started,
+        raw_text,
+    )
+    return status_code, raw_text, headers
 
-    except HttpError as err:
-        await session.close()
-        raise err
 
-    except ServerTimeoutError:
-        await session.close()
-        raise HttpError(f"Url: {url}", 404, "Server Timed Out")
+async def http_get(url, params=dict()):
+    return await http_request("GET", url, params=params)
 
-    except ClientConnectorError:
-        await session.close()
-        raise HttpError(f"Url: {url}", 404, "Unable to connect")
 
-    except ClientConnectionError:
-        await session.close()
-        raise HttpError(f"Url: {url}", 404, "Unable to connect")
-    
\ No newline at end of file
+async def http_post(url, params=dict(), post_data=dict()):
+    return await http_request("POST", url, params=params, data=post_data)
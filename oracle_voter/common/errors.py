@@ -0,0 +1,5 @@
+class HttpError(Exception):
+    def __init__(self, message, status_code, result):
+        super().__init__(message)
+        self.status_code = status_code
+        self.result = result
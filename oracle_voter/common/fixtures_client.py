@@ -18,6 +18,7 @@ class DummySessionResult:
     def __init__(self, status, raw_text):
         self.status = status
         self.raw_text = raw_text
+        self.headers = dict()
 
     async def text(self):
         return self.raw_text
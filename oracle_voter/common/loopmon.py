@@ -0,0 +1,171 @@
+"""
+Event loop monitor
+
+Signing, file writes and printing block the one loop everything runs
+on. The monitor wakes every interval seconds and records how late it
+woke as the loop lag. A watchdog thread snapshots the loop thread's
+stack once the loop has not woken for longer than the threshold, so the
+stall can be put down to the code that held the loop. asyncio debug
+mode reports callbacks slower than the threshold by task or coroutine.
+
+    monitor = LoopMonitor(threshold=0.1)
+    monitor.start()
+"""
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from oracle_voter.common.metrics import registry
+
+LOOP_LAG = registry.histogram(
+    "loop_lag_seconds",
+    "How late the event loop woke up the monitor",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+LOOP_STALLS = registry.histogram(
+    "loop_stall_seconds",
+    "Event loop stalls over the threshold by the code holding the loop",
+    ("site",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+SLOW_CALLBACKS = registry.counter(
+    "loop_slow_callbacks_total",
+    "Callbacks asyncio debug mode found over the threshold",
+    ("callback",),
+)
+
+# "Executing <Task ... coro=<Oracle.new_height() running at ...>> took"
+CORO_NAME = re.compile(r"coro=<([\w.<>]+)\(")
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def blame(stack):
+    # Innermost frame of this package, the blocking call is made there
+    for frame in reversed(stack):
+        if frame.filename.startswith(PACKAGE_DIR) and \
+                frame.filename != __file__:
+            break
+    else:
+        frame = stack[-1]
+    return f"{os.path.basename(frame.filename)}:{frame.name}"
+
+
+class SlowCallbackHandler(logging.Handler):
+    # Picks the slow callback warnings out of the asyncio logger
+
+    def __init__(self, monitor):
+        super().__init__(logging.WARNING)
+        self.monitor = monitor
+
+    def emit(self, record):
+        if not record.msg.startswith("Executing") or \
+                len(record.args or ()) != 2:
+            return
+        handle, duration = record.args
+        match = CORO_NAME.search(str(handle))
+        callback = match.group(1) if match else str(handle)[0:80]
+        self.monitor.slow_callback(callback, duration)
+
+
+class LoopMonitor:
+
+    def __init__(self, interval=0.05, threshold=0.1, ring_size=50):
+        self.interval = interval
+        self.threshold = threshold
+        self.loop = None
+        self.loop_thread = None
+        self.task = None
+        self.watchdog = None
+        self.stopped = threading.Event()
+        self.handler = SlowCallbackHandler(self)
+
+        self.beat_ts = time.monotonic()
+        # Set by the watchdog, taken by the loop when it wakes up
+        self.captured = None
+        self.max_lag = 0.0
+        self.stalls = deque(maxlen=ring_size)
+        self.slow = deque(maxlen=ring_size)
+
+    def start(self, loop=None):
+        # Called from the thread running the loop
+        self.loop = loop or asyncio.get_event_loop()
+        self.loop_thread = threading.get_ident()
+        self.loop.set_debug(True)
+        self.loop.slow_callback_duration = self.threshold
+        logging.getLogger("asyncio").addHandler(self.handler)
+        self.beat_ts = time.monotonic()
+        self.stopped.clear()
+        self.task = asyncio.ensure_future(self.run(), loop=self.loop)
+        self.watchdog = threading.Thread(
+            target=self.watch,
+            name="loop-watchdog",
+            daemon=True,
+        )
+        self.watchdog.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        if self.task is not None:
+            self.task.cancel()
+        logging.getLogger("asyncio").removeHandler(self.handler)
+        if self.loop is not None:
+            self.loop.set_debug(False)
+
+    async def run(self):
+        while not self.stopped.is_set():
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.beat(now, max(now - expected, 0.0))
+
+    def beat(self, now, lag):
+        LOOP_LAG.observe(lag)
+        self.max_lag = max(self.max_lag, lag)
+        self.beat_ts = now
+        stack, self.captured = self.captured, None
+        if lag >= self.threshold:
+            self.stall(lag, stack)
+
+    def watch(self):
+        # Watchdog thread, the loop thread is stuck if it misses a beat
+        while not self.stopped.wait(self.interval):
+            overdue = time.monotonic() - self.beat_ts - self.interval
+            if overdue < self.threshold or self.captured is not None:
+                continue
+            frame = sys._current_frames().get(self.loop_thread, None)
+            if frame is not None:
+                self.captured = traceback.extract_stack(frame)
+
+    def stall(self, lag, stack):
+        site = "unknown" if not stack else blame(stack)
+        LOOP_STALLS.observe(lag, site=site)
+        self.stalls.append({
+            "ts": time.time(),
+            "lag": lag,
+            "site": site,
+            "stack": [] if not stack else traceback.format_list(stack),
+        })
+        print(f"Event loop stalled {lag:.3f}s in {site}")
+
+    def slow_callback(self, callback, duration):
+        SLOW_CALLBACKS.inc(callback=callback)
+        self.slow.append({
+            "ts": time.time(),
+            "callback": callback,
+            "duration": duration,
+        })
+        print(f"Slow callback {callback} took {duration:.3f}s")
+
+    def stats(self):
+        return {
+            "max_lag": self.max_lag,
+            "stalls": list(self.stalls),
+            "slow_callbacks": list(self.slow),
+        }
@@ -0,0 +1,184 @@
+"""
+Memory diagnostics
+
+Traces allocations with tracemalloc and writes a report per snapshot to
+out_dir: the top allocation sites by file and line that grew since the
+last snapshot, the size of the voter's state containers and the number
+of live objects of the types known to pile up. Snapshots are taken
+every interval seconds and on GET /debug/memory next to the metrics.
+
+    {"ts": ..., "rss": ..., "traced": ..., "top": [
+        {"site": "oracle_voter/oracle/machine2.py:412",
+         "size_diff": 10240, "size": 20480, "count_diff": 12}],
+     "containers": {"terravaloper1...:prior_prevotes": 210},
+     "objects": {"ClientSession": 1, "Task": 9}}
+"""
+import asyncio
+import gc
+import os
+import time
+import tracemalloc
+from collections import Counter
+
+import simplejson as json
+
+# Frames kept per allocation, only the innermost is reported
+TRACE_FRAMES = 1
+
+# Containers on the Oracle that live as long as the process
+ORACLE_CONTAINERS = (
+    "prior_prevotes",
+    "hash_map",
+    "hist_hash_map",
+    "hist_votes",
+    "hist_prevotes",
+    "q_vote_tx_hash",
+    "q_prevote_tx_hash",
+)
+
+# Live objects counted by type name
+TRACKED_TYPES = (
+    "ClientSession",
+    "TCPConnector",
+    "ClientResponse",
+    "Task",
+    "Future",
+    "Transaction",
+)
+
+IGNORED_FILES = (
+    tracemalloc.__file__,
+    "<frozen importlib._bootstrap>",
+    "<frozen importlib._bootstrap_external>",
+    "<unknown>",
+)
+
+
+def rss_bytes():
+    # Resident set size, only on Linux
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def container_size(container):
+    # Nested dicts such as hist_hash_map count their inner entries
+    size = len(container)
+    if isinstance(container, dict):
+        size += sum(
+            len(value) for value in container.values()
+            if isinstance(value, dict)
+        )
+    return size
+
+
+def count_objects(type_names=TRACKED_TYPES):
+    counts = Counter()
+    wanted = set(type_names)
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in wanted:
+            counts[name] += 1
+    return {name: counts.get(name, 0) for name in type_names}
+
+
+class MemoryDiagnostics:
+
+    def __init__(self, out_dir, top=25, interval=None):
+        self.out_dir = out_dir
+        self.top = top
+        self.interval = interval
+        self.containers = dict()
+        self.previous = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+        self.previous = self.take()
+        return self
+
+    def watch(self, name, container):
+        self.containers[name] = container
+
+    def watch_oracle(self, oracle):
+        for attr in ORACLE_CONTAINERS:
+            self.watch(
+                f"{oracle.validator_addr}:{attr}",
+                # Looked up on every report, some are replaced over time
+                lambda oracle=oracle, attr=attr: getattr(oracle, attr),
+            )
+
+    def take(self):
+        return tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, filename)
+            for filename in IGNORED_FILES
+        ])
+
+    def container_sizes(self):
+        sizes = dict()
+        for name, container in self.containers.items():
+            if callable(container):
+                container = container()
+            sizes[name] = container_size(container)
+        return sizes
+
+    def report(self):
+        if self.previous is None:
+            self.start()
+        snapshot = self.take()
+        stats = snapshot.compare_to(self.previous, "lineno")
+        self.previous = snapshot
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "ts": time.time(),
+            "rss": rss_bytes(),
+            "traced": traced,
+            "traced_peak": peak,
+            "top": [{
+                "site": f"{stat.traceback[0].filename}:"
+                        f"{stat.traceback[0].lineno}",
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            } for stat in stats[0:self.top]],
+            "containers": self.container_sizes(),
+            "objects": count_objects(),
+        }
+
+    def write(self, report):
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(
+            self.out_dir,
+            f"memory-{int(report['ts'] * 1000)}.json",
+        )
+        with open(path, "w") as out:
+            out.write(json.dumps(report, indent=2))
+        return path
+
+    def dump(self):
+        report = self.report()
+        path = self.write(report)
+        growth = sum(row["size_diff"] for row in report["top"])
+        print(f"Memory report {path}: top sites grew {growth} bytes")
+        return report
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.dump()
+            except OSError as err:
+                print(f"Unable to write memory report: {err}")
+
+    async def handle(self, request):
+        # GET /debug/memory, also written to out_dir
+        from aiohttp import web
+        report = self.dump()
+        return web.Response(
+            body=json.dumps(report, indent=2).encode("utf-8"),
+            content_type="application/json",
+        )
@@ -0,0 +1,218 @@
+"""
+Metrics
+
+Counters, gauges and histograms kept in a registry and rendered in the
+Prometheus text format, served on /metrics with serve(port). Handlers
+given to add_route() are served by the same server.
+
+    REQUESTS = registry.counter("requests_total", "Requests", ("host",))
+    REQUESTS.inc(host="api.coinone.co.kr")
+"""
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+PREFIX = "oracle_voter_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a local LCD call up to a slow exchange
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n") \
+        .replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if len(pairs) == 0:
+        return ""
+    inner = ",".join(f'{name}="{escape(value)}"' for name, value in pairs)
+    return "{" + inner + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = PREFIX + name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values = dict()
+
+    def key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metric {self.name} takes labels {self.label_names}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def get(self, **labels):
+        return self.values.get(self.key(labels), None)
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, format_labels(self.label_names, key), value
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{labels} {format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self.values[self.key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=None):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        state = self.values.get(key, None)
+        if state is None:
+            # Per bucket counts, sum, count
+            state = [[0] * len(self.buckets), 0.0, 0]
+            self.values[key] = state
+        idx = bisect_left(self.buckets, value)
+        if idx < len(self.buckets):
+            state[0][idx] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        for key, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for le, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = format_labels(self.label_names, key, [("le", le)])
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = format_labels(
+                self.label_names,
+                key,
+                [("le", "+Inf")],
+            )
+            yield f"{self.name}_bucket", labels, count
+            labels = format_labels(self.label_names, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = dict()
+
+    def register(self, metric):
+        existing = self.metrics.get(metric.name, None)
+        if existing is not None:
+            if type(existing) is not type(metric) or \
+                    existing.label_names != metric.label_names:
+                raise ValueError(f"Metric {metric.name} already registered")
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter(name, help_text, label_names))
+
+    def gauge(self, name, help_text, label_names=()):
+        return self.register(Gauge(name, help_text, label_names))
+
+    def histogram(self, name, help_text, label_names=(), buckets=None):
+        return self.register(
+            Histogram(name, help_text, label_names, buckets),
+        )
+
+    def render(self):
+        return "\n".join(
+            metric.render() for metric in self.metrics.values()
+        ) + "\n"
+
+
+registry = Registry()
+# Extra GET handlers served next to /metrics, e.g. debug dumps
+routes = dict()
+
+
+def add_route(path, handler):
+    routes[path] = handler
+
+
+def timed(histogram, label="name", **labels):
+    # Times an async function, labelled with the function name
+    def decorator(func):
+        func_labels = dict(labels)
+        func_labels[label] = func.__name__
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            with histogram.time(**func_labels):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def serve(port, host="127.0.0.1", metrics_registry=None):
+    from aiohttp import web
+    metrics_registry = metrics_registry or registry
+
+    async def handle(request):
+        return web.Response(
+            body=metrics_registry.render().encode("utf-8"),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    for path, handler in routes.items():
+        app.router.add_get(path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
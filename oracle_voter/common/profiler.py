@@ -0,0 +1,166 @@
+"""
+On demand profiling
+
+SIGUSR1 starts a cProfile session and SIGUSR2 a sampling session; the
+same signal again stops it early. A session otherwise stops on its own
+after `periods` vote periods and is written to out_dir, cProfile as a
+.pstats file and samples as collapsed stacks for flamegraph.pl or
+speedscope
+
+    kill -USR2 $(pgrep -f oracle_voter)
+
+Nothing runs until a signal arrives, the Oracle only tells the profiler
+about each new vote period.
+"""
+import cProfile
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+CPROFILE = "cprofile"
+SAMPLING = "sampling"
+
+SIGNALS = {
+    CPROFILE: "SIGUSR1",
+    SAMPLING: "SIGUSR2",
+}
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class Sampler:
+    # Samples the stack of one thread from a background thread
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.run,
+            name="profile-sampler",
+            daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id, None)
+            stack = list()
+            while frame is not None:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if len(stack) > 0:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in self.counts.most_common()
+        )
+
+
+class Profiler:
+
+    def __init__(self, out_dir=None, periods=3, sample_interval=0.005):
+        self.out_dir = out_dir or os.path.join(
+            tempfile.gettempdir(),
+            "oracle_voter_profiles",
+        )
+        self.periods = periods
+        self.sample_interval = sample_interval
+        self.mode = None
+        self.session = None
+        self.started_at = None
+        self.first_period = None
+        self.last_period = None
+
+    def install(self, loop):
+        # Not available on every platform, profiling is optional
+        for mode, name in SIGNALS.items():
+            signum = getattr(signal, name, None)
+            if signum is None:
+                continue
+            try:
+                loop.add_signal_handler(signum, self.toggle, mode)
+            except (NotImplementedError, RuntimeError):
+                return False
+        return True
+
+    def toggle(self, mode):
+        if self.mode is None:
+            self.start(mode)
+        elif self.mode == mode:
+            self.stop()
+        else:
+            print(f"Profiler busy with a {self.mode} session")
+
+    def start(self, mode):
+        self.mode = mode
+        self.started_at = time.time()
+        self.first_period = None
+        self.last_period = None
+        if mode == CPROFILE:
+            self.session = cProfile.Profile()
+            self.session.enable()
+        else:
+            self.session = Sampler(threading.get_ident(), self.sample_interval)
+            self.session.start()
+        print(f"Profiling ({mode}) for {self.periods} vote periods")
+
+    def new_vote_period(self, vote_period):
+        if self.mode is None:
+            return
+        if self.first_period is None:
+            self.first_period = vote_period
+        # Stops as the period after the last one profiled starts
+        if vote_period >= self.first_period + self.periods:
+            self.stop()
+            return
+        self.last_period = vote_period
+
+    def stop(self):
+        if self.mode is None:
+            return None
+        mode, session = self.mode, self.session
+        self.mode = None
+        self.session = None
+        if mode == CPROFILE:
+            session.disable()
+        else:
+            session.stop()
+        name = f"{mode}-{int(self.started_at)}"
+        if self.first_period is not None:
+            name += f"-vp{self.first_period}-{self.last_period}"
+        try:
+            os.makedirs(self.out_dir, exist_ok=True)
+            if mode == CPROFILE:
+                path = os.path.join(self.out_dir, name + ".pstats")
+                session.dump_stats(path)
+            else:
+                path = os.path.join(self.out_dir, name + ".collapsed")
+                with open(path, "w") as out:
+                    out.write(session.collapsed())
+        except OSError as err:
+            # Runs on a period boundary, never takes the voter down
+            print(f"Unable to write profile to {self.out_dir}: {err}")
+            return None
+        print(f"Profile written to {path}")
+        return path
+
+
+profiler = Profiler()
@@ -0,0 +1,132 @@
+"""
+Per host rate limiting
+
+Each limited host gets a token bucket refilled at `rate` requests per
+second up to `burst`. A request takes its token before waiting for it,
+so concurrent requests queue behind each other. It waits at most
+max_wait seconds for a token, otherwise it fails with RateLimited so the
+caller can fall back to what it already has. A 429 or Retry-After from a
+limited host blocks it for the given time. Other hosts, e.g. the node,
+are never blocked, a proxy's Retry-After must not stop block polls and
+broadcasts.
+"""
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from oracle_voter.common.errors import HttpError
+
+# Seconds a 429 without Retry-After blocks the host
+DEFAULT_RETRY_AFTER = 1.0
+
+
+class RateLimited(HttpError):
+    def __init__(self, host, retry_after):
+        super().__init__(
+            f"Rate limited by {host}, retry in {retry_after:.2f}s",
+            429,
+            None,
+        )
+        self.host = host
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value, now=None):
+    # Either delay seconds or an HTTP date
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at - (now or time.time()), 0.0)
+
+
+def parse_limit(text):
+    # "api.coinone.co.kr=5/10" as host, rate per second and burst
+    host, _, limit = text.partition("=")
+    rate, _, burst = limit.partition("/")
+    if not host or not rate:
+        raise ValueError(f"Rate limit {text} is not HOST=RATE[/BURST]")
+    rate = float(rate)
+    return host, rate, float(burst) if burst else max(rate, 1.0)
+
+
+class TokenBucket:
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def refill(self, now):
+        elapsed = now - self.updated
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        # Seconds until a token is available
+        blocked = max(self.blocked_until - now, 0.0)
+        self.refill(now)
+        if self.tokens >= 1:
+            return blocked
+        return max(blocked, (1 - self.tokens) / self.rate)
+
+    def take(self):
+        self.tokens -= 1
+
+    def block(self, now, seconds):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class RateLimiter:
+
+    def __init__(self, max_wait=0.25):
+        self.max_wait = max_wait
+        self.buckets = dict()
+
+    def now(self):
+        # Loop time, so a virtual clock also moves the buckets on
+        return asyncio.get_event_loop().time()
+
+    def set_limit(self, host, rate, burst=None):
+        self.buckets[host] = TokenBucket(
+            rate,
+            burst or max(rate, 1.0),
+            self.now(),
+        )
+
+    async def acquire(self, url):
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host, None)
+        if bucket is None:
+            return
+        wait = bucket.wait_time(self.now())
+        if wait > self.max_wait:
+            raise RateLimited(host, wait)
+        # Reserved before waiting, the tokens go negative so later callers
+        # wait for the ones ahead of them too
+        bucket.take()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttled(self, url, retry_after=None):
+        # Called on a 429 or a Retry-After header
+        host = urlsplit(url).netloc
+        seconds = retry_after
+        if seconds is None:
+            seconds = DEFAULT_RETRY_AFTER
+        bucket = self.buckets.get(host, None)
+        if bucket is not None:
+            bucket.block(self.now(), seconds)
+        return RateLimited(host, seconds)
+
+
+limiter = RateLimiter()
@@ -0,0 +1,191 @@
+"""
+Request recorder
+
+Records every request made through common.client, with its status,
+latency and response body, as gzipped JSON lines
+
+    {"ts": 1579497600.12, "method": "GET",
+     "url": "http://127.0.0.1:1317/blocks/latest", "params": {},
+     "data": null, "status": 200, "latency": 0.004, "body": "{...}",
+     "error": null}
+
+Requests only queue their record, a background thread compresses and
+writes them. After max_bytes (uncompressed) the file is rotated to .1,
+.2 ... keeping `backups` old files. Records are dropped rather than
+slowing down requests when the queue is full.
+"""
+import gzip
+import os
+import queue
+import threading
+import time
+import zlib
+
+import simplejson as json
+
+from oracle_voter.common.metrics import registry
+
+RECORDS_DROPPED = registry.counter(
+    "recorder_dropped_total",
+    "Request records dropped as the recorder fell behind",
+)
+
+# Ends the writer thread
+STOP = object()
+
+
+def rotated(path, idx):
+    return f"{path}.{idx}"
+
+
+def read_records(path):
+    # Records of one recording file, oldest first
+    with gzip.open(path, "rt") as source:
+        try:
+            for line in source:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Cut off mid record when the process died
+                    return
+        except (EOFError, zlib.error):
+            # Never closed, readable up to the last flush
+            return
+
+
+def read_recording(path):
+    # Rotated files first, they are older
+    paths = list()
+    idx = 1
+    while os.path.exists(rotated(path, idx)):
+        paths.insert(0, rotated(path, idx))
+        idx += 1
+    if os.path.exists(path):
+        paths.append(path)
+    for recording in paths:
+        yield from read_records(recording)
+
+
+class Recorder:
+
+    def __init__(
+        self,
+        path,
+        max_bytes=64 * 1024 * 1024,
+        backups=5,
+        queue_size=10000,
+        flush_interval=1.0,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.out = None
+        self.written = 0
+        self.thread = None
+
+    @classmethod
+    def install(cls, path, **kwargs):
+        # Records every request made through common.client
+        from oracle_voter.common import client
+        client.recorder = cls(path, **kwargs).start()
+        return client.recorder
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.run,
+            name="request-recorder",
+            daemon=True,
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.queue.put(STOP)
+        self.thread.join()
+
+    def record(
+        self,
+        method,
+        url,
+        params,
+        data,
+        status,
+        latency,
+        body,
+        error=None,
+    ):
+        try:
+            self.queue.put_nowait({
+                "ts": time.time(),
+                "method": method,
+                "url": url,
+                "params": params,
+                "data": data,
+                "status": status,
+                "latency": latency,
+                "body": body,
+                "error": error,
+            })
+        except queue.Full:
+            RECORDS_DROPPED.inc()
+
+    """
+    Writer thread
+    """
+
+    def open(self):
+        if self.out is None:
+            self.out = gzip.open(self.path, "at")
+            # Uncompressed, an existing file is appended to as a new member
+            self.written = 0
+        return self.out
+
+    def close(self):
+        if self.out is not None:
+            self.out.close()
+            self.out = None
+
+    def rotate(self):
+        self.close()
+        oldest = rotated(self.path, self.backups)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for idx in range(self.backups - 1, 0, -1):
+            older = rotated(self.path, idx)
+            if os.path.exists(older):
+                os.replace(older, rotated(self.path, idx + 1))
+        if self.backups > 0:
+            os.replace(self.path, rotated(self.path, 1))
+        else:
+            os.remove(self.path)
+
+    def write(self, row):
+        line = json.dumps(row) + "\n"
+        self.open().write(line)
+        self.written += len(line)
+        if self.written >= self.max_bytes:
+            self.rotate()
+
+    def run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                row = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                row = None
+            if row is STOP:
+                break
+            try:
+                if row is not None:
+                    self.write(row)
+                if self.out is not None and \
+                        time.monotonic() - last_flush >= self.flush_interval:
+                    # Readable up to here if the process dies
+                    self.out.flush()
+                    last_flush = time.monotonic()
+            except OSError as err:
+                print(f"Unable to record to {self.path}: {err}")
+                self.close()
+        self.close()
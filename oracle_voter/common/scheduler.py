@@ -0,0 +1,187 @@
+"""
+Outbound request scheduler
+
+Every request made through common.client waits here for a slot. Slots
+go to the highest priority class first, within the per class limits.
+The priority of a request comes from the context it is made in
+
+    with scheduler.priority(scheduler.BROADCAST):
+        await lcd_node.broadcast_tx_async(tx)
+
+Confirmations and housekeeping are shed with RequestShed, an HttpError,
+once the deadline, the time the next prevote has to be broadcast by, is
+closer than shed_window seconds, so they never hold it up. Requests
+still queued at that point are shed as well.
+"""
+import asyncio
+import heapq
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+
+from oracle_voter.common.errors import HttpError
+
+# Priority classes, lower goes first
+BROADCAST = 0
+PRICE_FETCH = 1
+REVEAL_LOOKUP = 2
+CONFIRMATION = 3
+HOUSEKEEPING = 4
+
+CLASS_NAMES = {
+    BROADCAST: "broadcast",
+    PRICE_FETCH: "price_fetch",
+    REVEAL_LOOKUP: "reveal_lookup",
+    CONFIRMATION: "confirmation",
+    HOUSEKEEPING: "housekeeping",
+}
+
+DEFAULT_LIMITS = {
+    BROADCAST: 4,
+    PRICE_FETCH: 8,
+    REVEAL_LOOKUP: 8,
+    CONFIRMATION: 8,
+    HOUSEKEEPING: 2,
+}
+
+# Requests made outside of any priority block
+current_priority = ContextVar("request_priority", default=REVEAL_LOOKUP)
+
+
+@contextmanager
+def priority(request_class):
+    token = current_priority.set(request_class)
+    try:
+        yield request_class
+    finally:
+        current_priority.reset(token)
+
+
+class RequestShed(HttpError):
+    def __init__(self, request_class):
+        super().__init__(
+            f"{CLASS_NAMES[request_class]} request shed near deadline",
+            503,
+            None,
+        )
+        self.request_class = request_class
+
+
+class Scheduler:
+
+    def __init__(
+        self,
+        max_active=16,
+        limits=None,
+        shed_classes=(CONFIRMATION, HOUSEKEEPING),
+        shed_window=1.0,
+    ):
+        self.max_active = max_active
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.shed_classes = frozenset(shed_classes)
+        self.shed_window = shed_window
+        self.deadline = None
+        # Sheds the queue once the deadline gets near
+        self.shed_handle = None
+
+        self.active = {request_class: 0 for request_class in CLASS_NAMES}
+        self.total_active = 0
+        # Heap of (priority, order, future)
+        self.waiting = list()
+        self.order = count()
+        self.shed_counts = {request_class: 0 for request_class in CLASS_NAMES}
+
+    def now(self):
+        return asyncio.get_event_loop().time()
+
+    def set_deadline(self, deadline):
+        # Loop time the next prevote has to be broadcast by
+        self.deadline = deadline
+        if self.shed_handle is not None:
+            self.shed_handle.cancel()
+            self.shed_handle = None
+        if deadline is None:
+            return
+        if self.near_deadline():
+            self.shed_waiting()
+        else:
+            self.shed_handle = asyncio.get_event_loop().call_at(
+                deadline - self.shed_window,
+                self.shed_waiting,
+            )
+
+    def near_deadline(self):
+        if self.deadline is None:
+            return False
+        return self.deadline - self.now() < self.shed_window
+
+    def can_start(self, request_class):
+        return self.total_active < self.max_active and \
+            self.active[request_class] < self.limits[request_class]
+
+    def start(self, request_class):
+        self.active[request_class] += 1
+        self.total_active += 1
+
+    def shed(self, request_class):
+        self.shed_counts[request_class] += 1
+        return RequestShed(request_class)
+
+    async def acquire(self, request_class):
+        if request_class in self.shed_classes and self.near_deadline():
+            raise self.shed(request_class)
+        # Waiters left behind are at their own class limit
+        if self.can_start(request_class):
+            self.start(request_class)
+            return
+        future = asyncio.get_event_loop().create_future()
+        heapq.heappush(
+            self.waiting,
+            (request_class, next(self.order), future),
+        )
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled() and \
+                    future.exception() is None:
+                # Slot was handed over as the waiter got cancelled
+                self.release(request_class)
+            raise
+
+    def release(self, request_class):
+        self.active[request_class] -= 1
+        self.total_active -= 1
+        self.wake()
+
+    def wake(self):
+        blocked = list()
+        while len(self.waiting) > 0 and self.total_active < self.max_active:
+            item = heapq.heappop(self.waiting)
+            request_class, _, future = item
+            if future.done():
+                continue
+            if self.active[request_class] < self.limits[request_class]:
+                self.start(request_class)
+                future.set_result(True)
+            else:
+                # At its class limit, lower classes may still go
+                blocked.append(item)
+        for item in blocked:
+            heapq.heappush(self.waiting, item)
+
+    def shed_waiting(self):
+        kept = list()
+        for item in self.waiting:
+            request_class, _, future = item
+            if future.done():
+                continue
+            if request_class in self.shed_classes:
+                future.set_exception(self.shed(request_class))
+            else:
+                kept.append(item)
+        heapq.heapify(kept)
+        self.waiting = kept
+
+
+scheduler = Scheduler()
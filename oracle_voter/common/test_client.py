@@ -1,6 +1,9 @@
 import pytest
 import asyncio
 from unittest.mock import patch
+from aiohttp import web
+from oracle_voter.chain.core import LCDNode
+from oracle_voter.chain.mocks.fixture_utils import mock_block_data
 from oracle_voter.common.fixtures_client import (
     SessionOk,
     Session404,
@@ -10,7 +13,17 @@ from oracle_voter.common.fixtures_client import (
     SessionExceptJSONDecode,
 )
 
-from oracle_voter.common.client import HttpError, http_get, http_post
+from oracle_voter.common.client import (
+    HttpError,
+    MemoryTransport,
+    UnixTransport,
+    default_transport,
+    http_get,
+    http_post,
+    mount,
+    transport_for,
+    unmount,
+)
 
 
 @patch("oracle_voter.common.client.aiohttp")
@@ -111,3 +124,63 @@ def test_post_except_connector_error(mock):
     with pytest.raises(HttpError):
         loop.run_until_complete(http_post(url))
 
+
+
+def memory_handler(calls):
+    async def handler(method, url, params, data):
+        calls.append((method, url, params, data))
+        if url.endswith("/missing"):
+            return 404, {"error": "not found"}
+        return 200, {"method": method}
+    return handler
+
+
+def test_memory_transport_mount():
+    calls = []
+    transport = MemoryTransport(memory_handler(calls))
+    mount("http://lcd", transport)
+    mount("http://lcd/txs", MemoryTransport(memory_handler([])))
+    try:
+        assert transport_for("http://lcd/blocks/latest") is transport
+        assert transport_for("http://lcd/txs") is not transport
+        assert transport_for("http://google.com") is default_transport
+        loop = asyncio.get_event_loop()
+        result = loop.run_until_complete(http_get("http://lcd/blocks/latest"))
+        assert result == {"method": "GET"}
+        result = loop.run_until_complete(
+            http_post("http://lcd/oracle", post_data="{}"),
+        )
+        assert result == {"method": "POST"}
+        assert calls[1] == ("POST", "http://lcd/oracle", {}, "{}")
+        with pytest.raises(HttpError) as err:
+            loop.run_until_complete(http_get("http://lcd/missing"))
+        assert err.value.status_code == 404
+        assert err.value.result == {"error": "not found"}
+    finally:
+        unmount("http://lcd")
+        unmount("http://lcd/txs")
+    assert transport_for("http://lcd/blocks/latest") is default_transport
+
+
+def test_lcd_node_over_unix_socket(tmpdir):
+    path = str(tmpdir.join("lcd.sock"))
+
+    async def latest(request):
+        return web.json_response(mock_block_data(18549, "AA", "BB"))
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/blocks/latest", latest)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.UnixSite(runner, path).start()
+        try:
+            node = LCDNode("http://unix-lcd", transport=UnixTransport(path))
+            return await node.get_latest_block()
+        finally:
+            unmount("http://unix-lcd")
+            await runner.cleanup()
+
+    loop = asyncio.get_event_loop()
+    block = loop.run_until_complete(run())
+    assert block["block_meta"]["header"]["height"] == "18549"
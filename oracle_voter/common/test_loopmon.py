@@ -0,0 +1,51 @@
+import asyncio
+import time
+
+from oracle_voter.common.loopmon import SLOW_CALLBACKS, LoopMonitor
+
+
+def sign_blocking():
+    # Stands in for a terracli call holding the loop
+    time.sleep(0.3)
+
+
+def test_stall_is_blamed_on_blocking_code():
+    loop = asyncio.get_event_loop()
+    monitor = LoopMonitor(interval=0.02, threshold=0.1)
+
+    async def vote():
+        await asyncio.sleep(0.05)
+        sign_blocking()
+        await asyncio.sleep(0.05)
+
+    async def run():
+        monitor.start()
+        try:
+            await vote()
+        finally:
+            monitor.stop()
+
+    loop.run_until_complete(run())
+    assert monitor.max_lag >= 0.25
+    (stall,) = monitor.stalls
+    assert stall["site"] == "test_loopmon.py:sign_blocking"
+    assert any("time.sleep(0.3)" in line for line in stall["stack"])
+    (slow,) = monitor.slow
+    # asyncio names the task coroutine, the stack names the call
+    assert slow["callback"].endswith(".run")
+    assert slow["duration"] >= 0.25
+    assert SLOW_CALLBACKS.get(callback=slow["callback"]) >= 1
+    assert loop.get_debug() is False
+
+
+def test_no_stall_under_threshold():
+    monitor = LoopMonitor(interval=0.02, threshold=0.2)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        monitor.stop()
+
+    asyncio.get_event_loop().run_until_complete(run())
+    assert len(monitor.stalls) == 0
+    assert monitor.max_lag < 0.2
@@ -0,0 +1,81 @@
+import asyncio
+import os
+import tracemalloc
+
+import aiohttp
+import simplejson as json
+
+from oracle_voter.common import metrics
+from oracle_voter.common.memdiag import MemoryDiagnostics, count_objects
+
+
+class StubOracle:
+    def __init__(self):
+        self.validator_addr = "terravaloper1"
+        self.prior_prevotes = dict()
+        self.hash_map = dict()
+        self.hist_hash_map = {"ukrw": {"ab": "1a2b", "cd": "3c4d"}}
+        self.hist_votes = dict()
+        self.hist_prevotes = dict()
+        self.q_vote_tx_hash = list()
+        self.q_prevote_tx_hash = list()
+
+
+def leak(store):
+    # 200 entries of 1KiB from one line
+    for idx in range(200):
+        store[idx] = bytearray(1024)
+
+
+def test_report_finds_growth(tmpdir):
+    oracle = StubOracle()
+    diagnostics = MemoryDiagnostics(str(tmpdir), top=5).start()
+    try:
+        diagnostics.watch_oracle(oracle)
+        leak(oracle.prior_prevotes)
+        report = diagnostics.dump()
+    finally:
+        tracemalloc.stop()
+
+    top = report["top"][0]
+    assert "test_memdiag.py" in top["site"]
+    assert top["size_diff"] >= 200 * 1024
+    containers = report["containers"]
+    assert containers["terravaloper1:prior_prevotes"] == 200
+    assert containers["terravaloper1:hist_hash_map"] == 3
+    assert "Task" in report["objects"]
+    (name,) = os.listdir(str(tmpdir))
+    with open(str(tmpdir.join(name))) as source:
+        assert json.loads(source.read())["top"][0] == top
+
+
+def test_count_objects():
+    oracles = [StubOracle() for _ in range(3)]
+    counts = count_objects(("StubOracle", "NoSuchType"))
+    assert counts == {"StubOracle": 3, "NoSuchType": 0}
+    assert len(oracles) == 3
+
+
+def test_debug_endpoint(tmpdir):
+    diagnostics = MemoryDiagnostics(str(tmpdir))
+
+    async def run():
+        metrics.add_route("/debug/memory", diagnostics.handle)
+        runner = await metrics.serve(0)
+        try:
+            port = runner.addresses[0][1]
+            async with aiohttp.ClientSession() as session:
+                resp = await session.get(
+                    f"http://127.0.0.1:{port}/debug/memory",
+                )
+                return await resp.json()
+        finally:
+            metrics.routes.pop("/debug/memory")
+            await runner.cleanup()
+
+    try:
+        report = asyncio.get_event_loop().run_until_complete(run())
+    finally:
+        tracemalloc.stop()
+    assert report["traced"] > 0
+    assert len(os.listdir(str(tmpdir))) == 1
@@ -0,0 +1,91 @@
+import asyncio
+import aiohttp
+import pytest
+
+from oracle_voter.common import client, metrics
+from oracle_voter.common.client import MemoryTransport, http_get
+from oracle_voter.common.metrics import Registry, timed
+
+
+def test_counter_and_gauge():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("host",))
+    requests.inc(host="a")
+    requests.inc(2, host="a")
+    height = registry.gauge("height", "Height")
+    height.set(1204)
+    assert requests.get(host="a") == 3
+    assert registry.counter("requests_total", "Requests", ("host",)) \
+        is requests
+    with pytest.raises(ValueError):
+        requests.inc(denom="ukrw")
+    with pytest.raises(ValueError):
+        registry.gauge("requests_total", "Requests", ("host",))
+    assert registry.render() == "\n".join([
+        "# HELP oracle_voter_requests_total Requests",
+        "# TYPE oracle_voter_requests_total counter",
+        'oracle_voter_requests_total{host="a"} 3',
+        "# HELP oracle_voter_height Height",
+        "# TYPE oracle_voter_height gauge",
+        "oracle_voter_height 1204",
+    ]) + "\n"
+
+
+def test_histogram():
+    registry = Registry()
+    blocks = registry.histogram(
+        "inclusion_blocks",
+        "Blocks",
+        ("tx_type",),
+        buckets=(1, 2, 5),
+    )
+    for value in (1, 2, 2, 9):
+        blocks.observe(value, tx_type="vote")
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'oracle_voter_inclusion_blocks_bucket{tx_type="vote",le="1"} 1',
+        'oracle_voter_inclusion_blocks_bucket{tx_type="vote",le="2"} 3',
+        'oracle_voter_inclusion_blocks_bucket{tx_type="vote",le="5"} 3',
+        'oracle_voter_inclusion_blocks_bucket{tx_type="vote",le="+Inf"} 4',
+        'oracle_voter_inclusion_blocks_sum{tx_type="vote"} 14',
+        'oracle_voter_inclusion_blocks_count{tx_type="vote"} 4',
+    ]
+
+
+def test_timed():
+    registry = Registry()
+    seconds = registry.histogram("call_seconds", "Calls", ("endpoint",))
+
+    @timed(seconds, label="endpoint")
+    async def get_status():
+        return "ok"
+
+    result = asyncio.get_event_loop().run_until_complete(get_status())
+    assert result == "ok"
+    assert get_status.__name__ == "get_status"
+    assert seconds.get(endpoint="get_status")[2] == 1
+
+
+def test_serve_and_client_metrics():
+    async def handler(method, url, params, data):
+        return 200, {"height": "10"}
+
+    async def run():
+        client.mount("http://metrics.test", MemoryTransport(handler))
+        runner = await metrics.serve(0)
+        try:
+            await http_get("http://metrics.test/blocks/latest")
+            port = runner.addresses[0][1]
+            async with aiohttp.ClientSession() as session:
+                resp = await session.get(f"http://127.0.0.1:{port}/metrics")
+                return resp.headers["Content-Type"], await resp.text()
+        finally:
+            client.unmount("http://metrics.test")
+            await runner.cleanup()
+
+    content_type, text = asyncio.get_event_loop().run_until_complete(run())
+    assert content_type == metrics.CONTENT_TYPE
+    assert 'oracle_voter_http_requests_total{host="metrics.test",' \
+        'method="GET",status="200"} 1' in text
+    assert 'oracle_voter_http_request_seconds_count{host="metrics.test",' \
+        'method="GET"} 1' in text
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import pstats
+import signal
+import time
+
+from oracle_voter.common.profiler import CPROFILE, SAMPLING, Profiler
+
+
+def busy_hashing():
+    started = time.perf_counter()
+    while time.perf_counter() - started < 0.05:
+        sum(range(1000))
+
+
+def test_cprofile_covers_vote_periods(tmpdir):
+    profiler = Profiler(out_dir=str(tmpdir), periods=2)
+    profiler.new_vote_period(9)
+    profiler.start(CPROFILE)
+    for vote_period in (10, 11):
+        profiler.new_vote_period(vote_period)
+        busy_hashing()
+    assert profiler.mode == CPROFILE
+    profiler.new_vote_period(12)
+    assert profiler.mode is None
+
+    (name,) = os.listdir(str(tmpdir))
+    assert name.endswith("-vp10-11.pstats")
+    stats = pstats.Stats(str(tmpdir.join(name)))
+    functions = [func for _, _, func in stats.stats]
+    assert "busy_hashing" in functions
+
+
+def test_signal_toggles_sampling(tmpdir):
+    profiler = Profiler(out_dir=str(tmpdir), sample_interval=0.001)
+    loop = asyncio.get_event_loop()
+
+    async def run():
+        assert profiler.install(loop)
+        try:
+            os.kill(os.getpid(), signal.SIGUSR2)
+            await asyncio.sleep(0.01)
+            assert profiler.mode == SAMPLING
+            busy_hashing()
+            # cProfile waits for the sampling session
+            profiler.toggle(CPROFILE)
+            assert profiler.mode == SAMPLING
+            os.kill(os.getpid(), signal.SIGUSR2)
+            await asyncio.sleep(0.01)
+        finally:
+            loop.remove_signal_handler(signal.SIGUSR1)
+            loop.remove_signal_handler(signal.SIGUSR2)
+
+    loop.run_until_complete(run())
+    assert profiler.mode is None
+    (name,) = os.listdir(str(tmpdir))
+    assert name.endswith(".collapsed")
+    with open(str(tmpdir.join(name))) as source:
+        lines = source.read().splitlines()
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any("test_profiler.py:busy_hashing" in line for line in lines)
+
+
+def test_unwritable_dir_does_not_raise(tmpdir):
+    blocker = tmpdir.join("blocker")
+    blocker.write("")
+    profiler = Profiler(out_dir=str(blocker.join("profiles")), periods=1)
+    profiler.start(CPROFILE)
+    profiler.new_vote_period(10)
+    profiler.new_vote_period(11)
+    assert profiler.mode is None
+    profiler.start(SAMPLING)
+    assert profiler.stop() is None
@@ -0,0 +1,188 @@
+import asyncio
+import pytest
+
+from oracle_voter.common import client, scheduler
+from oracle_voter.common.client import MemoryTransport, http_get
+from oracle_voter.common.ratelimit import (
+    RateLimited,
+    RateLimiter,
+    limiter,
+    parse_limit,
+    parse_retry_after,
+)
+from oracle_voter.common.scheduler import RequestShed
+from oracle_voter.common.virtualclock import run_virtual
+from oracle_voter.feeds.base import FeedProvider, Quote
+from oracle_voter.markets.fixed import FixedPx
+
+
+def test_parse():
+    assert parse_limit("api.coinone.co.kr=5/10") == (
+        "api.coinone.co.kr",
+        5.0,
+        10.0,
+    )
+    assert parse_limit("api.ukfx.co.uk=0.5") == ("api.ukfx.co.uk", 0.5, 1.0)
+    with pytest.raises(ValueError):
+        parse_limit("api.ukfx.co.uk")
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after(None) is None
+    retry_after = parse_retry_after(
+        "Wed, 21 Oct 2015 07:28:05 GMT",
+        now=1445412480,
+    )
+    assert retry_after == 5.0
+
+
+def test_bucket_burst_then_limited():
+    rate_limiter = RateLimiter(max_wait=0.05)
+    rate_limiter.set_limit("api.coinone.co.kr", 10, 2)
+    url = "https://api.coinone.co.kr/orderbook/"
+
+    async def run():
+        await rate_limiter.acquire(url)
+        await rate_limiter.acquire(url)
+        # Next token in 0.1s
+        with pytest.raises(RateLimited):
+            await rate_limiter.acquire(url)
+        rate_limiter.max_wait = 0.2
+        await rate_limiter.acquire(url)
+        # Other hosts are not limited
+        await rate_limiter.acquire("https://api.ukfx.co.uk/pairs")
+
+    asyncio.get_event_loop().run_until_complete(run())
+
+
+def test_concurrent_acquirers_are_spaced():
+    rate_limiter = RateLimiter(max_wait=1.0)
+    rate_limiter.set_limit("api.coinone.co.kr", 20, 1)
+    url = "https://api.coinone.co.kr/orderbook/"
+    loop = asyncio.get_event_loop()
+
+    async def request():
+        await rate_limiter.acquire(url)
+        return loop.time()
+
+    async def run():
+        start = loop.time()
+        done = await asyncio.gather(*[request() for _ in range(4)])
+        return [at - start for at in done]
+
+    elapsed = loop.run_until_complete(run())
+    # One token every 0.05s, not all at once after the first wait
+    for n, at in enumerate(sorted(elapsed)):
+        assert 0.05 * n - 0.01 <= at < 0.05 * n + 0.04
+    # Every token was taken once
+    bucket = rate_limiter.buckets["api.coinone.co.kr"]
+    bucket.refill(rate_limiter.now())
+    assert -0.5 < bucket.tokens < 1
+
+
+def test_shed_request_keeps_its_token():
+    async def handler(method, url, params, data):
+        return 200, {}
+
+    client.mount("http://limited", MemoryTransport(handler))
+    limiter.set_limit("limited", 1, 1)
+    loop = asyncio.get_event_loop()
+    try:
+        scheduler.scheduler.set_deadline(scheduler.scheduler.now())
+        try:
+            with scheduler.priority(scheduler.CONFIRMATION):
+                with pytest.raises(RequestShed):
+                    loop.run_until_complete(http_get("http://limited/a"))
+        finally:
+            scheduler.scheduler.set_deadline(None)
+        assert limiter.buckets["limited"].tokens == 1
+        loop.run_until_complete(http_get("http://limited/b"))
+    finally:
+        client.unmount("http://limited")
+        limiter.buckets.pop("limited", None)
+
+
+def test_retry_after_blocks_host():
+    calls = []
+
+    async def handler(method, url, params, data):
+        calls.append(url)
+        return 429, "", {"Retry-After": "30"}
+
+    client.mount("http://throttled", MemoryTransport(handler))
+    client.mount("http://node", MemoryTransport(handler))
+    limiter.set_limit("throttled", 100)
+    loop = asyncio.get_event_loop()
+    try:
+        with pytest.raises(RateLimited) as err:
+            loop.run_until_complete(http_get("http://throttled/a"))
+        assert err.value.retry_after == 30.0
+        # Blocked without reaching the host
+        with pytest.raises(RateLimited):
+            loop.run_until_complete(http_get("http://throttled/b"))
+        assert calls == ["http://throttled/a"]
+        # Hosts without a limit, e.g. the node, are never blocked
+        for _ in range(2):
+            with pytest.raises(RateLimited):
+                loop.run_until_complete(http_get("http://node/blocks"))
+        assert calls[1:] == ["http://node/blocks", "http://node/blocks"]
+        assert "node" not in limiter.buckets
+    finally:
+        client.unmount("http://throttled")
+        client.unmount("http://node")
+        limiter.buckets.pop("throttled", None)
+
+
+class ThrottledFeed(FeedProvider):
+
+    def __init__(self):
+        super().__init__("throttled", "ukrw")
+        self.limited = False
+
+    async def fetch(self):
+        if self.limited:
+            raise RateLimited("throttled", 1.0)
+        return Quote(FixedPx.from_int(300))
+
+
+def test_feed_serves_last_quote_when_throttled():
+    feed = ThrottledFeed()
+    loop = asyncio.get_event_loop()
+    with_quote = loop.run_until_complete(feed.price())
+    feed.limited = True
+    assert loop.run_until_complete(feed.price()) == with_quote
+    # Too old to reuse
+    feed.last_quote_ts -= feed.max_quote_age + 1
+    with pytest.raises(RateLimited):
+        loop.run_until_complete(feed.price())
+
+
+def test_throttling_follows_virtual_clock():
+    calls = []
+
+    async def handler(method, url, params, data):
+        calls.append(url)
+        return 429, "", {"Retry-After": "30"}
+
+    feed = ThrottledFeed()
+
+    async def run():
+        limiter.set_limit("virtual", 100)
+        with pytest.raises(RateLimited):
+            await http_get("http://virtual/a")
+        # Blocked for 30s of virtual time, not of wall time
+        await asyncio.sleep(31)
+        with pytest.raises(RateLimited):
+            await http_get("http://virtual/b")
+        await feed.price()
+        feed.limited = True
+        await asyncio.sleep(60)
+        # Too old to stand in for the source any more
+        with pytest.raises(RateLimited):
+            await feed.price()
+
+    client.mount("http://virtual", MemoryTransport(handler))
+    try:
+        run_virtual(run())
+    finally:
+        client.unmount("http://virtual")
+        limiter.buckets.pop("virtual", None)
+    assert calls == ["http://virtual/a", "http://virtual/b"]
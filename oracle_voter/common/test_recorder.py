@@ -0,0 +1,105 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from oracle_voter.common import client
+from oracle_voter.common.client import HttpError, MemoryTransport, http_get
+from oracle_voter.common.recorder import (
+    Recorder,
+    read_recording,
+    read_records,
+)
+
+
+async def lcd_handler(method, url, params, data):
+    if url.endswith("/missing"):
+        return 404, {"error": "not found"}
+    return 200, {"block_meta": {"header": {"height": "18549"}}}
+
+
+def test_records_requests(tmpdir):
+    path = str(tmpdir.join("requests.jsonl.gz"))
+    recorder = Recorder.install(path)
+
+    async def run():
+        client.mount("http://recorded.test", MemoryTransport(lcd_handler))
+        try:
+            await http_get("http://recorded.test/blocks/latest")
+            with pytest.raises(HttpError):
+                await http_get("http://recorded.test/missing", {"a": "1"})
+        finally:
+            client.unmount("http://recorded.test")
+
+    try:
+        asyncio.get_event_loop().run_until_complete(run())
+    finally:
+        client.recorder = None
+        recorder.stop()
+
+    latest, missing = list(read_records(path))
+    assert latest["url"] == "http://recorded.test/blocks/latest"
+    assert latest["method"] == "GET"
+    assert latest["status"] == 200
+    assert latest["latency"] >= 0
+    assert latest["body"] == \
+        '{"block_meta": {"header": {"height": "18549"}}}'
+    assert missing["status"] == 404
+    assert missing["params"] == {"a": "1"}
+
+
+def test_reads_file_never_closed(tmpdir):
+    path = str(tmpdir.join("requests.jsonl.gz"))
+    recorder = Recorder(path, flush_interval=0.01).start()
+    try:
+        for idx in range(3):
+            recorder.record("GET", f"http://a/{idx}", {}, None, 200, 0.0, "")
+        time.sleep(0.2)
+        # Written and flushed, but without the gzip trailer
+        urls = [row["url"] for row in read_records(path)]
+        assert urls == ["http://a/0", "http://a/1", "http://a/2"]
+        with open(path, "rb") as source:
+            raw = source.read()
+        torn = str(tmpdir.join("torn.jsonl.gz"))
+        with open(torn, "wb") as out:
+            out.write(raw[:-8])
+        assert len(list(read_records(torn))) < 3
+    finally:
+        recorder.stop()
+
+
+def test_rotation_keeps_backups(tmpdir):
+    path = str(tmpdir.join("requests.jsonl.gz"))
+    recorder = Recorder(path, max_bytes=500, backups=2).start()
+    for idx in range(17):
+        recorder.record(
+            "GET",
+            f"http://127.0.0.1:1317/txs/{idx}",
+            {},
+            None,
+            200,
+            0.001,
+            "x" * 100,
+        )
+    recorder.stop()
+
+    assert sorted(os.listdir(str(tmpdir))) == [
+        "requests.jsonl.gz",
+        "requests.jsonl.gz.1",
+        "requests.jsonl.gz.2",
+    ]
+    urls = [row["url"] for row in read_recording(path)]
+    # Oldest rotated away, the rest in order
+    first = 17 - len(urls)
+    assert first > 0
+    assert urls == [
+        f"http://127.0.0.1:1317/txs/{idx}" for idx in range(first, 17)
+    ]
+
+
+def test_full_queue_drops(tmpdir):
+    recorder = Recorder(str(tmpdir.join("r.gz")), queue_size=1)
+    recorder.record("GET", "http://a", {}, None, 200, 0.0, "")
+    recorder.record("GET", "http://b", {}, None, 200, 0.0, "")
+    assert recorder.queue.qsize() == 1
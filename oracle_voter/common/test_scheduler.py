@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+
+from oracle_voter.common import client, scheduler
+from oracle_voter.common.client import MemoryTransport, http_get
+from oracle_voter.common.scheduler import (
+    BROADCAST,
+    PRICE_FETCH,
+    REVEAL_LOOKUP,
+    CONFIRMATION,
+    HOUSEKEEPING,
+    RequestShed,
+    Scheduler,
+)
+
+
+async def run_in_order(sched, request_classes):
+    started = []
+
+    async def request(request_class):
+        await sched.acquire(request_class)
+        started.append(request_class)
+        await asyncio.sleep(0)
+        sched.release(request_class)
+
+    # Saturate the scheduler so everything queues
+    await sched.acquire(BROADCAST)
+    tasks = [
+        asyncio.ensure_future(request(request_class))
+        for request_class in request_classes
+    ]
+    await asyncio.sleep(0)
+    sched.release(BROADCAST)
+    await asyncio.gather(*tasks)
+    return started
+
+
+def test_highest_priority_goes_first():
+    sched = Scheduler(max_active=1)
+    loop = asyncio.get_event_loop()
+    started = loop.run_until_complete(run_in_order(sched, [
+        HOUSEKEEPING,
+        CONFIRMATION,
+        BROADCAST,
+        REVEAL_LOOKUP,
+        PRICE_FETCH,
+        BROADCAST,
+    ]))
+    assert started == [
+        BROADCAST,
+        BROADCAST,
+        PRICE_FETCH,
+        REVEAL_LOOKUP,
+        CONFIRMATION,
+        HOUSEKEEPING,
+    ]
+    assert sched.total_active == 0
+
+
+def test_class_limits():
+    sched = Scheduler(max_active=4, limits={CONFIRMATION: 1})
+
+    async def run():
+        await sched.acquire(CONFIRMATION)
+        waiter = asyncio.ensure_future(sched.acquire(CONFIRMATION))
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        # Other classes are not held up by the confirmation limit
+        await sched.acquire(PRICE_FETCH)
+        sched.release(CONFIRMATION)
+        await waiter
+        assert sched.active[CONFIRMATION] == 1
+
+    asyncio.get_event_loop().run_until_complete(run())
+
+
+def test_shed_near_deadline():
+    sched = Scheduler(max_active=1, shed_window=1.0)
+
+    async def run():
+        await sched.acquire(BROADCAST)
+        waiting = [
+            asyncio.ensure_future(sched.acquire(request_class))
+            for request_class in (CONFIRMATION, PRICE_FETCH)
+        ]
+        await asyncio.sleep(0)
+        sched.set_deadline(sched.now() + 0.5)
+        with pytest.raises(RequestShed):
+            await waiting[0]
+        with pytest.raises(RequestShed):
+            await sched.acquire(HOUSEKEEPING)
+        sched.release(BROADCAST)
+        await waiting[1]
+        # Far from the deadline nothing is shed
+        sched.release(PRICE_FETCH)
+        sched.set_deadline(sched.now() + 30)
+        await sched.acquire(HOUSEKEEPING)
+
+    asyncio.get_event_loop().run_until_complete(run())
+    assert sched.shed_counts[CONFIRMATION] == 1
+    assert sched.shed_counts[HOUSEKEEPING] == 1
+
+
+def test_queue_shed_as_deadline_nears():
+    sched = Scheduler(max_active=1, shed_window=0.05)
+
+    async def run():
+        await sched.acquire(BROADCAST)
+        waiting = [
+            asyncio.ensure_future(sched.acquire(request_class))
+            for request_class in (CONFIRMATION, PRICE_FETCH)
+        ]
+        sched.set_deadline(sched.now() + 0.1)
+        await asyncio.sleep(0.02)
+        assert not waiting[0].done()
+        # Shed without a new deadline being set
+        with pytest.raises(RequestShed):
+            await waiting[0]
+        assert not waiting[1].done()
+        sched.release(BROADCAST)
+        await waiting[1]
+        sched.release(PRICE_FETCH)
+        sched.set_deadline(None)
+        await sched.acquire(CONFIRMATION)
+
+    asyncio.get_event_loop().run_until_complete(run())
+    assert sched.shed_counts[CONFIRMATION] == 1
+
+
+def test_client_requests_take_context_priority():
+    seen = []
+
+    async def handler(method, url, params, data):
+        seen.append(scheduler.current_priority.get())
+        return 200, {}
+
+    async def run():
+        with scheduler.priority(BROADCAST):
+            await http_get("http://memory/a")
+        await http_get("http://memory/b")
+        scheduler.scheduler.set_deadline(scheduler.scheduler.now())
+        try:
+            with scheduler.priority(CONFIRMATION):
+                with pytest.raises(client.HttpError):
+                    await http_get("http://memory/c")
+        finally:
+            scheduler.scheduler.set_deadline(None)
+
+    client.mount("http://memory", MemoryTransport(handler))
+    try:
+        asyncio.get_event_loop().run_until_complete(run())
+    finally:
+        client.unmount("http://memory")
+    assert seen == [BROADCAST, REVEAL_LOOKUP]
+    assert scheduler.scheduler.total_active == 0
@@ -0,0 +1,79 @@
+import asyncio
+import simplejson as json
+
+from oracle_voter.common.tracing import Tracer
+
+
+def test_disabled_records_nothing():
+    tracer = Tracer()
+    with tracer.span("vote_period", vote_period=3) as span:
+        assert span is None
+    assert tracer.record("inclusion", 3) is None
+    assert tracer.periods() == []
+
+
+def test_spans_nest_through_tasks(tmpdir):
+    path = str(tmpdir.join("trace.jsonl"))
+    tracer = Tracer()
+    tracer.enable(path)
+
+    async def fetch(exchange):
+        with tracer.span("feed", exchange=exchange):
+            await asyncio.sleep(0)
+
+    async def run():
+        with tracer.span("vote_period", vote_period=7, height=35):
+            with tracer.span("price", denom="ukrw"):
+                await asyncio.gather(fetch("coinone"), fetch("bithumb"))
+            with tracer.span("broadcast") as span:
+                span.set(txhash="AB12")
+        # Found on chain in a later period
+        tracer.record("inclusion", 7, txhash="AB12", height=37)
+
+    asyncio.get_event_loop().run_until_complete(run())
+    tracer.close()
+
+    root, inclusion = tracer.tree(7)
+    assert inclusion["name"] == "inclusion"
+    assert root["name"] == "vote_period"
+    assert root["attrs"] == {"height": 35}
+    assert [child["name"] for child in root["children"]] == [
+        "price",
+        "broadcast",
+    ]
+    feeds = root["children"][0]["children"]
+    assert sorted(feed["attrs"]["exchange"] for feed in feeds) == [
+        "bithumb",
+        "coinone",
+    ]
+    linked = tracer.find(txhash="AB12")
+    assert [row["name"] for row in linked] == ["broadcast", "inclusion"]
+
+    with open(path) as source:
+        rows = [json.loads(line) for line in source]
+    assert len(rows) == 6
+    assert all(row["vote_period"] == 7 for row in rows)
+    assert rows[-1]["name"] == "inclusion"
+
+
+def test_ring_keeps_last_periods():
+    tracer = Tracer(ring_size=2)
+    tracer.enable()
+    for vote_period in range(1, 5):
+        with tracer.span("vote_period", vote_period=vote_period):
+            pass
+    assert tracer.periods() == [3, 4]
+    assert tracer.trace(1) == []
+
+
+def test_span_records_error():
+    tracer = Tracer()
+    tracer.enable()
+    try:
+        with tracer.span("signing", vote_period=2):
+            raise ValueError("terracli")
+    except ValueError:
+        pass
+    (row,) = tracer.trace(2)
+    assert row["attrs"]["error"] == "ValueError('terracli')"
+    assert row["duration"] >= 0
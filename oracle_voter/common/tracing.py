@@ -0,0 +1,173 @@
+"""
+Vote period tracing
+
+Spans are timed blocks of work nested through a context variable, so
+spans opened in tasks gathered under another span become its children.
+Every span belongs to the trace of a vote period
+
+    with tracer.span("vote_period", vote_period=1204, validator=addr):
+        with tracer.span("signing"):
+            ...
+
+Finished spans are appended as JSON lines to the trace file and kept
+in a ring of the last ring_size vote periods, see trace(), tree() and
+find(). Tracing is off until enable() is called.
+"""
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import count
+
+import simplejson as json
+
+current_span = ContextVar("trace_span", default=None)
+
+
+class Span:
+
+    def __init__(self, span_id, name, vote_period, parent_id, attrs):
+        self.span_id = span_id
+        self.name = name
+        self.vote_period = vote_period
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            "vote_period": self.vote_period,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "attrs": self.attrs,
+        }
+
+
+class Tracer:
+
+    def __init__(self, path=None, ring_size=32):
+        self.enabled = False
+        self.path = path
+        self.ring_size = ring_size
+        # Vote period to finished spans
+        self.ring = OrderedDict()
+        self.ids = count(1)
+        self.out = None
+
+    def enable(self, path=None, ring_size=None):
+        self.enabled = True
+        self.path = path
+        if ring_size is not None:
+            self.ring_size = ring_size
+
+    def close(self):
+        if self.out is not None:
+            self.out.close()
+            self.out = None
+
+    @contextmanager
+    def span(self, name, vote_period=None, **attrs):
+        parent = current_span.get()
+        if vote_period is None and parent is not None:
+            vote_period = parent.vote_period
+        if not self.enabled or vote_period is None:
+            # Outside of a vote period, nothing to attach to
+            yield None
+            return
+        span = Span(
+            next(self.ids),
+            name,
+            vote_period,
+            None if parent is None else parent.span_id,
+            attrs,
+        )
+        token = current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as err:
+            span.set(error=repr(err))
+            raise
+        finally:
+            span.duration = time.perf_counter() - started
+            current_span.reset(token)
+            self.finish(span)
+
+    def record(self, name, vote_period, start=None, duration=0.0, **attrs):
+        # Adds a span timed elsewhere, e.g. a tx found blocks later
+        if not self.enabled:
+            return None
+        parent = current_span.get()
+        parent_id = None
+        if parent is not None and parent.vote_period == vote_period:
+            parent_id = parent.span_id
+        span = Span(next(self.ids), name, vote_period, parent_id, attrs)
+        if start is not None:
+            span.start = start
+        span.duration = duration
+        self.finish(span)
+        return span
+
+    def finish(self, span):
+        row = span.to_dict()
+        spans = self.ring.get(span.vote_period, None)
+        if spans is None:
+            spans = list()
+            self.ring[span.vote_period] = spans
+            while len(self.ring) > self.ring_size:
+                self.ring.popitem(last=False)
+        spans.append(row)
+        if self.path is not None:
+            try:
+                self.write(row)
+            except OSError as err:
+                print(f"Unable to write trace to {self.path}: {err}")
+
+    def write(self, row):
+        if self.out is None:
+            self.out = open(self.path, "a", buffering=1)
+        self.out.write(json.dumps(row) + "\n")
+
+    """
+    Queries
+    """
+
+    def periods(self):
+        return list(self.ring.keys())
+
+    def trace(self, vote_period):
+        return list(self.ring.get(vote_period, []))
+
+    def tree(self, vote_period):
+        # Spans of a vote period nested under "children", roots first
+        nodes = {
+            row["span_id"]: dict(row, children=[])
+            for row in self.trace(vote_period)
+        }
+        roots = list()
+        for node in sorted(nodes.values(), key=lambda node: node["start"]):
+            parent = nodes.get(node["parent_id"], None)
+            if parent is None:
+                roots.append(node)
+            else:
+                parent["children"].append(node)
+        return roots
+
+    def find(self, **attrs):
+        # e.g. find(txhash=...) for the broadcast and inclusion spans
+        return [
+            row
+            for spans in self.ring.values()
+            for row in spans
+            if all(row["attrs"].get(key) == val for key, val in attrs.items())
+        ]
+
+
+tracer = Tracer()
@@ -0,0 +1,70 @@
+"""
+Virtual clock event loop
+
+An asyncio loop whose time() only moves when there is nothing left to
+run: instead of waiting for the next timer the clock jumps to it. Sleeps,
+timeouts and call_later() behave as usual but cost no wall time, so a
+day of blocks replays in as long as the work itself takes.
+
+    loop = VirtualClockLoop()
+    loop.run_until_complete(replay.run())
+
+Only in process I/O such as client.MemoryTransport makes sense on it,
+sockets are polled but never waited on while timers are pending.
+"""
+import asyncio
+import selectors
+
+
+class VirtualSelector:
+    # Polls the real selector, skips ahead instead of blocking
+
+    def __init__(self, loop_clock):
+        self.clock = loop_clock
+        self.selector = selectors.DefaultSelector()
+
+    def select(self, timeout=None):
+        events = self.selector.select(0)
+        if len(events) > 0 or timeout == 0:
+            return events
+        if timeout is None:
+            # No timers, only I/O can wake the loop
+            return self.selector.select(None)
+        self.clock.advance(timeout)
+        return events
+
+    def __getattr__(self, name):
+        return getattr(self.selector, name)
+
+
+class Clock:
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def advance(self, seconds):
+        self.now += max(seconds, 0.0)
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+
+    def __init__(self, start=0.0):
+        self.clock = Clock(start)
+        super().__init__(selector=VirtualSelector(self.clock))
+        # Timers due within the resolution run in the same iteration
+        self._clock_resolution = 1e-9
+
+    def time(self):
+        return self.clock.now
+
+
+def run_virtual(coro, start=0.0):
+    # Runs coro to completion on a fresh virtual clock loop
+    loop = VirtualClockLoop(start)
+    previous = asyncio.get_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        asyncio.set_event_loop(previous)
+        loop.close()
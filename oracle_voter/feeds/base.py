@@ -1,9 +1,99 @@
+import abc
+import asyncio
 from oracle_voter.common import client
+from oracle_voter.common.metrics import registry
+from oracle_voter.common.ratelimit import RateLimited
+
+FEED_SECONDS = registry.histogram(
+    "feed_fetch_seconds",
+    "Feed provider fetch latency",
+    ("feed",),
+)
+FEED_ERRORS = registry.counter(
+    "feed_errors_total",
+    "Failed feed fetches",
+    ("feed",),
+)
+FEED_CACHED = registry.counter(
+    "feed_cached_quotes_total",
+    "Last quotes served while rate limited",
+    ("feed",),
+)
+FEED_PRICE = registry.gauge("feed_price", "Last fetched price", ("feed",))
 
 
 class Base:
 
-    def __init__(self, api_url):
+    def __init__(self, api_url, name="XXX"):
         self.api_url = api_url
         self.client = client
-        self.name = "XXX"  # Name of the exchange
+        self.name = name  # Name of the exchange
+
+
+class Quote:
+    __slots__ = ("price", "size", "source_ts", "latency")
+
+    def __init__(self, price, size=None, source_ts=None, latency=None):
+        self.price = price  # FixedPx
+        self.size = size  # FixedPx of the volume behind the price, if known
+        self.source_ts = source_ts  # Timestamp given by the source
+        self.latency = latency  # Seconds taken to fetch
+
+
+class FeedProvider(abc.ABC):
+    """A single priced market for a denom
+
+    Subclasses implement fetch() returning a Quote, they are registered
+    in feeds.registry.FeedRegistry. One without fetch() fails as it is
+    created, when the feeds are loaded.
+    """
+
+    # Seconds a quote may be reused while the source is rate limited
+    max_quote_age = 30.0
+
+    def __init__(self, name, denom, pair_type="native", weight=100):
+        self.name = name
+        self.denom = denom
+        self.pair_type = pair_type
+        self.weight = weight
+        self.last_quote = None
+        self.last_quote_ts = None
+
+    @abc.abstractmethod
+    async def fetch(self):
+        pass
+
+    async def quote(self):
+        # Loop time, so replays on a virtual clock age quotes with it
+        loop = asyncio.get_event_loop()
+        started = loop.time()
+        try:
+            quote = await self.fetch()
+        except RateLimited:
+            if self.last_quote is not None and \
+                    started - self.last_quote_ts <= self.max_quote_age:
+                FEED_CACHED.inc(feed=self.name)
+                return self.last_quote
+            FEED_ERRORS.inc(feed=self.name)
+            raise
+        except Exception:
+            FEED_ERRORS.inc(feed=self.name)
+            raise
+        quote.latency = loop.time() - started
+        FEED_SECONDS.observe(quote.latency, feed=self.name)
+        FEED_PRICE.set(float(quote.price.to_decimal()), feed=self.name)
+        self.last_quote = quote
+        self.last_quote_ts = started
+        return quote
+
+    async def price(self):
+        quote = await self.quote()
+        return quote.price
+
+    def market_info(self):
+        return {
+            "exchange": self.name,
+            "feed": self.price,
+            "weight": self.weight,
+            "provider": self,
+        }
@@ -2,11 +2,12 @@ from decimal import Decimal
 from oracle_voter.feeds.base import Base
 from oracle_voter.common import client
 from oracle_voter.common.client import HttpError
+from oracle_voter.markets.book import CompactOrderbook, DEFAULT_DEPTH
 
 class Coinone(Base):
 
     def __init__(self, api_url):
-        super().__init__(api_url)
+        super().__init__(api_url, "coinone")
 
     def format_trade(self, complete_order):
         px = Decimal(complete_order["price"])
@@ -26,7 +27,12 @@ class Coinone(Base):
         # Convert raw trade history into common format
         complete_orders = http_res["completeOrders"]
         trades = [self.format_trade(order) for order in complete_orders]
-        return None, {"fetch_ts": fetch_ts, "trades": trades}
+        trade_ids = [order["id"] for order in complete_orders]
+        return None, {
+            "fetch_ts": fetch_ts,
+            "trades": trades,
+            "trade_ids": trade_ids,
+        }
 
     async def get_trades(self, currency):
         get_params = {"currency": currency, "format": "json"}
@@ -61,3 +67,21 @@ class Coinone(Base):
             return self.postpro_orders(http_res)
         except HttpError as err:
             return err, None
+
+    def postpro_book(self, http_res, depth=DEFAULT_DEPTH):
+        # Fills a CompactOrderbook straight from the raw levels
+        error_code = http_res["errorCode"]
+        if error_code != "0":
+            return error_code, None
+        book = CompactOrderbook(depth)
+        book.load(http_res["ask"], http_res["bid"], http_res["timestamp"])
+        return None, book
+
+    async def get_compact_orderbook(self, currency, depth=DEFAULT_DEPTH):
+        get_params = {"currency": currency, "format": "json"}
+        target_url = f"{self.api_url}/orderbook/"
+        try:
+            http_res = await client.http_get(target_url, params=get_params)
+            return self.postpro_book(http_res, depth)
+        except HttpError as err:
+            return err, None
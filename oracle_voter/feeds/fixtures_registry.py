@@ -0,0 +1,28 @@
+from oracle_voter.feeds.base import FeedProvider, Quote
+from oracle_voter.markets.fixed import FixedPx
+
+
+class StaticFeed(FeedProvider):
+
+    def __init__(self, name="static", denom="ukrw", price="300.0", weight=100):
+        super().__init__(name, denom, "native", weight)
+        self.px = FixedPx.from_str(price)
+
+    async def fetch(self):
+        return Quote(self.px, FixedPx.from_int(1), 1574683544)
+
+
+def static_feeds():
+    return [
+        StaticFeed("static:a", "ueur", "0.2"),
+        StaticFeed("static:b", "ueur", "0.4"),
+    ]
+
+
+class EntryPoint:
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    def load(self):
+        return self.factory
@@ -0,0 +1,34 @@
+import simplejson as json
+from decimal import Decimal
+
+
+def depth_update(sequence, asks=(), bids=(), currency="LUNA"):
+    return json.dumps({
+        "response_type": "DATA",
+        "channel": "ORDERBOOK",
+        "data": {
+            "quote_currency": "KRW",
+            "target_currency": currency,
+            "sequence": sequence,
+            "timestamp": "1574683544",
+            "asks": [{"price": px, "qty": qty} for px, qty in asks],
+            "bids": [{"price": px, "qty": qty} for px, qty in bids],
+        },
+    })
+
+
+def snapshot_orderbook():
+    return {
+        "fetch_ts": "1574683540",
+        "asks": [
+            (Decimal('264.0'), Decimal('3583.053')),
+            (Decimal('265.0'), Decimal('378.8709')),
+            (Decimal('266.0'), Decimal('601.7191')),
+        ],
+        "bids": [
+            (Decimal('263.0'), Decimal('609.1189')),
+            (Decimal('262.0'), Decimal('749.1645')),
+            (Decimal('261.0'), Decimal('2179.129')),
+        ],
+    }
+
@@ -1,72 +1,152 @@
-# Hardcode Supported Markets
-from decimal import Decimal, Context
-from functools import partial
+# Built-in Supported Markets
+import time
 
+from oracle_voter.common.ratelimit import RateLimited
 from oracle_voter.markets import pricing
+from oracle_voter.markets.book import SCALE_DIGITS
+from oracle_voter.markets.fixed import FixedPx
+from oracle_voter.markets.tape import TradeTape
 from oracle_voter.feeds import coinone, ukfx
+from oracle_voter.feeds.base import FeedProvider, Quote
+from oracle_voter.feeds.registry import FeedRegistry
+from oracle_voter.feeds.stream import CoinoneStream
+from oracle_voter.feeds.tape import TradePoller
 
-WEI_VALUE = Decimal("10.0") ** -18
-
-ABSTAIN_VOTE_PX = Decimal("-1.00").quantize(
-    WEI_VALUE,
-    context=Context(prec=40),
-)
+ABSTAIN_VOTE_PX = FixedPx.from_int(-1)
 
 # Feed Sources
 exchange_coinone = coinone.Coinone("https://api.coinone.co.kr")
 
 feed_ukfx = ukfx.UKFX("https://api.ukfx.co.uk")
 
+# Set by enable_streaming, orderbooks are then served from memory
+stream_coinone = None
+
+# Rolling trade tape, filled by the poller from enable_trade_tape
+tape_coinone_krw = TradeTape(window=300)
+
+
 class ExchangeErr(Exception):
     def __init__(self, message, err):
         super().__init__(message)
         self.exchange_err = err
 
 
-async def fetch_coinone_krw():
-    currency = "LUNA"
-    err, orderbook = await exchange_coinone.get_orderbook(currency)
-    # Get MicroPrice
-    if err is not None:
-        raise ExchangeErr(f"Exchange Coinone threw error", err)
-    microprice = pricing.calc_microprice(orderbook)
-    return microprice.quantize(WEI_VALUE, context=Context(prec=40))
+class CoinoneMicroprice(FeedProvider):
 
+    def __init__(
+        self,
+        exchange,
+        currency="LUNA",
+        denom="ukrw",
+        weight=100,
+        levels=3,
+    ):
+        super().__init__(f"coinone:{currency}/KRW", denom, "native", weight)
+        self.exchange = exchange
+        self.currency = currency
+        self.levels = levels
+        self.stream = None
+
+    async def fetch(self):
+        if self.stream is not None:
+            orderbook = self.stream.orderbook(self.currency, self.levels)
+            if orderbook is not None:
+                microprice = pricing.calc_microprice_px(orderbook, self.levels)
+                return Quote(microprice, None, orderbook["fetch_ts"])
+        # Fallback to the REST snapshot while the stream is not synced
+        err, book = await self.exchange.get_compact_orderbook(self.currency)
+        if isinstance(err, RateLimited):
+            # Served from the last quote while throttled
+            raise err
+        if err is not None:
+            raise ExchangeErr(f"Exchange Coinone threw error", err)
+        size = FixedPx.from_scaled(
+            book.ask_volume(self.levels) + book.bid_volume(self.levels),
+            SCALE_DIGITS,
+        )
+        microprice = pricing.calc_microprice_px(book, self.levels)
+        return Quote(microprice, size, book.fetch_ts)
+
+
+class TapePrice(FeedProvider):
+
+    def __init__(self, tape, name, denom="ukrw", weight=0, method="vwap"):
+        super().__init__(name, denom, "native", weight)
+        self.tape = tape
+        self.method = method
+
+    async def fetch(self):
+        now = time.time()
+        px = getattr(self.tape, self.method)(now)
+        if px is None:
+            raise ExchangeErr(f"Trade tape {self.name} is empty", None)
+        return Quote(FixedPx.from_decimal(px), None, int(now))
+
+
+class UKFXSwap(FeedProvider):
+
+    def __init__(self, feed, target, denom, weight=100, base_currency="krw"):
+        super().__init__(
+            f"ukfx:{base_currency}/{target}",
+            denom,
+            "derivative",
+            weight,
+        )
+        self.feed = feed
+        self.target = target
+        self.base_currency = base_currency
+
+    async def fetch(self):
+        raw_px = await self.feed.get_swap(self.base_currency, self.target)
+        return Quote(FixedPx.coerce(raw_px))
 
-async def derive_rate(target):
-    base_currency = "krw"
-    raw_px = await feed_ukfx.get_swap(base_currency, target)
-    return Decimal(raw_px).quantize(WEI_VALUE, context=Context(prec=40))
 
+# Markets with a weight of 0 are not queried
+coinone_krw = CoinoneMicroprice(exchange_coinone)
+coinone_krw_vwap = TapePrice(tape_coinone_krw, "coinone:LUNA/KRW:vwap")
+coinone_krw_twap = TapePrice(
+    tape_coinone_krw,
+    "coinone:LUNA/KRW:twap",
+    method="twap",
+)
 
 # Base pair is always uluna for all markets
-supported_rates = [{
-    "denom": "ukrw",
-    "pair_type": "native",
-    "markets": [{
-        "exchange": "coinone",
-        "feed": fetch_coinone_krw,
-        "weight": 100,
-    }],
-  }, {
-    "denom": "umnt",
-    "pair_type": "derivative",
-    "markets": [{
-        "feed": partial(derive_rate, "mnt"),
-        "weight": 100,
-    }],
-  }, {
-    "denom": "uusd",
-    "pair_type": "derivative",
-    "markets": [{
-        "feed": partial(derive_rate, "usd"),
-        "weight": 100,
-    }],
-  }, {
-    "denom": "usdr",
-    "pair_type": "derivative",
-    "markets": [{
-        "feed": partial(derive_rate, "xdr"),
-        "weight": 100,
-    }],
-}]
+registry = FeedRegistry()
+registry.register(coinone_krw)
+registry.register(coinone_krw_vwap)
+registry.register(coinone_krw_twap)
+registry.register(UKFXSwap(feed_ukfx, "mnt", "umnt"))
+registry.register(UKFXSwap(feed_ukfx, "usd", "uusd"))
+registry.register(UKFXSwap(feed_ukfx, "xdr", "usdr"))
+
+# Providers loaded later are appended to the same list
+supported_rates = registry.rates
+
+
+def enable_streaming(ws_url="wss://stream.coinone.co.kr"):
+    global stream_coinone
+    stream_coinone = CoinoneStream(exchange_coinone, ws_url, ("LUNA",))
+    coinone_krw.stream = stream_coinone
+    return stream_coinone
+
+
+def enable_trade_tape(interval=5.0):
+    return TradePoller(exchange_coinone, "LUNA", tape_coinone_krw, interval)
+
+
+async def fetch_coinone_krw():
+    return await coinone_krw.price()
+
+
+async def fetch_coinone_krw_vwap():
+    return await coinone_krw_vwap.price()
+
+
+async def fetch_coinone_krw_twap():
+    return await coinone_krw_twap.price()
+
+
+async def derive_rate(target):
+    raw_px = await feed_ukfx.get_swap("krw", target)
+    return FixedPx.coerce(raw_px)
@@ -0,0 +1,110 @@
+"""
+Feed provider registry
+
+Providers are registered directly, discovered from the
+"oracle_voter.feeds" entry point group, or listed in a JSON config file
+
+    {"feeds": [{
+        "factory": "my_feeds.binance:BinanceMicroprice",
+        "options": {"denom": "ukrw", "weight": 50}
+    }]}
+
+A factory is any callable returning a FeedProvider or a list of them.
+"""
+from collections import OrderedDict
+from importlib import import_module
+
+import simplejson as json
+
+ENTRY_POINT_GROUP = "oracle_voter.feeds"
+
+
+def resolve_factory(path):
+    module_name, _, attr = path.partition(":")
+    factory = import_module(module_name)
+    for name in attr.split("."):
+        factory = getattr(factory, name)
+    return factory
+
+
+def iter_entry_points(group):
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        # Python 3.7
+        import pkg_resources
+        return list(pkg_resources.iter_entry_points(group))
+    eps = entry_points()
+    if hasattr(eps, "select"):
+        return list(eps.select(group=group))
+    return list(eps.get(group, []))
+
+
+class FeedRegistry:
+
+    def __init__(self):
+        self.providers = OrderedDict()
+        # Rates in the supported_rates format, updated in place
+        self.rates = list()
+        # Indexes
+        self.rates_by_denom = dict()
+        self.providers_by_denom = dict()
+
+    def __len__(self):
+        return len(self.providers)
+
+    def register(self, provider):
+        if provider.name in self.providers:
+            raise ValueError(f"Feed {provider.name} is already registered")
+        self.providers[provider.name] = provider
+        rate_info = self.rates_by_denom.get(provider.denom, None)
+        if rate_info is None:
+            rate_info = {
+                "denom": provider.denom,
+                "pair_type": provider.pair_type,
+                "markets": list(),
+            }
+            self.rates_by_denom[provider.denom] = rate_info
+            self.providers_by_denom[provider.denom] = list()
+            self.rates.append(rate_info)
+        elif rate_info["pair_type"] != provider.pair_type:
+            raise ValueError(
+                f"Feed {provider.name} is {provider.pair_type} but "
+                f"{provider.denom} is {rate_info['pair_type']}"
+            )
+        rate_info["markets"].append(provider.market_info())
+        self.providers_by_denom[provider.denom].append(provider)
+        return provider
+
+    def register_from(self, factory, **options):
+        created = factory(**options)
+        if isinstance(created, (list, tuple)):
+            return [self.register(provider) for provider in created]
+        return [self.register(created)]
+
+    def load_entry_points(self, group=ENTRY_POINT_GROUP):
+        loaded = list()
+        for entry_point in iter_entry_points(group):
+            loaded += self.register_from(entry_point.load())
+        return loaded
+
+    def load_config(self, path):
+        with open(path, "r") as source:
+            config = json.loads(source.read())
+        loaded = list()
+        for feed in config.get("feeds", []):
+            factory = resolve_factory(feed["factory"])
+            loaded += self.register_from(factory, **feed.get("options", {}))
+        return loaded
+
+    def get(self, name):
+        return self.providers.get(name, None)
+
+    def rate_info(self, denom):
+        return self.rates_by_denom.get(denom, None)
+
+    def denom_providers(self, denom):
+        return self.providers_by_denom.get(denom, [])
+
+    def denoms(self):
+        return list(self.rates_by_denom.keys())
@@ -0,0 +1,224 @@
+"""
+Streaming orderbook feed
+
+Subscribes to the exchange depth stream and keeps a local, sorted book per
+market so that pricing at the period boundary is a memory lookup.
+
+Subscribe
+    {"request_type": "SUBSCRIBE", "channel": "ORDERBOOK",
+     "topic": {"quote_currency": "KRW", "target_currency": "LUNA"}}
+
+Depth Update
+    {"response_type": "DATA", "channel": "ORDERBOOK",
+     "data": {"target_currency": "LUNA", "sequence": 101,
+              "timestamp": "1574683544",
+              "asks": [{"price": "264.0", "qty": "10.0"}],
+              "bids": [{"price": "263.0", "qty": "0"}]}}
+
+A qty of 0 removes the price level. Sequences must be consecutive, a gap
+triggers a resync from the REST orderbook snapshot. A book without an
+update for max_age seconds is not used, prices fall back to REST.
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from decimal import Decimal
+
+import aiohttp
+import simplejson as json
+
+ZERO_QTY = Decimal("0")
+
+
+class SequenceGap(Exception):
+    def __init__(self, message, expected, received):
+        super().__init__(message)
+        self.expected = expected
+        self.received = received
+
+
+class LocalBook:
+
+    def __init__(self):
+        self.seq = None
+        self.fetch_ts = None
+        # time.monotonic() of the last snapshot or update applied
+        self.updated_at = None
+        # Price -> Qty
+        self.asks = dict()
+        self.bids = dict()
+        # Sorted price levels, bids are kept negated so that
+        # both sides are sorted best price first
+        self.ask_levels = list()
+        self.bid_levels = list()
+
+    @property
+    def synced(self):
+        return self.seq is not None
+
+    def clear(self):
+        self.seq = None
+        self.asks.clear()
+        self.bids.clear()
+        self.ask_levels.clear()
+        self.bid_levels.clear()
+
+    def set_level(self, book, levels, key, px, qty):
+        idx = bisect_left(levels, key)
+        exists = idx < len(levels) and levels[idx] == key
+        if qty == ZERO_QTY:
+            if exists:
+                levels.pop(idx)
+                book.pop(px, None)
+            return
+        if not exists:
+            levels.insert(idx, key)
+        book[px] = qty
+
+    def set_ask(self, px, qty):
+        self.set_level(self.asks, self.ask_levels, px, px, qty)
+
+    def set_bid(self, px, qty):
+        self.set_level(self.bids, self.bid_levels, -px, px, qty)
+
+    def apply_snapshot(self, seq, orderbook):
+        self.clear()
+        for px, qty in orderbook["asks"]:
+            self.set_ask(px, qty)
+        for px, qty in orderbook["bids"]:
+            self.set_bid(px, qty)
+        self.fetch_ts = orderbook.get("fetch_ts", None)
+        self.seq = seq
+        self.updated_at = time.monotonic()
+
+    def apply_update(self, seq, asks, bids, fetch_ts=None):
+        # Updates we have already seen are ignored
+        if self.seq is not None and seq <= self.seq:
+            return False
+        if self.seq is None or seq != self.seq + 1:
+            expected = None if self.seq is None else self.seq + 1
+            raise SequenceGap(f"Expected {expected} got {seq}", expected, seq)
+        for px, qty in asks:
+            self.set_ask(px, qty)
+        for px, qty in bids:
+            self.set_bid(px, qty)
+        self.fetch_ts = fetch_ts or self.fetch_ts
+        self.seq = seq
+        self.updated_at = time.monotonic()
+        return True
+
+    def top(self, levels=3):
+        asks = [(px, self.asks[px]) for px in self.ask_levels[0:levels]]
+        bids = [(-key, self.bids[-key]) for key in self.bid_levels[0:levels]]
+        return {"fetch_ts": self.fetch_ts, "asks": asks, "bids": bids}
+
+
+class CoinoneStream:
+
+    def __init__(
+        self,
+        exchange,
+        ws_url="wss://stream.coinone.co.kr",
+        currencies=("LUNA",),
+        quote_currency="KRW",
+        reconnect_delay=1.0,
+        max_age=10.0,
+    ):
+        self.exchange = exchange
+        self.ws_url = ws_url
+        self.currencies = tuple(currencies)
+        self.quote_currency = quote_currency
+        self.reconnect_delay = reconnect_delay
+        # Seconds without an update before a book is left to REST
+        self.max_age = max_age
+        self.books = {currency: LocalBook() for currency in self.currencies}
+        self.running = False
+
+    def orderbook(self, currency, levels=3):
+        book = self.books.get(currency, None)
+        if book is None or not book.synced:
+            return None
+        # An open but silent stream must not keep voting old prices
+        if time.monotonic() - book.updated_at > self.max_age:
+            return None
+        return book.top(levels)
+
+    def subscribe_msg(self, currency):
+        return {
+            "request_type": "SUBSCRIBE",
+            "channel": "ORDERBOOK",
+            "topic": {
+                "quote_currency": self.quote_currency,
+                "target_currency": currency,
+            },
+        }
+
+    def format_levels(self, raw_levels):
+        return [
+            self.exchange.format_order(level) for level in raw_levels
+        ]
+
+    async def resync(self, currency, seq):
+        # The REST snapshot has no sequence, it is pinned to the
+        # update that exposed the gap and the stream continues from there
+        book = self.books[currency]
+        book.clear()
+        err, orderbook = await self.exchange.get_orderbook(currency)
+        if err is not None:
+            print(f"Orderbook resync failed for {currency}: {err}")
+            return False
+        book.apply_snapshot(seq, orderbook)
+        return True
+
+    async def on_update(self, data):
+        currency = data.get("target_currency", "").upper()
+        book = self.books.get(currency, None)
+        if book is None:
+            return
+        seq = int(data["sequence"])
+        asks = self.format_levels(data.get("asks", []))
+        bids = self.format_levels(data.get("bids", []))
+        try:
+            book.apply_update(seq, asks, bids, data.get("timestamp", None))
+        except SequenceGap:
+            await self.resync(currency, seq)
+
+    async def on_message(self, raw_text):
+        msg = json.loads(raw_text)
+        if msg.get("response_type", None) != "DATA":
+            return
+        if msg.get("channel", None) != "ORDERBOOK":
+            return
+        await self.on_update(msg["data"])
+
+    async def consume(self, ws):
+        for currency in self.currencies:
+            await ws.send_str(json.dumps(self.subscribe_msg(currency)))
+        async for ws_msg in ws:
+            if ws_msg.type == aiohttp.WSMsgType.TEXT:
+                await self.on_message(ws_msg.data)
+            elif ws_msg.type in (
+                aiohttp.WSMsgType.CLOSED,
+                aiohttp.WSMsgType.ERROR,
+            ):
+                break
+
+    async def run(self):
+        self.running = True
+        while self.running:
+            session = aiohttp.ClientSession()
+            try:
+                async with session.ws_connect(self.ws_url) as ws:
+                    await self.consume(ws)
+            except aiohttp.ClientError as err:
+                print(f"Orderbook stream disconnected: {err}")
+            finally:
+                await session.close()
+            # Books are stale once the stream drops
+            for book in self.books.values():
+                book.clear()
+            if self.running:
+                await asyncio.sleep(self.reconnect_delay)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from oracle_voter.common import scheduler
+from oracle_voter.common.client import HttpError
+
+
+class TradePoller:
+
+    def __init__(self, exchange, currency, tape, interval=5.0):
+        self.exchange = exchange
+        self.currency = currency
+        self.tape = tape
+        self.interval = interval
+        self.running = False
+
+    async def poll(self):
+        try:
+            with scheduler.priority(scheduler.HOUSEKEEPING):
+                err, result = await self.exchange.get_trades(self.currency)
+        except HttpError as err:
+            print(f"Trade poll failed for {self.currency}: {err}")
+            return 0
+        if err is not None:
+            print(f"Trade poll failed for {self.currency}: {err}")
+            return 0
+        added = 0
+        # Exchange returns the most recent trade first
+        rows = zip(result["trades"], result["trade_ids"])
+        for (ts, px, qty, side), trade_id in reversed(list(rows)):
+            if self.tape.add(ts, trade_id, px, qty):
+                added += 1
+        self.tape.evict(time.time())
+        return added
+
+    async def run(self):
+        self.running = True
+        while self.running:
+            await self.poll()
+            await asyncio.sleep(self.interval)
+
+    def stop(self):
+        self.running = False
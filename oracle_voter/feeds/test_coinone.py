@@ -103,3 +103,26 @@ def test_get_orderbook_error(http_mock, exchange_coinone):
         exchange_coinone.get_orderbook("LUNA")
     )
     assert error is 400
+
+
+def test_get_compact_orderbook_200(exchange_coinone_url, exchange_coinone):
+    target_currency = "LUNA"
+    loop = asyncio.get_event_loop()
+    with aioresponses() as m:
+        mock_param = urlencode({"currency": target_currency, "format": "json"})
+        mock_url = f"{exchange_coinone_url}/orderbook/?{mock_param}"
+        m.get(
+            mock_url,
+            status=200,
+            payload=fixtures_coinone.get_orderbook_200(),
+        )
+        error, book = loop.run_until_complete(
+            exchange_coinone.get_compact_orderbook(target_currency, depth=3)
+        )
+        assert error is None
+        assert book.asks() == [
+            (Decimal('264.0'), Decimal('3583.053')),
+            (Decimal('265.0'), Decimal('378.8709')),
+            (Decimal('266.0'), Decimal('601.7191')),
+        ]
+        assert book.bids(1) == [(Decimal('263.0'), Decimal('609.1189'))]
@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+import simplejson as json
+from unittest.mock import patch
+from oracle_voter.feeds.base import FeedProvider
+from oracle_voter.feeds.registry import FeedRegistry
+from oracle_voter.feeds.fixtures_registry import (
+    StaticFeed,
+    EntryPoint,
+    static_feeds,
+)
+
+
+def test_register_builds_indexes():
+    registry = FeedRegistry()
+    registry.register(StaticFeed("static:a"))
+    registry.register(StaticFeed("static:b", price="310.0", weight=50))
+    rate_info = registry.rate_info("ukrw")
+    assert rate_info["pair_type"] == "native"
+    assert [m["weight"] for m in rate_info["markets"]] == [100, 50]
+    assert registry.rates == [rate_info]
+    assert [p.name for p in registry.denom_providers("ukrw")] == [
+        "static:a",
+        "static:b",
+    ]
+    assert registry.rate_info("uusd") is None
+
+
+def test_register_rejects_duplicates():
+    registry = FeedRegistry()
+    registry.register(StaticFeed("static:a"))
+    with pytest.raises(ValueError):
+        registry.register(StaticFeed("static:a"))
+    derived = StaticFeed("static:b")
+    derived.pair_type = "derivative"
+    with pytest.raises(ValueError):
+        registry.register(derived)
+
+
+def test_provider_without_fetch_fails_to_register():
+    class Incomplete(FeedProvider):
+        pass
+
+    registry = FeedRegistry()
+    with pytest.raises(TypeError):
+        registry.register_from(Incomplete, name="incomplete", denom="ukrw")
+    assert len(registry) == 0
+
+
+def test_quote_is_slotted_and_timed():
+    feed = StaticFeed()
+    loop = asyncio.get_event_loop()
+    quote = loop.run_until_complete(feed.quote())
+    assert not hasattr(quote, "__dict__")
+    assert quote.latency >= 0
+    assert feed.last_quote is quote
+    px = loop.run_until_complete(feed.market_info()["feed"]())
+    assert str(px) == "300.000000000000000000"
+
+
+def test_load_config(tmpdir):
+    config = tmpdir.join("feeds.json")
+    config.write(json.dumps({"feeds": [{
+        "factory": "oracle_voter.feeds.fixtures_registry:StaticFeed",
+        "options": {"name": "static:cfg", "denom": "usdr", "weight": 10},
+    }, {
+        "factory": "oracle_voter.feeds.fixtures_registry:static_feeds",
+    }]}))
+    registry = FeedRegistry()
+    loaded = registry.load_config(str(config))
+    assert [p.name for p in loaded] == ["static:cfg", "static:a", "static:b"]
+    assert registry.denoms() == ["usdr", "ueur"]
+
+
+@patch("oracle_voter.feeds.registry.iter_entry_points")
+def test_load_entry_points(eps_mock):
+    eps_mock.return_value = [EntryPoint(static_feeds)]
+    registry = FeedRegistry()
+    registry.load_entry_points()
+    eps_mock.assert_called_once_with("oracle_voter.feeds")
+    assert len(registry) == 2
@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from decimal import Decimal
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from oracle_voter.feeds import coinone
+from oracle_voter.feeds.stream import LocalBook, CoinoneStream, SequenceGap
+from oracle_voter.feeds.fixtures_stream import (
+    depth_update,
+    snapshot_orderbook,
+)
+from oracle_voter.markets import pricing
+
+
+def test_local_book_sorted_updates():
+    book = LocalBook()
+    book.apply_snapshot(10, snapshot_orderbook())
+    book.apply_update(
+        11,
+        [(Decimal("263.5"), Decimal("5.0")), (Decimal("264.0"), Decimal("0"))],
+        [(Decimal("263.2"), Decimal("7.0"))],
+    )
+    top = book.top(2)
+    assert top["asks"] == [
+        (Decimal("263.5"), Decimal("5.0")),
+        (Decimal("265.0"), Decimal("378.8709")),
+    ]
+    assert top["bids"] == [
+        (Decimal("263.2"), Decimal("7.0")),
+        (Decimal("263.0"), Decimal("609.1189")),
+    ]
+    assert book.seq == 11
+
+
+def test_local_book_ignores_stale_and_raises_on_gap():
+    book = LocalBook()
+    book.apply_snapshot(10, snapshot_orderbook())
+    assert book.apply_update(9, [(Decimal("1.0"), Decimal("1.0"))], []) is False
+    with pytest.raises(SequenceGap):
+        book.apply_update(12, [], [])
+
+
+def test_local_book_microprice_matches_snapshot():
+    book = LocalBook()
+    book.apply_snapshot(1, snapshot_orderbook())
+    assert pricing.calc_microprice(book.top(3)) == Decimal("263.563")
+
+
+class SnapshotCoinone(coinone.Coinone):
+
+    def __init__(self):
+        super().__init__("http://127.0.0.1")
+        self.snapshots = 0
+
+    async def get_orderbook(self, currency):
+        self.snapshots += 1
+        return None, snapshot_orderbook()
+
+
+async def stream_from_stand_in(messages):
+    subscriptions = []
+
+    async def ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscriptions.append(await ws.receive_json())
+        for msg in messages:
+            await ws.send_str(msg)
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/", ws_handler)
+    server = TestServer(app)
+    await server.start_server()
+    exchange = SnapshotCoinone()
+    stream = CoinoneStream(
+        exchange,
+        str(server.make_url("/")),
+        ("LUNA",),
+        reconnect_delay=0.01,
+    )
+    # Capture the book before the stand-in closes the socket
+    seen = []
+    on_update = stream.on_update
+
+    async def record_update(data):
+        await on_update(data)
+        seen.append(stream.orderbook("LUNA", 3))
+        if len(seen) == len(messages):
+            stream.stop()
+
+    stream.on_update = record_update
+    await asyncio.wait_for(stream.run(), 5)
+    await server.close()
+    return exchange, subscriptions, seen
+
+
+def test_stream_resyncs_on_gap():
+    loop = asyncio.get_event_loop()
+    exchange, subscriptions, seen = loop.run_until_complete(
+        stream_from_stand_in([
+            depth_update(5, asks=[("264.0", "1.0")]),
+            depth_update(6, bids=[("263.5", "2.0")]),
+            depth_update(8, asks=[("263.8", "4.0")]),
+        ])
+    )
+    assert subscriptions[0]["topic"]["target_currency"] == "LUNA"
+    # First update and the gap at 8 both resync from REST
+    assert exchange.snapshots == 2
+    assert seen[1]["bids"][0] == (Decimal("263.5"), Decimal("2.0"))
+    assert seen[2]["bids"][0] == (Decimal("263.0"), Decimal("609.1189"))
+    assert seen[2]["asks"][0] == (Decimal("264.0"), Decimal("3583.053"))
+
+
+def test_silent_stream_goes_stale():
+    stream = CoinoneStream(SnapshotCoinone(), max_age=10.0)
+    book = stream.books["LUNA"]
+    with patch("oracle_voter.feeds.stream.time.monotonic", return_value=100.0):
+        book.apply_snapshot(10, snapshot_orderbook())
+    with patch("oracle_voter.feeds.stream.time.monotonic", return_value=109.0):
+        assert stream.orderbook("LUNA")["asks"][0][0] == Decimal("264.0")
+    with patch("oracle_voter.feeds.stream.time.monotonic", return_value=111.0):
+        assert stream.orderbook("LUNA") is None
+        book.apply_update(11, [], [])
+        assert stream.orderbook("LUNA") is not None
@@ -0,0 +1,26 @@
+import asyncio
+from decimal import Decimal
+from oracle_voter.feeds import coinone
+from oracle_voter.feeds.fixtures_coinone import get_trades_200
+from oracle_voter.feeds.tape import TradePoller
+from oracle_voter.markets.tape import TradeTape
+
+
+class TradesCoinone(coinone.Coinone):
+
+    def __init__(self):
+        super().__init__("http://127.0.0.1")
+
+    async def get_trades(self, currency):
+        return self.postpro_trades(get_trades_200())
+
+
+def test_poller_fills_tape_once():
+    tape = TradeTape(window=10 ** 10)
+    poller = TradePoller(TradesCoinone(), "LUNA", tape)
+    loop = asyncio.get_event_loop()
+    added = loop.run_until_complete(poller.poll())
+    assert added == len(get_trades_200()["completeOrders"])
+    # Polling the same page again adds nothing
+    assert loop.run_until_complete(poller.poll()) == 0
+    assert tape.vwap(1574592074) == Decimal("296.95084481")
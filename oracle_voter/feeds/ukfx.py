@@ -5,7 +5,7 @@ from oracle_voter.common import client
 class UKFX(Base):
 
     def __init__(self, api_url):
-        super().__init__(api_url)
+        super().__init__(api_url, "ukfx")
 
     async def get_swap(self, base_currency, swap_currency):
         target_url = f"{self.api_url}/pairs/{base_currency}/{swap_currency}/livehistory/chart?t=1"
@@ -17,3 +17,4 @@ class UKFX(Base):
             last_update = http_res[(len(http_res) - 1)]
             raw_px = last_update[1]
             return raw_px
+        return "-1.00"
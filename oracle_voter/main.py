@@ -1,31 +1,164 @@
 import argparse
 import asyncio
 import os
+import sys
 
-from oracle_voter.oracle.machine2 import Oracle
-from oracle_voter.chain.core import LCDNode
-from oracle_voter.wallet.cli import CLIWallet
 from oracle_voter._version import __version__
 
+# The oracle, chain and feed modules pull in aiohttp and the exchange
+# clients, they are imported once arguments are parsed so --help,
+# --version and bad arguments return immediately
+
+
+def load_feeds(args):
+    from oracle_voter.common.ratelimit import limiter
+    from oracle_voter.feeds import markets
+    for host, rate, burst in args.get("rate_limits", None) or []:
+        limiter.set_limit(host, rate, burst)
+    # Load feed providers before the Oracle indexes the markets
+    markets.registry.load_entry_points()
+    if args.get("feeds_config", None) is not None:
+        markets.registry.load_config(args["feeds_config"])
+
+
+def start_feeds(args):
+    from oracle_voter.feeds import markets
+    if args.get("stream_feeds", False):
+        stream = markets.enable_streaming(args["stream_url"])
+        asyncio.ensure_future(stream.run())
+
+    if args.get("trade_tape", False):
+        poller = markets.enable_trade_tape()
+        asyncio.ensure_future(poller.run())
+
+
+async def start_monitoring(args):
+    from oracle_voter.common.profiler import profiler
+    # Idle until SIGUSR1 (cProfile) or SIGUSR2 (sampling)
+    if args.get("profile_dir", None) is not None:
+        profiler.out_dir = args["profile_dir"]
+    profiler.periods = args.get("profile_periods", profiler.periods)
+    profiler.install(asyncio.get_event_loop())
+    if args.get("loop_monitor", None) is not None:
+        from oracle_voter.common.loopmon import LoopMonitor
+        LoopMonitor(threshold=args["loop_monitor"]).start()
+    if args.get("record", None) is not None:
+        from oracle_voter.common.recorder import Recorder
+        Recorder.install(args["record"])
+    diagnostics = open_memory_diagnostics(args)
+    if args.get("metrics_port", None) is not None:
+        from oracle_voter.common import metrics
+        await metrics.serve(args["metrics_port"])
+    return diagnostics
+
+
+def stop_monitoring():
+    from oracle_voter.common import client
+    # Closes the recording, gzip needs its trailer to read to the end
+    if client.recorder is not None:
+        recorder, client.recorder = client.recorder, None
+        recorder.stop()
+
+
+def open_memory_diagnostics(args):
+    if args.get("memory_dir", None) is None:
+        return None
+    from oracle_voter.common import metrics
+    from oracle_voter.common.memdiag import MemoryDiagnostics
+    diagnostics = MemoryDiagnostics(
+        args["memory_dir"],
+        interval=args.get("memory_interval", None),
+    ).start()
+    metrics.add_route("/debug/memory", diagnostics.handle)
+    if diagnostics.interval is not None:
+        asyncio.ensure_future(diagnostics.run())
+    return diagnostics
+
+
+def start_tracing(args):
+    if args.get("trace_file", None) is None:
+        return
+    from oracle_voter.common.tracing import tracer
+    tracer.enable(args["trace_file"])
+
+
+def open_journal(path):
+    if path is None:
+        return None
+    from oracle_voter.oracle.journal import PrevoteJournal
+    return PrevoteJournal(path)
+
+
+def open_price_board(args):
+    if args.get("price_board", None) is None:
+        return None
+    from oracle_voter.oracle.sharedboard import SharedPriceBoard
+    return SharedPriceBoard(args["price_board"])
+
+
+def open_node(args, addr):
+    from oracle_voter.chain.core import LCDNode
+    transport = None
+    if args.get("node_socket", None) is not None:
+        from oracle_voter.common.client import UnixTransport
+        transport = UnixTransport(args["node_socket"])
+    lcd_node = LCDNode(addr=addr, transport=transport)
+    if args.get("rpc", None) is None:
+        return lcd_node
+    from oracle_voter.chain.rpc import RPCNode
+    # Reads go to Tendermint, StdTx broadcasts still need the LCD
+    return RPCNode(addr=args["rpc"], lcd_node=lcd_node)
+
+
+def open_wallet(name, password, lcd_node, home_dir, identity_cache):
+    from oracle_voter.wallet.cli import CLIWallet
+    return CLIWallet.from_cache(
+        name,
+        password,
+        lcd_node,
+        home_dir,
+        identity_cache,
+    )
 
-async def start_coro(args):
-    n = LCDNode(addr=args["node"])
-    home_dir = args.get(
-        "wallet_dir",
-        None,
-    ) or os.path.expanduser("~/.terracli")
 
-    account_addr = CLIWallet.get_addr(args["wallet_name"], home_dir)
+async def start_publisher_coro(args):
+    from oracle_voter.feeds import markets
+    from oracle_voter.oracle.sharedboard import BoardPublisher
+    await start_monitoring(args)
+    n = open_node(args, args["node"])
+    load_feeds(args)
+    providers = [
+        provider for provider in markets.registry.providers.values()
+        if int(provider.weight) > 0
+    ]
+    publisher = BoardPublisher(args["price_board"], providers)
+    start_feeds(args)
+    await publisher.run(n)
 
-    w = CLIWallet(
+
+async def track_height(oracle):
+    while True:
+        await oracle.retrieve_height()
+        await asyncio.sleep(0.50)
+
+
+async def start_coro(args):
+    from oracle_voter.oracle.machine2 import Oracle
+    from oracle_voter.wallet.identity import IdentityCache
+    diagnostics = await start_monitoring(args)
+    start_tracing(args)
+    n = open_node(args, args["node"])
+    load_feeds(args)
+
+    w = open_wallet(
         args["wallet_name"],
         args["wallet_password"],
-        account_addr,
-        lcd_node=n,
-        home_dir=home_dir,
+        n,
+        args.get("wallet_dir", None),
+        IdentityCache(),
     )
-    # Sync Wallet
-    await w.sync_state()
+
+    start_feeds(args)
 
     # Init the Start Machine
     oracle = Oracle(
@@ -36,17 +169,81 @@ async def start_coro(args):
         chain_id=args["chain_id"],
         gas_fee=args["gas_fee"],
         gas_denom=args["gas_denom"],
+        price_board=open_price_board(args),
+        journal=open_journal(args.get("journal", None)),
     )
-    while True:
-        await oracle.retrieve_height()
-        await asyncio.sleep(0.50)
+    if diagnostics is not None:
+        diagnostics.watch_oracle(oracle)
+    # Txs need the chain's account sequence, the cached identity only
+    # saves the terracli lookup
+    await w.sync_state()
+    await track_height(oracle)
+
+
+async def start_tenants_coro(args):
+    from oracle_voter.oracle import tenants
+    from oracle_voter.oracle.machine2 import Oracle
+    from oracle_voter.wallet.identity import IdentityCache
+    config = tenants.load_config(args["config"])
+    diagnostics = await start_monitoring(args)
+    start_tracing(args)
+    n = open_node(args, config.get("node", args["node"]))
+    # Chain wide reads and feed prices are shared by every validator
+    shared_node = tenants.SharedLCDNode(n)
+    price_board = open_price_board(args) or tenants.PriceBoard()
+    load_feeds(args)
+
+    identity_cache = IdentityCache()
+    oracles = list()
+    for tenant in config["validators"]:
+        w = open_wallet(
+            tenant["wallet"],
+            tenant["password"],
+            n,
+            tenant["home"],
+            identity_cache,
+        )
+        oracles.append(Oracle(
+            vote_period=config.get("vote_period", args["vote_period"]),
+            lcd_node=shared_node,
+            validator_addr=tenant["validator"],
+            wallet=w,
+            chain_id=config.get("chain_id", args["chain_id"]),
+            gas_fee=tenant.get(
+                "gas_fee",
+                config.get("gas_fee", args["gas_fee"]),
+            ),
+            gas_denom=tenant.get(
+                "gas_denom",
+                config.get("gas_denom", args["gas_denom"]),
+            ),
+            price_board=price_board,
+            journal=open_journal(tenant.get("journal", None)),
+        ))
+
+    start_feeds(args)
+    if diagnostics is not None:
+        for oracle in oracles:
+            diagnostics.watch_oracle(oracle)
+
+    tracker = tenants.BlockTracker(
+        shared_node,
+        oracles,
+        shared=(shared_node, price_board),
+    )
+    await asyncio.gather(*[oracle.wallet.sync_state() for oracle in oracles])
+    await tracker.run()
 
 
 def main():
+    if sys.argv[1:2] == ["bench"]:
+        from oracle_voter.bench.runner import main as bench_main
+        sys.exit(bench_main(sys.argv[2:]))
     parser = argparse.ArgumentParser(description="Run Terra Oracle Voter")
     parser.add_argument(
         "validator",
         metavar="validator",
+        nargs="?",
         help="validator operator address (valoper)",
     )
     parser.add_argument(
@@ -61,6 +258,16 @@ def main():
         help="Terra LCD Node",
         default="http://127.0.0.1:1317",
     )
+    parser.add_argument(
+        "--node-socket",
+        metavar="node_socket",
+        help="Unix socket the LCD Node listens on, instead of TCP",
+    )
+    parser.add_argument(
+        "--rpc",
+        metavar="rpc",
+        help="Tendermint RPC to read the chain from instead of the LCD",
+    )
     parser.add_argument(
         "--chain-id",
         metavar="chain_id",
@@ -96,6 +303,107 @@ def main():
         help="Base denomination for gas transaction fee amount",
         default="uluna"
     )
+    parser.add_argument(
+        "--stream-feeds",
+        action="store_true",
+        help="Maintain exchange orderbooks from the websocket depth stream",
+    )
+    parser.add_argument(
+        "--stream-url",
+        metavar="stream_url",
+        help="Exchange websocket depth stream",
+        default="wss://stream.coinone.co.kr",
+    )
+    parser.add_argument(
+        "--trade-tape",
+        action="store_true",
+        help="Poll exchange trades into the rolling VWAP/TWAP tape",
+    )
+    parser.add_argument(
+        "--feeds-config",
+        metavar="feeds_config",
+        help="JSON file listing additional feed providers",
+        default=None,
+    )
+    parser.add_argument(
+        "--rate-limit",
+        metavar="host=rate[/burst]",
+        action="append",
+        help="Requests per second allowed to a host, can be repeated",
+    )
+    parser.add_argument(
+        "--config",
+        metavar="config",
+        help="JSON file listing several validators to vote for",
+        default=None,
+    )
+    parser.add_argument(
+        "--price-board",
+        metavar="price_board",
+        help="Memory mapped file to read feed prices from",
+    )
+    parser.add_argument(
+        "--publish",
+        action="store_true",
+        help="Only fetch feed prices into --price-board for other voters",
+    )
+    parser.add_argument(
+        "--journal",
+        metavar="journal",
+        help="File to journal prevotes to, revealed after a restart",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        metavar="metrics_port",
+        type=int,
+        help="Serve Prometheus metrics on this local port",
+        default=None,
+    )
+    parser.add_argument(
+        "--trace-file",
+        metavar="trace_file",
+        help="JSON lines file to write vote period traces to",
+        default=None,
+    )
+    parser.add_argument(
+        "--loop-monitor",
+        metavar="seconds",
+        type=float,
+        help="Report event loop stalls and callbacks longer than this",
+        default=None,
+    )
+    parser.add_argument(
+        "--profile-dir",
+        metavar="profile_dir",
+        help="Directory SIGUSR1/SIGUSR2 profiles are written to",
+        default=None,
+    )
+    parser.add_argument(
+        "--profile-periods",
+        metavar="periods",
+        type=int,
+        help="Vote periods a SIGUSR1/SIGUSR2 profile covers",
+        default=3,
+    )
+    parser.add_argument(
+        "--memory-dir",
+        metavar="memory_dir",
+        help="Trace allocations and write memory reports to this directory",
+        default=None,
+    )
+    parser.add_argument(
+        "--memory-interval",
+        metavar="seconds",
+        type=float,
+        help="Seconds between memory reports, otherwise only on request",
+        default=None,
+    )
+    parser.add_argument(
+        "--record",
+        metavar="record_file",
+        help="Record every request and response to this gzipped file",
+        default=None,
+    )
     parser.add_argument(
         "--version",
         "-v",
@@ -103,9 +411,27 @@ def main():
         version=f"{__version__}",
     )
     args = parser.parse_args()
+    if args.publish and args.price_board is None:
+        parser.error("--publish requires --price-board")
+    if args.memory_dir is not None and args.metrics_port is None and \
+            args.memory_interval is None:
+        # /debug/memory is only served on the metrics port
+        parser.error(
+            "--memory-dir requires --metrics-port or --memory-interval"
+        )
+    voting = not args.publish
+    if voting and args.config is None and args.validator is None:
+        parser.error("validator is required unless --config is given")
+    rate_limits = list()
+    if args.rate_limit:
+        from oracle_voter.common.ratelimit import parse_limit
+        try:
+            rate_limits = [parse_limit(text) for text in args.rate_limit]
+        except ValueError as err:
+            parser.error(str(err))
     # Check that password is given
     wallet_pass = os.environ.get("password", None) or args.password
-    if wallet_pass is None:
+    if wallet_pass is None and args.config is None and voting:
         raise ValueError(f"Password not provided for feeder account")
 
     pargs = {
@@ -118,10 +444,36 @@ def main():
         "vote_period": args.vote_period,
         "gas_denom": args.gas_denom,
         "gas_fee": args.gas_fee,
+        "stream_feeds": args.stream_feeds,
+        "stream_url": args.stream_url,
+        "trade_tape": args.trade_tape,
+        "feeds_config": args.feeds_config,
+        "config": args.config,
+        "price_board": args.price_board,
+        "journal": args.journal,
+        "rpc": args.rpc,
+        "node_socket": args.node_socket,
+        "rate_limits": rate_limits,
+        "metrics_port": args.metrics_port,
+        "trace_file": args.trace_file,
+        "loop_monitor": args.loop_monitor,
+        "profile_dir": args.profile_dir,
+        "profile_periods": args.profile_periods,
+        "memory_dir": args.memory_dir,
+        "memory_interval": args.memory_interval,
+        "record": args.record,
     }
 
     loop = asyncio.get_event_loop()
-    loop.run_until_complete(start_coro(pargs))
+    try:
+        if args.publish:
+            loop.run_until_complete(start_publisher_coro(pargs))
+        elif args.config is not None:
+            loop.run_until_complete(start_tenants_coro(pargs))
+        else:
+            loop.run_until_complete(start_coro(pargs))
+    finally:
+        stop_monitoring()
 
 
 if __name__ == '__main__':
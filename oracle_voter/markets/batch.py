@@ -0,0 +1,115 @@
+"""
+Batch orderbook analytics
+
+Orderbooks for many markets or many recorded snapshots are stacked into
+(books, depth) arrays and priced in one vectorized pass.
+"""
+import numpy as np
+
+from oracle_voter.markets.book import CompactOrderbook, SCALE
+
+
+class BookStack:
+    __slots__ = ("ask_px", "ask_qty", "bid_px", "bid_qty", "fetch_ts")
+
+    def __init__(self, ask_px, ask_qty, bid_px, bid_qty, fetch_ts=None):
+        # Arrays of shape (books, depth), best price first
+        # Missing levels have a quantity of 0
+        self.ask_px = ask_px
+        self.ask_qty = ask_qty
+        self.bid_px = bid_px
+        self.bid_qty = bid_qty
+        self.fetch_ts = fetch_ts
+
+    def __len__(self):
+        return self.ask_px.shape[0]
+
+    @property
+    def depth(self):
+        return self.ask_px.shape[1]
+
+
+def stack_compact(books, depth=None):
+    # Stacks CompactOrderbooks, the scaled integers are copied
+    # straight out of the array buffers
+    depth = depth or max(book.depth for book in books)
+    shape = (len(books), depth)
+    sides = [np.zeros(shape, dtype=np.int64) for _ in range(4)]
+    for row, book in enumerate(books):
+        n_asks = min(book.n_asks, depth)
+        n_bids = min(book.n_bids, depth)
+        buffers = (
+            (book.ask_px, n_asks),
+            (book.ask_qty, n_asks),
+            (book.bid_px, n_bids),
+            (book.bid_qty, n_bids),
+        )
+        for side, (buffer, n) in zip(sides, buffers):
+            side[row, 0:n] = np.frombuffer(buffer, dtype=np.int64)[0:n]
+    ask_px, ask_qty, bid_px, bid_qty = [side / SCALE for side in sides]
+    fetch_ts = [book.fetch_ts for book in books]
+    return BookStack(ask_px, ask_qty, bid_px, bid_qty, fetch_ts)
+
+
+def stack_levels(orderbooks, depth=20):
+    # Stacks orderbooks in the {"asks": [(px, qty)], "bids": [...]} format
+    shape = (len(orderbooks), depth)
+    ask_px, ask_qty, bid_px, bid_qty = [np.zeros(shape) for _ in range(4)]
+    for row, orderbook in enumerate(orderbooks):
+        for col, (px, qty) in enumerate(orderbook["asks"][0:depth]):
+            ask_px[row, col] = px
+            ask_qty[row, col] = qty
+        for col, (px, qty) in enumerate(orderbook["bids"][0:depth]):
+            bid_px[row, col] = px
+            bid_qty[row, col] = qty
+    fetch_ts = [orderbook.get("fetch_ts", None) for orderbook in orderbooks]
+    return BookStack(ask_px, ask_qty, bid_px, bid_qty, fetch_ts)
+
+
+def stack(orderbooks, depth=None):
+    if len(orderbooks) > 0 and isinstance(orderbooks[0], CompactOrderbook):
+        return stack_compact(orderbooks, depth)
+    return stack_levels(orderbooks, depth or 20)
+
+
+def analyze(book_stack, depths=(3,)):
+    """Prices every book of the stack at each of the given depths
+
+    Returns a dict with per book arrays for "mid" and "spread", and for
+    each depth a dict of "microprice", "weighted_mid", "imbalance",
+    "ask_volume" and "bid_volume".
+    """
+    ask_vol = np.cumsum(book_stack.ask_qty, axis=1)
+    bid_vol = np.cumsum(book_stack.bid_qty, axis=1)
+    ask_notional = np.cumsum(book_stack.ask_px * book_stack.ask_qty, axis=1)
+    bid_notional = np.cumsum(book_stack.bid_px * book_stack.bid_qty, axis=1)
+
+    best_ask = book_stack.ask_px[:, 0]
+    best_bid = book_stack.bid_px[:, 0]
+    result = {
+        "mid": (best_ask + best_bid) / 2,
+        "spread": best_ask - best_bid,
+    }
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for depth in depths:
+            col = min(depth, book_stack.depth) - 1
+            asks_vol = ask_vol[:, col]
+            bids_vol = bid_vol[:, col]
+            total_vol = asks_vol + bids_vol
+            # Same weighting as pricing.calc_microprice
+            microprice = (
+                best_ask * asks_vol + best_bid * bids_vol
+            ) / total_vol
+            # Mean of the volume weighted ask and bid prices
+            weighted_mid = (
+                ask_notional[:, col] / asks_vol +
+                bid_notional[:, col] / bids_vol
+            ) / 2
+            result[depth] = {
+                "microprice": microprice,
+                "weighted_mid": weighted_mid,
+                "imbalance": (bids_vol - asks_vol) / total_vol,
+                "ask_volume": asks_vol,
+                "bid_volume": bids_vol,
+            }
+    return result
@@ -0,0 +1,142 @@
+from array import array
+from decimal import Decimal, Context, ROUND_DOWN
+
+# Prices and quantities are kept as integers scaled by 10^8
+SCALE_DIGITS = 8
+SCALE = 10 ** SCALE_DIGITS
+DEFAULT_DEPTH = 20
+
+
+def parse_scaled(raw, digits=SCALE_DIGITS):
+    # Parses a decimal string into an integer scaled by 10^digits
+    # Digits beyond the scale are truncated
+    text = str(raw).strip()
+    negative = text.startswith("-")
+    if negative or text.startswith("+"):
+        text = text[1:]
+    whole, _, frac = text.partition(".")
+    frac = (frac + "0" * digits)[0:digits]
+    value = int(whole or "0") * (10 ** digits) + int(frac or "0")
+    return -value if negative else value
+
+
+def to_decimal(value, digits=SCALE_DIGITS):
+    # Exact conversion regardless of the current decimal context
+    return Decimal(value).scaleb(-digits, context=Context(prec=60))
+
+
+def from_decimal(value, digits=SCALE_DIGITS):
+    # Truncates a Decimal into an integer scaled by 10^digits
+    scaled = Decimal(value).scaleb(digits, context=Context(prec=60))
+    return int(scaled.to_integral_value(rounding=ROUND_DOWN))
+
+
+class CompactOrderbook:
+    __slots__ = (
+        "depth",
+        "fetch_ts",
+        "ask_px",
+        "ask_qty",
+        "bid_px",
+        "bid_qty",
+        "n_asks",
+        "n_bids",
+    )
+
+    def __init__(self, depth=DEFAULT_DEPTH):
+        self.depth = depth
+        self.fetch_ts = None
+        # Parallel arrays, best price first
+        self.ask_px = array("q", bytes(8 * depth))
+        self.ask_qty = array("q", bytes(8 * depth))
+        self.bid_px = array("q", bytes(8 * depth))
+        self.bid_qty = array("q", bytes(8 * depth))
+        self.n_asks = 0
+        self.n_bids = 0
+
+    def clear(self):
+        self.n_asks = 0
+        self.n_bids = 0
+        self.fetch_ts = None
+
+    def push_ask(self, px, qty):
+        if self.n_asks >= self.depth:
+            return False
+        self.ask_px[self.n_asks] = px
+        self.ask_qty[self.n_asks] = qty
+        self.n_asks += 1
+        return True
+
+    def push_bid(self, px, qty):
+        if self.n_bids >= self.depth:
+            return False
+        self.bid_px[self.n_bids] = px
+        self.bid_qty[self.n_bids] = qty
+        self.n_bids += 1
+        return True
+
+    def load(self, asks, bids, fetch_ts=None):
+        # Levels are raw exchange rows {"price": "...", "qty": "..."}
+        self.clear()
+        self.fetch_ts = fetch_ts
+        for level in asks:
+            if not self.push_ask(
+                parse_scaled(level["price"]),
+                parse_scaled(level["qty"]),
+            ):
+                break
+        for level in bids:
+            if not self.push_bid(
+                parse_scaled(level["price"]),
+                parse_scaled(level["qty"]),
+            ):
+                break
+        return self
+
+    def ask_volume(self, levels=3):
+        return sum(self.ask_qty[0:min(levels, self.n_asks)])
+
+    def bid_volume(self, levels=3):
+        return sum(self.bid_qty[0:min(levels, self.n_bids)])
+
+    def mid(self):
+        # Scaled mid price
+        return (self.ask_px[0] + self.bid_px[0]) // 2
+
+    def spread(self):
+        return self.ask_px[0] - self.bid_px[0]
+
+    def microprice(self, levels=3):
+        # Scaled microprice, same weighting as pricing.calc_microprice
+        asks_vol = self.ask_volume(levels)
+        bids_vol = self.bid_volume(levels)
+        total_vol = asks_vol + bids_vol
+        if self.n_asks == 0 or self.n_bids == 0 or total_vol == 0:
+            raise ValueError("Orderbook has no depth")
+        weighted = self.ask_px[0] * asks_vol + self.bid_px[0] * bids_vol
+        return weighted // total_vol
+
+    def imbalance(self, levels=3):
+        # Scaled (bids - asks) / (bids + asks) over the top levels
+        asks_vol = self.ask_volume(levels)
+        bids_vol = self.bid_volume(levels)
+        total_vol = asks_vol + bids_vol
+        if total_vol == 0:
+            return 0
+        # Truncated towards zero so both sides round alike
+        imbalance = (abs(bids_vol - asks_vol) * SCALE) // total_vol
+        return imbalance if bids_vol >= asks_vol else -imbalance
+
+    def asks(self, levels=None):
+        n = self.n_asks if levels is None else min(levels, self.n_asks)
+        return [
+            (to_decimal(self.ask_px[idx]), to_decimal(self.ask_qty[idx]))
+            for idx in range(n)
+        ]
+
+    def bids(self, levels=None):
+        n = self.n_bids if levels is None else min(levels, self.n_bids)
+        return [
+            (to_decimal(self.bid_px[idx]), to_decimal(self.bid_qty[idx]))
+            for idx in range(n)
+        ]
@@ -0,0 +1,151 @@
+from decimal import Decimal
+
+from oracle_voter.markets.book import parse_scaled, to_decimal
+
+# Exchange rates carry 18 decimals on chain
+WEI_DIGITS = 18
+WEI_SCALE = 10 ** WEI_DIGITS
+
+
+def div_round(numerator, denominator):
+    # Integer division rounding half to even, the Decimal default
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if denominator < 0:
+        twice = -twice
+        denominator = -denominator
+    if twice > denominator or (twice == denominator and quotient % 2 == 1):
+        quotient += 1
+    return quotient
+
+
+class FixedPx:
+    """Price as an integer scaled by 10^18
+
+    Arithmetic is exact integer math and never depends on the
+    decimal context. str() gives the 18 decimal on chain format.
+    """
+    __slots__ = ("raw",)
+
+    def __init__(self, raw=0):
+        self.raw = int(raw)
+
+    @classmethod
+    def from_int(cls, value):
+        return cls(int(value) * WEI_SCALE)
+
+    @classmethod
+    def from_str(cls, text):
+        return cls(parse_scaled(text, WEI_DIGITS))
+
+    @classmethod
+    def from_scaled(cls, value, digits):
+        # From an integer scaled by 10^digits
+        if digits <= WEI_DIGITS:
+            return cls(int(value) * 10 ** (WEI_DIGITS - digits))
+        return cls(div_round(int(value), 10 ** (digits - WEI_DIGITS)))
+
+    @classmethod
+    def from_decimal(cls, value):
+        sign, digits, exponent = value.as_tuple()
+        raw = int("".join(str(digit) for digit in digits) or "0")
+        if sign:
+            raw = -raw
+        return cls.from_scaled(raw, -exponent) if exponent < 0 else \
+            cls(raw * 10 ** exponent * WEI_SCALE)
+
+    @classmethod
+    def from_float(cls, value):
+        # Exact binary value of the float, as Decimal(float) would give
+        numerator, denominator = float(value).as_integer_ratio()
+        return cls(div_round(numerator * WEI_SCALE, denominator))
+
+    @classmethod
+    def coerce(cls, value):
+        if isinstance(value, FixedPx):
+            return value
+        if isinstance(value, bool):
+            raise TypeError(f"Unable to convert {value!r} to FixedPx")
+        if isinstance(value, int):
+            return cls.from_int(value)
+        if isinstance(value, float):
+            return cls.from_float(value)
+        if isinstance(value, Decimal):
+            return cls.from_decimal(value)
+        if isinstance(value, str):
+            return cls.from_str(value)
+        raise TypeError(f"Unable to convert {value!r} to FixedPx")
+
+    def mul(self, other):
+        if isinstance(other, int):
+            return FixedPx(self.raw * other)
+        other = FixedPx.coerce(other)
+        return FixedPx(div_round(self.raw * other.raw, WEI_SCALE))
+
+    def div(self, other):
+        if isinstance(other, int):
+            return FixedPx(div_round(self.raw, other))
+        other = FixedPx.coerce(other)
+        return FixedPx(div_round(self.raw * WEI_SCALE, other.raw))
+
+    def round_sig(self, figures):
+        # Round half to even to a number of significant figures
+        drop = len(str(abs(self.raw))) - figures
+        if drop <= 0:
+            return self
+        unit = 10 ** drop
+        return FixedPx(div_round(self.raw, unit) * unit)
+
+    def to_decimal(self):
+        return to_decimal(self.raw, WEI_DIGITS)
+
+    def __mul__(self, other):
+        return self.mul(other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        return self.div(other)
+
+    def __add__(self, other):
+        return FixedPx(self.raw + FixedPx.coerce(other).raw)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return FixedPx(self.raw - FixedPx.coerce(other).raw)
+
+    def __neg__(self):
+        return FixedPx(-self.raw)
+
+    def __abs__(self):
+        return FixedPx(abs(self.raw))
+
+    def __eq__(self, other):
+        try:
+            return self.raw == FixedPx.coerce(other).raw
+        except TypeError:
+            return NotImplemented
+
+    def __lt__(self, other):
+        return self.raw < FixedPx.coerce(other).raw
+
+    def __le__(self, other):
+        return self.raw <= FixedPx.coerce(other).raw
+
+    def __gt__(self, other):
+        return self.raw > FixedPx.coerce(other).raw
+
+    def __ge__(self, other):
+        return self.raw >= FixedPx.coerce(other).raw
+
+    def __hash__(self):
+        return hash(self.raw)
+
+    def __str__(self):
+        sign = "-" if self.raw < 0 else ""
+        whole, frac = divmod(abs(self.raw), WEI_SCALE)
+        return f"{sign}{whole}.{frac:018d}"
+
+    def __repr__(self):
+        return f"FixedPx('{self}')"
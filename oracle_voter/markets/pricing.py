@@ -1,5 +1,9 @@
 from functools import reduce
-from decimal import Decimal, getcontext
+from decimal import Decimal, localcontext
+from oracle_voter.markets.book import CompactOrderbook, SCALE, SCALE_DIGITS
+from oracle_voter.markets.fixed import FixedPx
+
+MICROPRICE_FIGURES = 6  # 6 Significant Figures
 
 
 def sum_volumes(acc, order_row):
@@ -8,14 +12,38 @@ def sum_volumes(acc, order_row):
 
 
 def calc_microprice(orderbook, levels=3):
-    getcontext().prec = 6  # 6 Significant Figures
-    asks_vol = reduce(sum_volumes, orderbook["asks"][0:levels], Decimal("0.0"))
-    bids_vol = reduce(sum_volumes, orderbook["bids"][0:levels], Decimal("0.0"))
+    # Local context so the rest of the process keeps its precision
+    with localcontext() as ctx:
+        ctx.prec = MICROPRICE_FIGURES
+        if isinstance(orderbook, CompactOrderbook):
+            return Decimal(orderbook.microprice(levels)) / SCALE
+
+        asks_vol = reduce(
+            sum_volumes,
+            orderbook["asks"][0:levels],
+            Decimal("0.0"),
+        )
+        bids_vol = reduce(
+            sum_volumes,
+            orderbook["bids"][0:levels],
+            Decimal("0.0"),
+        )
+
+        ask_px, ask_qty = orderbook["asks"][0]
+        bid_px, bid_qty = orderbook["bids"][0]
+
+        microprice = (
+            ask_px * asks_vol + bid_px * bids_vol
+        ) / (bids_vol + asks_vol)
+        return microprice
 
-    ask_px, ask_qty = orderbook["asks"][0]
-    bid_px, bid_qty = orderbook["bids"][0]
 
-    microprice = (
-        ask_px * asks_vol + bid_px * bids_vol
-    ) / (bids_vol + asks_vol)
-    return microprice
+def calc_microprice_px(orderbook, levels=3):
+    # Microprice as a FixedPx rounded to the same significant figures
+    if isinstance(orderbook, CompactOrderbook):
+        microprice = FixedPx.from_scaled(
+            orderbook.microprice(levels),
+            SCALE_DIGITS,
+        )
+        return microprice.round_sig(MICROPRICE_FIGURES)
+    return FixedPx.from_decimal(calc_microprice(orderbook, levels))
@@ -0,0 +1,76 @@
+from collections import deque
+
+from oracle_voter.markets.book import from_decimal, to_decimal
+
+
+class TradeTape:
+    """Time windowed trade tape with running VWAP and TWAP sums
+
+    Trades are kept oldest first in a ring buffer, every add and eviction
+    adjusts the sums in O(1) so reads never rescan the window.
+    Prices and quantities are integers scaled by 10^8.
+    """
+
+    def __init__(self, window=300):
+        self.window = int(window)
+        self.trades = deque()
+        self.seen = set()
+        # VWAP Sums
+        self.sum_pq = 0
+        self.sum_q = 0
+        # TWAP Sums over the closed segments between trades
+        self.sum_pt = 0
+        self.sum_t = 0
+
+    def __len__(self):
+        return len(self.trades)
+
+    def add(self, ts, trade_id, px, qty):
+        ts = int(ts)
+        key = (ts, str(trade_id))
+        if key in self.seen:
+            return False
+        # Out of order trades can not be placed incrementally
+        if len(self.trades) > 0 and ts < self.trades[-1][0]:
+            return False
+        scaled_px = from_decimal(px)
+        scaled_qty = from_decimal(qty)
+        if len(self.trades) > 0:
+            last_ts, _, last_px, _ = self.trades[-1]
+            self.sum_pt += last_px * (ts - last_ts)
+            self.sum_t += ts - last_ts
+        self.trades.append((ts, key, scaled_px, scaled_qty))
+        self.seen.add(key)
+        self.sum_pq += scaled_px * scaled_qty
+        self.sum_q += scaled_qty
+        return True
+
+    def evict(self, now):
+        cutoff = int(now) - self.window
+        while len(self.trades) > 0 and self.trades[0][0] < cutoff:
+            ts, key, px, qty = self.trades.popleft()
+            self.seen.discard(key)
+            self.sum_pq -= px * qty
+            self.sum_q -= qty
+            if len(self.trades) > 0:
+                next_ts = self.trades[0][0]
+                self.sum_pt -= px * (next_ts - ts)
+                self.sum_t -= next_ts - ts
+
+    def vwap(self, now):
+        self.evict(now)
+        if self.sum_q == 0:
+            return None
+        return to_decimal(self.sum_pq // self.sum_q)
+
+    def twap(self, now):
+        self.evict(now)
+        if len(self.trades) == 0:
+            return None
+        # The last price holds from its trade until now
+        last_ts, _, last_px, _ = self.trades[-1]
+        open_t = max(int(now) - last_ts, 0)
+        sum_t = self.sum_t + open_t
+        if sum_t == 0:
+            return to_decimal(last_px)
+        return to_decimal((self.sum_pt + last_px * open_t) // sum_t)
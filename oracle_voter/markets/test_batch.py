@@ -0,0 +1,31 @@
+import numpy as np
+from oracle_voter.feeds.fixtures_coinone import get_orderbook_200
+from oracle_voter.markets import batch, fixtures_pricing
+from oracle_voter.markets.book import CompactOrderbook, to_decimal
+
+
+def compact_books():
+    raw = get_orderbook_200()
+    full = CompactOrderbook(depth=20).load(raw["ask"], raw["bid"])
+    shallow = CompactOrderbook(depth=2).load(raw["ask"], raw["bid"])
+    return [full, shallow]
+
+
+def test_analyze_matches_compact_book():
+    books = compact_books()
+    result = batch.analyze(batch.stack(books), depths=(1, 3))
+    assert result["mid"].tolist() == [263.5, 263.5]
+    assert result["spread"].tolist() == [1.0, 1.0]
+    expected = float(to_decimal(books[0].microprice(3)))
+    assert np.isclose(result[3]["microprice"][0], expected)
+    expected = float(to_decimal(books[0].imbalance(3)))
+    assert np.isclose(result[3]["imbalance"][0], expected, atol=1e-8)
+    # Second book only holds 2 levels
+    assert np.isclose(result[3]["ask_volume"][1], 3583.053 + 378.8709)
+    assert np.isclose(result[1]["weighted_mid"][0], 263.5)
+
+
+def test_analyze_level_snapshots():
+    orderbook = fixtures_pricing.get_orderbook_one()
+    result = batch.analyze(batch.stack([orderbook, orderbook]), depths=(3,))
+    assert np.allclose(result[3]["microprice"], 263.56333931)
@@ -0,0 +1,39 @@
+from decimal import Decimal
+from oracle_voter.feeds.fixtures_coinone import get_orderbook_200
+from oracle_voter.markets.book import (
+    CompactOrderbook,
+    parse_scaled,
+    to_decimal,
+    SCALE,
+)
+
+
+def test_parse_scaled():
+    assert parse_scaled("264.0") == 264 * SCALE
+    assert parse_scaled("3583.053") == 358305300000
+    assert parse_scaled("-1.5") == -150000000
+    assert parse_scaled("0.123456789") == 12345678
+    assert to_decimal(parse_scaled("609.1189")) == Decimal("609.1189")
+
+
+def test_compact_orderbook_fixed_depth():
+    raw = get_orderbook_200()
+    book = CompactOrderbook(depth=5).load(raw["ask"], raw["bid"])
+    assert book.n_asks == 5
+    assert book.n_bids == 5
+    assert book.asks(2) == [
+        (Decimal("264.0"), Decimal("3583.053")),
+        (Decimal("265.0"), Decimal("378.8709")),
+    ]
+    assert book.bids(1) == [(Decimal("263.0"), Decimal("609.1189"))]
+
+
+def test_compact_orderbook_analytics():
+    raw = get_orderbook_200()
+    book = CompactOrderbook().load(raw["ask"], raw["bid"])
+    assert to_decimal(book.ask_volume(3)) == Decimal("4563.643")
+    assert to_decimal(book.bid_volume(3)) == Decimal("3537.4124")
+    assert to_decimal(book.mid()) == Decimal("263.5")
+    assert to_decimal(book.spread()) == Decimal("1")
+    assert to_decimal(book.microprice(3)) == Decimal("263.56333931")
+    assert to_decimal(book.imbalance(3)) == Decimal("-0.12667863")
@@ -0,0 +1,57 @@
+import pytest
+from decimal import Decimal, getcontext
+from oracle_voter.markets import fixtures_pricing
+from oracle_voter.markets.fixed import FixedPx, div_round
+from oracle_voter.markets.pricing import calc_microprice, calc_microprice_px
+
+
+def test_div_round_half_even():
+    assert div_round(5, 2) == 2
+    assert div_round(7, 2) == 4
+    assert div_round(-5, 2) == -2
+    assert div_round(-7, 2) == -4
+    assert div_round(8, 3) == 3
+
+
+def test_fixed_px_str_format():
+    assert str(FixedPx.from_int(-1)) == "-1.000000000000000000"
+    assert str(FixedPx.from_str("263.563")) == "263.563000000000000000"
+    assert str(FixedPx.from_str("0.25")) == "0.250000000000000000"
+
+
+def test_fixed_px_from_float_matches_decimal():
+    raw = 2.32551221449594322
+    expected = Decimal(raw).quantize(Decimal(10) ** -18)
+    assert str(FixedPx.from_float(raw)) == str(expected)
+
+
+def test_fixed_px_from_decimal():
+    assert FixedPx.from_decimal(Decimal("1E+2")) == FixedPx.from_int(100)
+    assert FixedPx.from_decimal(Decimal("-0.5")) == FixedPx.from_str("-0.5")
+
+
+def test_fixed_px_arithmetic():
+    px = FixedPx.from_str("2.25758")
+    krw = FixedPx.from_str("300.396")
+    assert str(px * krw) == "678.168001680000000000"
+    assert str((px * krw).round_sig(6)) == "678.168000000000000000"
+    assert str(FixedPx.from_int(1) / FixedPx.from_int(3)) == \
+        "0.333333333333333333"
+    assert str(FixedPx.from_int(2) / 3) == "0.666666666666666667"
+    assert abs(FixedPx.from_int(-2)) > FixedPx.from_str("1.5")
+
+
+def test_fixed_px_coerce_rejects_unknown():
+    with pytest.raises(TypeError):
+        FixedPx.coerce(None)
+
+
+def test_calc_microprice_keeps_global_context():
+    prec = getcontext().prec
+    calc_microprice(fixtures_pricing.get_orderbook_one())
+    assert getcontext().prec == prec
+
+
+def test_calc_microprice_px():
+    result = calc_microprice_px(fixtures_pricing.get_orderbook_one())
+    assert str(result) == "263.563000000000000000"
@@ -0,0 +1,37 @@
+from decimal import Decimal
+from oracle_voter.markets.tape import TradeTape
+
+
+def test_tape_dedupes_trades():
+    tape = TradeTape(window=60)
+    assert tape.add(100, "1", Decimal("10"), Decimal("1")) is True
+    assert tape.add(100, "1", Decimal("10"), Decimal("1")) is False
+    assert tape.add(99, "0", Decimal("10"), Decimal("1")) is False
+    assert len(tape) == 1
+
+
+def test_tape_vwap_window():
+    tape = TradeTape(window=60)
+    tape.add(100, "1", Decimal("10"), Decimal("1"))
+    tape.add(110, "2", Decimal("20"), Decimal("3"))
+    assert tape.vwap(120) == Decimal("17.5")
+    # First trade falls out of the window
+    tape.add(170, "3", Decimal("30"), Decimal("1"))
+    assert tape.vwap(170) == Decimal("22.5")
+    assert len(tape) == 2
+    assert tape.vwap(1000) is None
+
+
+def test_tape_twap():
+    tape = TradeTape(window=60)
+    assert tape.twap(100) is None
+    tape.add(100, "1", Decimal("10"), Decimal("1"))
+    assert tape.twap(100) == Decimal("10")
+    tape.add(110, "2", Decimal("20"), Decimal("5"))
+    # 10 for 10s, 20 for 30s
+    assert tape.twap(140) == Decimal("17.5")
+    tape.add(150, "3", Decimal("30"), Decimal("1"))
+    # 10 for 10s, 20 for 40s, 30 for 10s
+    assert tape.twap(160) == Decimal("20")
+    # First trade evicted, 20 for 40s, 30 for 20s
+    assert tape.twap(170) == Decimal("23.33333333")
@@ -0,0 +1,75 @@
+import simplejson as json
+
+from oracle_voter.bench.exchange import (  # noqa: F401
+    EXCHANGE,
+    LCD,
+    quotes,
+    replay_rates,
+)
+from oracle_voter.chain.mocks.fixture_utils import (
+    mock_active_denoms,
+    mock_block_data,
+    mock_onchain_rates,
+)
+
+
+def row(ts, url, body, params=None, status=200, latency=0.01):
+    return {
+        "ts": ts,
+        "method": "GET",
+        "url": url,
+        "params": params or {},
+        "data": None,
+        "status": status,
+        "latency": latency,
+        "body": body if isinstance(body, str) else json.dumps(body),
+        "error": None,
+    }
+
+
+def build_recording(first_height, blocks, failing=(), block_time=6.0):
+    # One block every block_time, exchanges failing at the given heights
+    rows = list()
+    for idx in range(blocks):
+        height = first_height + idx
+        ts = 1579497600.0 + idx * block_time
+        rows.append(row(ts, f"{LCD}/blocks/latest", mock_block_data(
+            height,
+            f"{height:064X}",
+            f"{height - 1:064X}",
+        )))
+        rows.append(row(
+            ts + 0.1,
+            f"{LCD}/oracle/denoms/actives",
+            mock_active_denoms(height),
+        ))
+        rows.append(row(
+            ts + 0.1,
+            f"{LCD}/oracle/denoms/exchange_rates",
+            mock_onchain_rates(
+                height,
+                ukrw="300.000000000000000000",
+                umnt="684.542466258089234543",
+                usdr="0.182737050935369655",
+                uusd="0.251817321037518416",
+            ),
+        ))
+        for target, price in quotes.items():
+            if height in failing:
+                rows.append(row(
+                    ts + 0.2,
+                    EXCHANGE,
+                    "",
+                    {"target": target},
+                    status=500,
+                    latency=0.5,
+                ))
+            else:
+                rows.append(row(
+                    ts + 0.2,
+                    EXCHANGE,
+                    {"price": price},
+                    {"target": target},
+                    latency=0.25,
+                ))
+    return rows
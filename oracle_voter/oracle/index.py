@@ -0,0 +1,75 @@
+from oracle_voter.markets.fixed import FixedPx
+
+
+class DenomIndex:
+    """Per denom lookups for the Oracle hot path
+
+    Market definitions and pair types are indexed once from the
+    supported rates, the vote and prevote denoms are rebuilt only when
+    the chain's active set changes, and chain rates once per period.
+    """
+
+    def __init__(self, supported_rates, base_denom="ukrw"):
+        # Derivative rates are priced against the base denom
+        self.base_denom = base_denom
+        self.rates = dict()
+        self.pair_types = dict()
+        self.depends_on = dict()
+        for rate_info in supported_rates:
+            denom = rate_info["denom"]
+            self.rates[denom] = rate_info
+            self.pair_types[denom] = rate_info["pair_type"]
+            if rate_info["pair_type"] == "derivative":
+                self.depends_on[denom] = base_denom
+
+        self.actives = None
+        self.vote_denoms = list()
+        self.prevote_stages = list()
+        self.chain_rates = None
+
+    def __contains__(self, denom):
+        return denom in self.rates
+
+    def rate_info(self, denom):
+        return self.rates.get(denom, None)
+
+    def pair_type(self, denom):
+        return self.pair_types.get(denom, None)
+
+    def update_actives(self, actives):
+        actives = tuple(actives)
+        if actives == self.actives:
+            return False
+        self.actives = actives
+        self.vote_denoms = [denom for denom in actives if denom in self.rates]
+        # Dependencies are priced in the first stage
+        natives = [
+            denom for denom in self.vote_denoms
+            if self.pair_types[denom] != "derivative"
+        ]
+        derivatives = [
+            denom for denom in self.vote_denoms
+            if self.pair_types[denom] == "derivative"
+        ]
+        needed = set(natives)
+        for denom in derivatives:
+            dependency = self.depends_on[denom]
+            if dependency not in needed and dependency in self.rates:
+                natives.insert(0, dependency)
+                needed.add(dependency)
+        self.prevote_stages = [stage for stage in (natives, derivatives) if stage]
+        return True
+
+    def update_chain_rates(self, current_rates):
+        if current_rates is None:
+            self.chain_rates = None
+            return
+        self.chain_rates = {
+            rate_row["denom"]: FixedPx.from_str(rate_row["amount"])
+            for rate_row in current_rates
+        }
+
+    def chain_rate(self, denom):
+        if self.chain_rates is None:
+            return None
+        return self.chain_rates.get(denom, None)
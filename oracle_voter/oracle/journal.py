@@ -0,0 +1,96 @@
+"""
+Prevote journal
+
+Salts and prices of broadcast prevotes are appended to a JSON lines file,
+fsynced once per prevote tx before it is broadcast. On restart the
+journal is replayed so the prevotes already on chain can be revealed in
+the next vote period instead of being lost.
+
+    {"denom": "ukrw", "hash": "...", "salt": "1a2b",
+     "px": "300.120000000000000000", "vp": 3709, "seq": 12}
+"""
+import os
+
+import simplejson as json
+
+from oracle_voter.markets.fixed import FixedPx
+
+# A prevote is revealed in the vote period following it
+REVEAL_WINDOW = 1
+
+
+class PrevoteJournal:
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = list()
+        self.entries = list()
+        self.fp = None
+
+    def open(self):
+        if self.fp is None:
+            self.fp = open(self.path, "a")
+        return self.fp
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+    def replay(self):
+        self.entries = list()
+        if not os.path.exists(self.path):
+            return self.entries
+        with open(self.path, "r") as source:
+            for line in source:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn last line from a crash mid write
+                    print(f"Skipping corrupt journal line in {self.path}")
+                    continue
+                entry["px"] = FixedPx.from_str(entry["px"])
+                self.entries.append(entry)
+        return self.entries
+
+    def append(self, denom, hashed, salt, px, vp, seq):
+        self.pending.append({
+            "denom": denom,
+            "hash": hashed,
+            "salt": salt,
+            "px": px,
+            "vp": int(vp),
+            "seq": seq,
+        })
+
+    def dumps(self, entry):
+        return json.dumps(dict(entry, px=str(entry["px"])))
+
+    def flush(self):
+        if len(self.pending) == 0:
+            return 0
+        fp = self.open()
+        fp.write("".join(self.dumps(entry) + "\n" for entry in self.pending))
+        fp.flush()
+        os.fsync(fp.fileno())
+        written = len(self.pending)
+        self.entries += self.pending
+        self.pending = list()
+        return written
+
+    def compact(self, current_vp):
+        # Prevotes from before the reveal window can no longer be revealed
+        min_vp = int(current_vp) - REVEAL_WINDOW
+        kept = [entry for entry in self.entries if entry["vp"] >= min_vp]
+        if len(kept) == len(self.entries):
+            return 0
+        self.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as target:
+            target.write("".join(self.dumps(entry) + "\n" for entry in kept))
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(tmp_path, self.path)
+        dropped = len(self.entries) - len(kept)
+        self.entries = kept
+        return dropped
@@ -2,24 +2,71 @@
 
 # from chain.core import Transaction
 # from wallet.cli import CLIWallet
+from contextlib import contextmanager
 from functools import partial, reduce
+from hashlib import sha256
 from secrets import token_hex
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.backends import default_backend
 from aiohttp.client_exceptions import ClientConnectionError
-from decimal import Decimal, Context
 import asyncio
+import time
 import simplejson as json
 from collections import deque, OrderedDict
 
 from oracle_voter.oracle.utils import get_vote_period
-from oracle_voter.feeds.markets import supported_rates, WEI_VALUE, ABSTAIN_VOTE_PX, ExchangeErr
+from oracle_voter.oracle.index import DenomIndex
+from oracle_voter.feeds.markets import supported_rates, ABSTAIN_VOTE_PX, ExchangeErr
+from oracle_voter.markets.fixed import FixedPx
 from oracle_voter.chain.core import Transaction
 from oracle_voter.common.client import HttpError
-
-denom_supported_rates = [
-    market_info["denom"] for market_info in supported_rates
-]
+from oracle_voter.common import scheduler
+from oracle_voter.common.metrics import registry
+from oracle_voter.common.profiler import profiler
+from oracle_voter.common.tracing import tracer
+
+# Abstain if the market price is more than 2% away from the chain price
+MAX_PX_DEVIATION = FixedPx.from_str("0.02")
+
+# Voted prices are rounded to 6 significant figures
+VOTE_PX_FIGURES = 6
+
+# Seconds per block until block times are observed
+DEFAULT_BLOCK_TIME = 6.0
+
+STAGE_SECONDS = registry.histogram(
+    "oracle_stage_seconds",
+    "Time spent in each stage of a height or vote period",
+    ("stage",),
+)
+ABSTAINS = registry.counter(
+    "oracle_abstains_total",
+    "Prevotes made with the abstain price",
+    ("denom",),
+)
+BROADCASTS = registry.counter(
+    "oracle_broadcasts_total",
+    "Vote and prevote txs broadcast",
+    ("tx_type", "result"),
+)
+TX_RESULTS = registry.counter(
+    "oracle_tx_results_total",
+    "Vote and prevote txs found on chain",
+    ("tx_type", "success"),
+)
+INCLUSION_BLOCKS = registry.histogram(
+    "oracle_inclusion_blocks",
+    "Blocks from broadcast to inclusion",
+    ("tx_type",),
+    buckets=(0, 1, 2, 3, 4, 5, 10, 20),
+)
+CURRENT_HEIGHT = registry.gauge("oracle_height", "Latest height seen")
+VOTE_PERIOD = registry.gauge("oracle_vote_period", "Current vote period")
+
+
+@contextmanager
+def timed_stage(name, **attrs):
+    # Timed in the stage histogram and traced in the vote period
+    with STAGE_SECONDS.time(stage=name), tracer.span(name, **attrs) as span:
+        yield span
 
 
 class Oracle:
@@ -33,6 +80,8 @@ class Oracle:
         chain_id="soju-0012",
         gas_fee="1000",
         gas_denom="uluna",
+        price_board=None,
+        journal=None,
     ):
         self.vote_period = vote_period
         self.lcd_node = lcd_node
@@ -42,11 +91,26 @@ class Oracle:
         self.wallet = wallet
         self.gas_fee = gas_fee
         self.gas_denom = gas_denom
+        # Shared feed prices when several Oracles run in one process
+        self.price_board = price_board
 
         self.period_getter = partial(get_vote_period, self.vote_period)
 
+        # Built once, active denoms and chain rates refresh per period
+        self.denom_index = DenomIndex(supported_rates)
+
         self.current_vote_period = 0
+        # Last vote period a prevote was broadcast in
+        self.prevoted_period = 0
+        # Wallet sync of the current height
+        self.wallet_sync = None
         self.current_height = 0
+        # Estimates when the vote period ends for the request scheduler
+        self.block_time = DEFAULT_BLOCK_TIME
+        self.last_height_ts = None
+        self.last_height = 0
+        # Wall time the poll that found the current height started
+        self.height_polled_at = None
         self.current_rates = None
 
         self.prior_prevotes = dict()
@@ -60,11 +124,16 @@ class Oracle:
         self.hist_votes = OrderedDict()
         self.hist_prevotes = OrderedDict()
 
-        self.rate_luna_ukrw = Decimal("-1.00")
+        self.rate_luna_krw = ABSTAIN_VOTE_PX
         # Denom to Hash
         self.hash_map = dict()
         self.hist_hash_map = dict()
 
+        # Prevotes made before a restart can still be revealed
+        self.journal = journal
+        if self.journal is not None:
+            self.restore_prevotes(self.journal.replay())
+
     """
     External Calls
     """
@@ -74,17 +143,28 @@ class Oracle:
     if anoy of the below external call throws
     """
     async def retrieve_tx(self, tx_hash):
-        raw_res = await self.lcd_node.get_tx(tx_hash)
+        with scheduler.priority(scheduler.CONFIRMATION):
+            raw_res = await self.lcd_node.get_tx(tx_hash)
+        if raw_res is None:
+            # Not found or shed, checked again next height
+            raise HttpError(f"Tx {tx_hash} not found", 404, None)
         return raw_res
 
     async def retrieve_height(self):
-        raw_res = await self.lcd_node.get_latest_block()
+        polled_at = time.time()
+        # Every other request waits on the next height
+        with scheduler.priority(scheduler.PRICE_FETCH):
+            raw_res = await self.lcd_node.get_latest_block()
         if raw_res is None:
             return
         block_meta = raw_res["block_meta"]
         current_height = int(block_meta["header"]["height"])
+        await self.on_height(current_height, polled_at)
+
+    async def on_height(self, current_height, polled_at=None):
         if current_height > self.current_height:
             self.current_height = current_height
+            self.height_polled_at = polled_at
             await self.new_height(int(current_height))
 
     async def retrieve_chain_rates(self):
@@ -105,23 +185,31 @@ class Oracle:
 
     async def retrieve_prevotes(self, denom):
         try:
-            raw_res = await self.lcd_node.get_oracle_prevotes_validator(
-                denom=denom,
-                validator_addr=self.validator_addr,
-            )
+            with scheduler.priority(scheduler.REVEAL_LOOKUP):
+                raw_res = await self.lcd_node.get_oracle_prevotes_validator(
+                    denom=denom,
+                    validator_addr=self.validator_addr,
+                )
             prevotes = raw_res["result"]
             return prevotes
         except HttpError:
             return list()
 
     async def sync_wallet(self):
-        await self.wallet.sync_state()
+        # The period's txs are built from it, so it is never shed
+        with scheduler.priority(scheduler.REVEAL_LOOKUP):
+            await self.wallet.sync_state()
 
     async def query_feed(self, market_info):
         try:
-            feed_px = await market_info["feed"]()
-            feed_weight = market_info["weight"]
-            return (feed_px * Decimal(feed_weight))
+            with scheduler.priority(scheduler.PRICE_FETCH):
+                if self.price_board is not None:
+                    raw_px = await self.price_board.price(market_info)
+                else:
+                    raw_px = await market_info["feed"]()
+            feed_px = FixedPx.coerce(raw_px)
+            feed_weight = int(market_info["weight"])
+            return feed_px * feed_weight
         except ExchangeErr as err:
             print(err)
             print(err.exchange_err)
@@ -130,29 +218,40 @@ class Oracle:
             return None
 
     async def get_denom_px(self, markets):
+        markets = [
+            market_info for market_info in markets
+            if market_info["weight"] > 0
+        ]
         task_feed = [
-            self.query_feed(market_info) for market_info in markets
+            self.traced_query_feed(market_info) for market_info in markets
         ]
-        feed_weights = [market_info["weight"] for market_info in markets]
+        feed_weights = [int(market_info["weight"]) for market_info in markets]
         # Sum of all the weights assigned in the feed's markets
-        total_weight = reduce(
-            lambda acc, x: acc + x,
-            feed_weights,
-            Decimal("0.0"),
-        )
+        total_weight = sum(feed_weights)
         market_pxs = await asyncio.gather(*task_feed)
         # If any market_pxs return None
         # We abstain
         failed_market_px = [mpx for mpx in market_pxs if mpx is None]
         if len(failed_market_px) > 0:
             return ABSTAIN_VOTE_PX
-        # Get the mean price of denom
-        market_px = reduce(
-            lambda acc, px: acc + (px / total_weight),
-            market_pxs,
-            Decimal("0.0"),
-        )
-        return market_px
+        with tracer.span("aggregation", feeds=len(market_pxs)):
+            # Get the weighted mean price of denom
+            market_px = reduce(
+                lambda acc, px: acc + px,
+                market_pxs,
+                FixedPx(0),
+            )
+            return (market_px / total_weight).round_sig(VOTE_PX_FIGURES)
+
+    async def traced_query_feed(self, market_info):
+        with tracer.span(
+            "feed",
+            exchange=market_info.get("exchange", None),
+        ) as span:
+            feed_px = await self.query_feed(market_info)
+            if span is not None and feed_px is None:
+                span.set(failed=True)
+            return feed_px
 
     """
     Internal Logic
@@ -192,6 +291,19 @@ class Oracle:
                         salt=prevote_cached["salt"],
                     )
 
+    def restore_prevotes(self, entries):
+        for entry in entries:
+            denom, hashed = entry["denom"], entry["hash"]
+            self.prior_prevotes[hashed] = {
+                "px": entry["px"],
+                "salt": entry["salt"],
+                "vp": entry["vp"],
+            }
+            self.hash_map[denom] = (entry["salt"], hashed)
+            if self.hist_hash_map.get(denom, None) is None:
+                self.hist_hash_map[denom] = dict()
+            self.hist_hash_map[denom][hashed] = entry["salt"]
+
     def get_rate_salt(self):
         return token_hex(2)
 
@@ -202,50 +314,30 @@ class Oracle:
         # 2. Make the Payload
         hash_payload = f"{rate_salt}:{str(px)}:{denom}:{self.validator_addr}"
         # 3. SHA256 Payload
-        digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
-        digest.update(bytes(hash_payload, "utf-8"))
-        hashed = digest.finalize().hex()[0:40]
+        hashed = sha256(bytes(hash_payload, "utf-8")).hexdigest()[0:40]
         return rate_salt, hashed
 
     async def append_prevote_msg(self, denom):
-        chain_rate = ABSTAIN_VOTE_PX
-        if self.current_rates is not None:
-            chain_rates = [
-                rate_row["amount"] for rate_row in self.current_rates if
-                rate_row["denom"] == denom
-            ]
-            # On Chain Last Exchange Rate
-            chain_rate = Decimal(chain_rates[0])
+        # On Chain Last Exchange Rate
+        chain_rate = self.denom_index.chain_rate(denom) or ABSTAIN_VOTE_PX
         # Get Rate Markets
-        denom_rate_info = [
-            rate_info for rate_info in supported_rates if
-            rate_info["denom"] == denom
-        ]
+        denom_rate_info = self.denom_index.rate_info(denom)
 
-        if len(denom_rate_info) > 0:
-            raw_markets = denom_rate_info[0]["markets"]
+        if denom_rate_info is not None:
+            raw_markets = denom_rate_info["markets"]
 
-            raw_px = await self.get_denom_px(raw_markets)
-            sug_market_px = raw_px.quantize(
-                WEI_VALUE,
-                context=Context(prec=40),
-            )
-            #
-            # TODO Check that our market_px is not too far away from chain px
-            #
-            if denom_rate_info[0]["pair_type"] == "native":
+            with tracer.span("price", denom=denom):
+                sug_market_px = await self.get_denom_px(raw_markets)
+            if denom_rate_info["pair_type"] == "native":
                 market_px = sug_market_px
-            elif raw_px == Decimal("-1.00"):
-                market_px = Decimal("-1.00").quantize(
-                    WEI_VALUE,
-                    context=Context(prec=40),
-                )
+            elif sug_market_px == ABSTAIN_VOTE_PX or \
+                    self.rate_luna_krw == ABSTAIN_VOTE_PX:
+                # Derived rates need both the swap and the luna/krw rate
+                market_px = ABSTAIN_VOTE_PX
             else:
-                market_px = \
-                    Decimal(sug_market_px * self.rate_luna_krw).quantize(
-                        WEI_VALUE,
-                        context=Context(prec=40),
-                    )
+                market_px = (sug_market_px * self.rate_luna_krw).round_sig(
+                    VOTE_PX_FIGURES,
+                )
             # If we are unable to get the latest exchange rates, abstain vote
             if self.current_rates is not None:
                 if chain_rate == ABSTAIN_VOTE_PX:
@@ -253,17 +345,21 @@ class Oracle:
                 else:
                     # Check that market_px is not more than x percent
                     # From last onchain price
-                    px_pct_diff = Decimal(1 - (market_px / chain_rate)).copy_abs()
-                    if (px_pct_diff > Decimal("0.02")):
+                    px_diff = abs(chain_rate - market_px)
+                    if px_diff > abs(chain_rate) * MAX_PX_DEVIATION:
                         market_px = ABSTAIN_VOTE_PX
 
-            if denom == "ukrw":
+            if market_px == ABSTAIN_VOTE_PX:
+                ABSTAINS.inc(denom=denom)
+
+            if denom == self.denom_index.base_denom:
                 self.rate_luna_krw = market_px
 
-            rate_salt, hashed = self.get_prevote_hash(
-                denom,
-                market_px,
-            )
+            with tracer.span("hashing", denom=denom):
+                rate_salt, hashed = self.get_prevote_hash(
+                    denom,
+                    market_px,
+                )
 
             self.hash_map[denom] = (rate_salt, hashed)
 
@@ -278,6 +374,15 @@ class Oracle:
                 "salt": rate_salt,
                 "vp": int(self.current_vote_period)
             }
+            if self.journal is not None:
+                self.journal.append(
+                    denom,
+                    hashed,
+                    rate_salt,
+                    market_px,
+                    self.current_vote_period,
+                    self.wallet.account_seq,
+                )
             self.prevote_msg_builder.append_prevotemsg(
                 hashed=hashed,
                 denom=denom,
@@ -287,15 +392,18 @@ class Oracle:
 
     async def sign_and_broadcast_votes(self):
         if len(self.vote_msg_builder.msgs) > 0:
-            #
-            signed_tx = self.vote_msg_builder.sign(self.wallet)
+            with tracer.span("signing", tx_type="vote"):
+                signed_tx = self.vote_msg_builder.sign(self.wallet)
             try:
-                broadcast_vote_res = await self.lcd_node.broadcast_tx_async(
-                    json.dumps({
-                        "tx": signed_tx["value"],
-                        "mode": "sync",
-                    })
-                )
+                with scheduler.priority(scheduler.BROADCAST), \
+                        tracer.span("broadcast", tx_type="vote") as span:
+                    broadcast_vote_res = \
+                        await self.lcd_node.broadcast_tx_async(json.dumps({
+                            "tx": signed_tx["value"],
+                            "mode": "sync",
+                        }))
+                    if span is not None:
+                        span.set(txhash=broadcast_vote_res["txhash"])
                 # TODO Validate that the Vote Has Passed sync
                 # self.last_vote_tx_hash = broadcast_vote_res["txhash"]
                 query_height = self.current_height + 4
@@ -304,25 +412,38 @@ class Oracle:
                 self.hist_votes[broadcast_vote_res["txhash"]] = {
                     "msgs": signed_tx["value"]["msg"],
                     "sent_height": self.current_height,
+                    "vote_period": self.current_vote_period,
                 }
+                BROADCASTS.inc(tx_type="vote", result="sent")
 
                 self.wallet.account_seq += 1
             except (HttpError, ClientConnectionError) as err:
                 print("Client Connection Issues")
                 print(err)
+                BROADCASTS.inc(tx_type="vote", result="failed")
                 self.wallet.account_seq += 1
 
     async def sign_and_broadcast_prevotes(self):
         if len(self.prevote_msg_builder.msgs) > 0:
-            #
+            # Salts must be on disk before the hashes are on chain
+            if self.journal is not None:
+                try:
+                    self.journal.flush()
+                except OSError as err:
+                    print("Unable to write prevote journal")
+                    print(err)
             try:
-                signed_tx = self.prevote_msg_builder.sign(self.wallet)
-                broadcast_prevote_res = await self.lcd_node.broadcast_tx_async(
-                    json.dumps({
-                        "tx": signed_tx["value"],
-                        "mode": "sync",
-                    })
-                )
+                with tracer.span("signing", tx_type="prevote"):
+                    signed_tx = self.prevote_msg_builder.sign(self.wallet)
+                with scheduler.priority(scheduler.BROADCAST), \
+                        tracer.span("broadcast", tx_type="prevote") as span:
+                    broadcast_prevote_res = \
+                        await self.lcd_node.broadcast_tx_async(json.dumps({
+                            "tx": signed_tx["value"],
+                            "mode": "sync",
+                        }))
+                    if span is not None:
+                        span.set(txhash=broadcast_prevote_res["txhash"])
                 # TODO Validate that the PreVote Has Passed sync
                 # self.last_prevote_tx_hash = broadcast_prevote_res["txhash"]
                 query_height = self.current_height + 1
@@ -331,12 +452,15 @@ class Oracle:
                 self.hist_prevotes[broadcast_prevote_res["txhash"]] = {
                     "msgs": signed_tx["value"]["msg"],
                     "sent_height": self.current_height,
+                    "vote_period": self.current_vote_period,
                 }
+                BROADCASTS.inc(tx_type="prevote", result="sent")
 
                 self.wallet.account_seq += 1
             except (HttpError, ClientConnectionError) as err:
                 print("Client Connection Issues")
                 print(err)
+                BROADCASTS.inc(tx_type="prevote", result="failed")
                 self.wallet.account_seq += 1
 
     def print_tx_hist(self, tx_hist):
@@ -382,6 +506,23 @@ Denom: {msg_val["denom"]} """)
             if len(failed_logs) > 0:
                 success = False
 
+            hist = self.hist_votes if tx_type == "vote" else \
+                self.hist_prevotes
+            blocks = int(raw_height) - hist[tx_hash]["sent_height"]
+            TX_RESULTS.inc(tx_type=tx_type, success=success)
+            INCLUSION_BLOCKS.observe(blocks, tx_type=tx_type)
+            # Linked to the broadcast span by the txhash
+            tracer.record(
+                "inclusion",
+                hist[tx_hash]["vote_period"],
+                tx_type=tx_type,
+                txhash=tx_hash,
+                height=int(raw_height),
+                blocks=blocks,
+                success=success,
+                validator=self.validator_addr,
+            )
+
             if tx_type == "vote":
                 # Check that all messages passed
                 self.hist_votes[tx_hash]["result"] = success
@@ -429,7 +570,6 @@ Denom: {msg_val["denom"]} """)
 
         await asyncio.gather(*tx_queries)
         print(f"----------({height})---------")
-        await self.sync_wallet(),
         print(f"----------Votes ---------")
         self.print_tx_hist(self.hist_votes)
         print(f"\n----------PreVotes ---------")
@@ -446,24 +586,88 @@ Denom: {msg_val["denom"]} """)
             head = list(self.hist_prevotes.keys())[0]
             self.hist_prevotes.pop(head, None)
 
+    def update_deadline(self, height):
+        now = asyncio.get_event_loop().time()
+        if self.last_height_ts is not None:
+            interval = (now - self.last_height_ts) / \
+                max(height - self.last_height, 1)
+            self.block_time = 0.8 * self.block_time + 0.2 * interval
+        self.last_height_ts = now
+        self.last_height = height
+        self.set_send_by(height)
+
+    def set_send_by(self, height):
+        # A prevote is only included in its period when broadcast before
+        # the last block of the period. Once it is out the next one goes
+        # on the first block of the next period
+        blocks_left = self.vote_period - height % self.vote_period
+        if self.period_getter(height) > self.prevoted_period:
+            blocks_left -= 1
+        scheduler.scheduler.set_deadline(
+            self.last_height_ts + blocks_left * self.block_time
+        )
+
     async def new_height(self, height):
+        self.update_deadline(height)
+        CURRENT_HEIGHT.set(height)
+        if self.price_board is not None:
+            # Board quotes are only used for the height being voted on
+            self.price_board.new_height(height)
         vote_period = self.period_getter(height)
+        # Started with the tx checks so an RPC node sends them as one
+        # batch, the vote period waits for it before building its txs
+        self.wallet_sync = asyncio.ensure_future(self.sync_wallet())
+        # Tx checks run alongside the vote period, behind its requests
+        await asyncio.gather(
+            self.wallet_sync,
+            self.timed_check_txs(height),
+            self.next_vote_period(height, vote_period),
+        )
+
+    async def timed_check_txs(self, height):
         # Check for tx success / fail
-        await self.check_txs(height)
+        with STAGE_SECONDS.time(stage="check_txs"):
+            await self.check_txs(height)
 
+    async def next_vote_period(self, height, vote_period):
         # Vote Period Increased
         if vote_period > self.current_vote_period:
             self.current_vote_period = vote_period
-            await self.new_vote_period()
+            VOTE_PERIOD.set(vote_period)
+            profiler.new_vote_period(vote_period)
+            with timed_stage(
+                "vote_period",
+                vote_period=vote_period,
+                validator=self.validator_addr,
+                height=height,
+            ):
+                if self.height_polled_at is not None:
+                    tracer.record(
+                        "block",
+                        vote_period,
+                        start=self.height_polled_at,
+                        duration=time.time() - self.height_polled_at,
+                        height=height,
+                    )
+                await self.new_vote_period()
+
+    async def wallet_ready(self):
+        # Txs need the account number and sequence from the chain
+        if self.wallet_sync is not None:
+            await self.wallet_sync
+        if not self.wallet.synced:
+            await self.sync_wallet()
+        return self.wallet.synced
 
     async def new_vote_period(self):
         # Get Actives
         # Get Rates for All Markets on Chain
         # Update Wallet
-        active_rates, current_rates = await asyncio.gather(
-            self.retrieve_chain_active_denoms(),
-            self.retrieve_chain_rates(),
-        )
+        with timed_stage("chain_state"):
+            active_rates, current_rates = await asyncio.gather(
+                self.retrieve_chain_active_denoms(),
+                self.retrieve_chain_rates(),
+            )
         if len(active_rates) == 0:
             print("--WARNING-- Terra Chain has no active rates--")
             active_rates = ["ukrw", "uusd", "usdr", "umnt"]
@@ -472,17 +676,20 @@ Denom: {msg_val["denom"]} """)
             self.current_rates = None
         else:
             self.current_rates = current_rates
+        self.denom_index.update_chain_rates(self.current_rates)
         # Filter and work on those we have implemented rates for
-        calc_rates = [
-            denom for denom in active_rates
-            if denom_supported_rates.count(denom) > 0
-        ]
+        # Only rebuilt when the active set changes
+        self.denom_index.update_actives(active_rates)
+        calc_rates = self.denom_index.vote_denoms
         # For each support rate
 
         # 1. Get PreVotes
         # 2a. If PreVotes is not empty, submit Vote
         # 2b  Append VoteMsg to VoteTx
         # 2c. If VoteMsgs length > 0, broadcast VoteTx
+        if not await self.wallet_ready():
+            print("--WARNING-- Wallet not synced, skipping vote period--")
+            return
         self.vote_msg_builder = Transaction(
             self.chain_id,
             self.wallet.account_num,
@@ -494,8 +701,17 @@ Denom: {msg_val["denom"]} """)
         append_vote_tasks = [
             self.append_vote_msg(denom) for denom in calc_rates
         ]
-        await asyncio.gather(*append_vote_tasks)
-        await self.sign_and_broadcast_votes()
+        with timed_stage("reveal_lookup"):
+            await asyncio.gather(*append_vote_tasks)
+        with timed_stage("vote_broadcast"):
+            await self.sign_and_broadcast_votes()
+
+        if self.journal is not None:
+            try:
+                self.journal.compact(self.current_vote_period)
+            except OSError as err:
+                print("Unable to compact prevote journal")
+                print(err)
 
         await asyncio.sleep(0.300)
 
@@ -503,10 +719,6 @@ Denom: {msg_val["denom"]} """)
         # 3b. Get Rates from various markets
         # 3c. Append PreVoteMsg to VoteTx
         # 3d. If PreVoteMsgs length > 0, broadcast PreVoteTx
-        calc_rates = [
-            denom for denom in active_rates
-            if (denom_supported_rates.count(denom) > 0 and denom != "ukrw")
-        ]
         self.prevote_msg_builder = Transaction(
             self.chain_id,
             self.wallet.account_num,
@@ -514,12 +726,16 @@ Denom: {msg_val["denom"]} """)
             gas_denom=self.gas_denom,
             gas_fee=self.gas_fee,
         )
-        # Filter Out the base pair luna/ukrw
-        # Get Luna UKRW First
-        await self.append_prevote_msg("ukrw")
-
-        append_prevote_tasks = [
-            self.append_prevote_msg(denom) for denom in calc_rates
-        ]
-        await asyncio.gather(*append_prevote_tasks)
-        await self.sign_and_broadcast_prevotes()
+        # Base pair luna/ukrw and other natives first,
+        # then the rates derived from them
+        with timed_stage("price_fetch"):
+            for stage in self.denom_index.prevote_stages:
+                append_prevote_tasks = [
+                    self.append_prevote_msg(denom) for denom in stage
+                ]
+                await asyncio.gather(*append_prevote_tasks)
+        with timed_stage("prevote_broadcast"):
+            await self.sign_and_broadcast_prevotes()
+        self.prevoted_period = self.current_vote_period
+        if self.last_height_ts is not None:
+            self.set_send_by(self.current_height)
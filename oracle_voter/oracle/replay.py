@@ -0,0 +1,347 @@
+"""
+Replay
+
+Runs an unmodified Oracle over a recording made with --record, on a
+virtual clock so it goes as fast as the voting logic allows. Every
+request is answered from the recording, after the recorded latency in
+virtual time, with the responses recorded at the same height. Only the
+voter's own txs are not taken from the recording: broadcasts are kept,
+included in the next block and served back as its prevotes, so reveals
+work as they would have.
+
+    python -m oracle_voter.oracle.replay requests.jsonl.gz \\
+        terravaloper1... --vote-period 5 --report report.json
+
+The report has per vote period the prices prevoted, the abstains, the
+votes revealed and when the prevote went out against the time the
+period had, see Replay.report().
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+from collections import Counter, OrderedDict, deque
+from hashlib import sha256
+from urllib.parse import urlsplit
+
+import simplejson as json
+from aiohttp.client_exceptions import ClientConnectionError
+
+from oracle_voter.chain.core import LCDNode
+from oracle_voter.common import client
+from oracle_voter.common.client import MemoryTransport
+from oracle_voter.common.recorder import read_recording
+from oracle_voter.feeds.markets import ABSTAIN_VOTE_PX
+from oracle_voter.oracle.machine2 import Oracle
+from oracle_voter.wallet.replay import ReplayWallet
+
+LATEST_BLOCK = "/blocks/latest"
+
+# Blocks searched back for a response not recorded at this height
+LOOKBACK = 100
+
+
+def request_key(method, url, params):
+    return method, url, json.dumps(params or {}, sort_keys=True)
+
+
+class RecordedBlock:
+
+    def __init__(self, height, ts, url, body):
+        self.height = height
+        self.ts = ts
+        self.url = url
+        self.body = body
+        # request_key to responses in recorded order
+        self.responses = dict()
+
+    def add(self, row):
+        key = request_key(row["method"], row["url"], row["params"])
+        if key not in self.responses:
+            self.responses[key] = deque()
+        self.responses[key].append(row)
+
+
+def split_blocks(rows):
+    # Responses belong to the latest height seen before them
+    prelude = RecordedBlock(0, None, None, None)
+    blocks = list()
+    current = prelude
+    for row in rows:
+        if row["url"].endswith(LATEST_BLOCK) and row["status"] == 200:
+            try:
+                body = json.loads(row["body"])
+                height = int(body["block_meta"]["header"]["height"])
+            except (TypeError, ValueError, KeyError):
+                continue
+            if height > current.height:
+                current = RecordedBlock(
+                    height,
+                    row["ts"],
+                    row["url"],
+                    row["body"],
+                )
+                blocks.append(current)
+            continue
+        current.add(row)
+    return prelude, blocks
+
+
+def node_addr(blocks):
+    if len(blocks) == 0:
+        raise ValueError("Recording has no blocks")
+    return blocks[0].url[0:-len(LATEST_BLOCK)]
+
+
+class Replay:
+
+    def __init__(
+        self,
+        rows,
+        validator_addr,
+        vote_period=5,
+        chain_id="soju-0013",
+        feeder_addr="terra1replay",
+        lcd_addr=None,
+    ):
+        self.prelude, self.blocks = split_blocks(rows)
+        self.lcd_addr = lcd_addr or node_addr(self.blocks)
+        self.validator_addr = validator_addr
+        self.block_idx = -1
+        self.wallet = ReplayWallet(feeder_addr)
+        self.oracle = Oracle(
+            vote_period=vote_period,
+            lcd_node=LCDNode(addr=self.lcd_addr),
+            validator_addr=validator_addr,
+            wallet=self.wallet,
+            chain_id=chain_id,
+        )
+        # Txs broadcast by the replayed Oracle, by txhash
+        self.txs = dict()
+        # Latest prevote per denom, as the chain would return it
+        self.prevotes = dict()
+        self.periods = OrderedDict()
+        self.period = None
+        self.period_start = 0.0
+        self.misses = Counter()
+
+    @property
+    def block(self):
+        return self.blocks[self.block_idx]
+
+    def now(self):
+        return asyncio.get_event_loop().time()
+
+    """
+    Recorded responses
+    """
+
+    def lookup(self, method, url, params):
+        key = request_key(method, url, params)
+        first = max(self.block_idx - LOOKBACK, 0)
+        for idx in range(self.block_idx, first - 1, -1):
+            responses = self.blocks[idx].responses.get(key, None)
+            if responses is None:
+                continue
+            # Repeated requests at the height get its responses in the
+            # order they were recorded, then the last one again
+            if idx == self.block_idx and len(responses) > 1:
+                return responses.popleft()
+            return responses[-1]
+        responses = self.prelude.responses.get(key, None)
+        if responses is not None:
+            return responses[-1]
+        return None
+
+    async def handle(self, method, url, params, data):
+        own = self.chain_response(method, url, data)
+        if own is not None:
+            return own
+        row = self.lookup(method, url, params)
+        if row is None:
+            self.misses[urlsplit(url).netloc + urlsplit(url).path] += 1
+            return 404, {"error": "Not in recording"}
+        await asyncio.sleep(row["latency"] or 0.0)
+        if row["status"] is None:
+            raise ClientConnectionError(row["error"])
+        return row["status"], row["body"] or ""
+
+    """
+    Chain state of the replayed validator
+    """
+
+    def chain_response(self, method, url, data):
+        if not url.startswith(self.lcd_addr):
+            return None
+        path = url[len(self.lcd_addr):]
+        if path == LATEST_BLOCK:
+            return 200, self.block.body
+        if method == "POST" and path == "/txs":
+            return 200, self.broadcast(json.loads(data))
+        if path.startswith("/txs/") and path[5:] in self.txs:
+            included = self.txs[path[5:]]
+            if self.block.height < included["height"]:
+                return 404, {"error": "Tx not found"}
+            return 200, {
+                "height": str(included["height"]),
+                "txhash": path[5:],
+                "logs": [{
+                    "msg_index": idx,
+                    "success": True,
+                    "log": "",
+                } for idx, _ in enumerate(included["msgs"])],
+            }
+        parts = path.split("/")
+        # /oracle/denoms/{denom}/prevotes/{validator}
+        if len(parts) == 6 and parts[4] == "prevotes" and \
+                parts[5] == self.validator_addr:
+            prevote = self.prevotes.get(parts[3], None)
+            return 200, {
+                "height": str(self.block.height),
+                "result": [] if prevote is None else [prevote],
+            }
+        return None
+
+    def broadcast(self, payload):
+        msgs = payload["tx"]["msg"]
+        txhash = sha256(
+            bytes(json.dumps(payload, sort_keys=True), "utf-8"),
+        ).hexdigest().upper()
+        self.txs[txhash] = {"height": self.block.height + 1, "msgs": msgs}
+        period = self.periods.get(self.period, None)
+        elapsed = self.now() - self.period_start
+        for msg in msgs:
+            value = msg["value"]
+            if msg["type"] == "oracle/MsgExchangeRatePrevote":
+                self.prevotes[value["denom"]] = {
+                    "hash": value["hash"],
+                    "denom": value["denom"],
+                    "voter": value["validator"],
+                    "submit_block": str(self.block.height + 1),
+                }
+                px = self.oracle.prior_prevotes[value["hash"]]["px"]
+                if period is not None:
+                    period["prevote_at"] = elapsed
+                    period["prevotes"][value["denom"]] = str(px)
+                    if px == ABSTAIN_VOTE_PX:
+                        period["abstains"].append(value["denom"])
+            elif period is not None:
+                period["vote_at"] = elapsed
+                period["votes"][value["denom"]] = value["exchange_rate"]
+        return {"height": "0", "txhash": txhash}
+
+    """
+    Driver
+    """
+
+    def new_block(self):
+        vote_period = self.oracle.period_getter(self.block.height)
+        if vote_period == self.period:
+            return
+        previous = self.periods.get(self.period, None)
+        if previous is not None:
+            previous["budget"] = self.now() - self.period_start
+        self.period = vote_period
+        self.period_start = self.now()
+        self.periods[vote_period] = {
+            "vote_period": int(vote_period),
+            "height": self.block.height,
+            "prevote_at": None,
+            "vote_at": None,
+            "budget": None,
+            "prevotes": dict(),
+            "abstains": list(),
+            "votes": dict(),
+        }
+
+    async def run(self):
+        client.mount("", MemoryTransport(self.handle))
+        try:
+            started = self.now()
+            first_ts = self.blocks[0].ts if len(self.blocks) > 0 else 0
+            for idx in range(len(self.blocks)):
+                self.block_idx = idx
+                # Blocks arrive as recorded, or late if voting overran
+                arrives = started + self.block.ts - first_ts
+                await asyncio.sleep(max(arrives - self.now(), 0.0))
+                self.new_block()
+                await self.oracle.retrieve_height()
+        finally:
+            client.unmount("")
+        return self.report()
+
+    def report(self):
+        periods = list()
+        for period in self.periods.values():
+            row = dict(period)
+            row["missed"] = row["prevote_at"] is None or (
+                row["budget"] is not None and
+                row["prevote_at"] > row["budget"]
+            )
+            periods.append(row)
+        abstains = Counter(
+            denom for row in periods for denom in row["abstains"]
+        )
+        return {
+            "blocks": len(self.blocks),
+            "periods": periods,
+            "missed": [row["vote_period"] for row in periods if row["missed"]],
+            "abstains": dict(abstains),
+            "not_recorded": dict(self.misses),
+        }
+
+
+def main():
+    from oracle_voter.common.virtualclock import run_virtual
+    from oracle_voter.main import load_feeds
+    parser = argparse.ArgumentParser(
+        description="Replay a --record recording through the Oracle",
+    )
+    parser.add_argument("recording", help="File written by --record")
+    parser.add_argument("validator", help="Validator to vote as (valoper)")
+    parser.add_argument("--vote-period", type=int, default=5)
+    parser.add_argument("--chain-id", default="soju-0013")
+    parser.add_argument("--node", default=None, help="Recorded LCD Node")
+    parser.add_argument("--feeds-config", default=None)
+    parser.add_argument("--report", default=None, help="JSON report file")
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Show the Oracle's output",
+    )
+    args = parser.parse_args()
+
+    load_feeds({"feeds_config": args.feeds_config})
+    replay = Replay(
+        list(read_recording(args.recording)),
+        args.validator,
+        vote_period=args.vote_period,
+        chain_id=args.chain_id,
+        lcd_addr=args.node,
+    )
+    with open(os.devnull, "w") as devnull:
+        output = contextlib.nullcontext() if args.verbose else \
+            contextlib.redirect_stdout(devnull)
+        with output:
+            report = run_virtual(replay.run())
+
+    for row in report["periods"]:
+        prevote_at = "-" if row["prevote_at"] is None else \
+            f"{row['prevote_at']:.2f}s"
+        budget = "-" if row["budget"] is None else f"{row['budget']:.2f}s"
+        print(
+            f"VP {row['vote_period']} height {row['height']} "
+            f"prevote {prevote_at}/{budget} "
+            f"abstains {','.join(row['abstains']) or '-'}"
+            f"{' MISSED' if row['missed'] else ''}"
+        )
+    print(f"{len(report['periods'])} periods, {len(report['missed'])} missed")
+    if len(report["not_recorded"]) > 0:
+        print(f"Not in recording: {report['not_recorded']}")
+    if args.report is not None:
+        with open(args.report, "w") as out:
+            out.write(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Shared memory price board
+
+A publisher process fetches every feed once per height and writes the
+quotes into a memory mapped file, voter processes on the same host read
+them instead of calling the exchanges themselves. Put the file on a tmpfs
+such as /dev/shm.
+
+Layout, little endian
+    header  magic "OVPB", version, slots, record size, padded to 64 bytes
+    record  seq, height, flags, name, price, size, source_ts, fetch_ts
+
+Each record is guarded by a seqlock, the publisher makes seq odd while it
+writes and even when done. Readers retry while seq is odd or changed
+during the read, so nothing is ever locked.
+"""
+import asyncio
+import mmap
+import os
+import struct
+import time
+
+from oracle_voter.feeds.base import Quote
+from oracle_voter.feeds.markets import ExchangeErr
+from oracle_voter.markets.fixed import FixedPx
+
+MAGIC = b"OVPB"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHI")
+HEADER_SIZE = 64
+SEQ = struct.Struct("<Q")
+# height, flags, name, price, size, source_ts, fetch_ts
+BODY = struct.Struct("<qB47s16s16sqd")
+RECORD_SIZE = SEQ.size + BODY.size
+NAME_SIZE = 47
+
+# Record flags
+HAS_SIZE = 1
+HAS_SOURCE_TS = 2
+FAILED = 4
+
+READ_RETRIES = 100
+
+
+def pack_px(px):
+    return px.raw.to_bytes(16, "little", signed=True)
+
+
+def unpack_px(raw):
+    return FixedPx(int.from_bytes(raw, "little", signed=True))
+
+
+class BoardEntry:
+    __slots__ = ("name", "height", "quote", "fetch_ts")
+
+    def __init__(self, name, height, quote, fetch_ts):
+        self.name = name
+        self.height = height
+        self.quote = quote  # None if the publisher failed to fetch it
+        self.fetch_ts = fetch_ts
+
+
+class BoardPublisher:
+
+    def __init__(self, path, providers):
+        self.path = path
+        self.providers = list(providers)
+        self.slots = dict()
+        for slot, provider in enumerate(self.providers):
+            if len(provider.name.encode("utf-8")) > NAME_SIZE:
+                raise ValueError(f"Feed name {provider.name} is too long")
+            self.slots[provider.name] = slot
+        self.seqs = [0] * len(self.providers)
+        self.current_height = 0
+
+        size = HEADER_SIZE + RECORD_SIZE * len(self.providers)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # Never shrink, readers may still map the previous layout
+            size = max(size, os.fstat(fd).st_size)
+            os.ftruncate(fd, size)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self.mm[HEADER_SIZE:] = bytes(size - HEADER_SIZE)
+        HEADER.pack_into(
+            self.mm,
+            0,
+            MAGIC,
+            VERSION,
+            len(self.providers),
+            RECORD_SIZE,
+        )
+
+    def close(self):
+        self.mm.close()
+
+    def write(self, name, height, quote, fetch_ts=None):
+        slot = self.slots[name]
+        offset = HEADER_SIZE + slot * RECORD_SIZE
+        flags = 0
+        px = size = FixedPx(0)
+        source_ts = 0
+        if quote is None:
+            flags |= FAILED
+        else:
+            px = quote.price
+            if quote.size is not None:
+                flags |= HAS_SIZE
+                size = quote.size
+            if quote.source_ts is not None:
+                flags |= HAS_SOURCE_TS
+                source_ts = int(quote.source_ts)
+        seq = self.seqs[slot]
+        SEQ.pack_into(self.mm, offset, seq + 1)
+        BODY.pack_into(
+            self.mm,
+            offset + SEQ.size,
+            height,
+            flags,
+            name.encode("utf-8"),
+            pack_px(px),
+            pack_px(size),
+            source_ts,
+            time.time() if fetch_ts is None else fetch_ts,
+        )
+        SEQ.pack_into(self.mm, offset, seq + 2)
+        self.seqs[slot] = seq + 2
+
+    async def publish_one(self, provider, height):
+        try:
+            quote = await provider.quote()
+        except Exception as err:
+            print(f"Feed {provider.name} failed: {err!r}")
+            quote = None
+        self.write(provider.name, height, quote)
+
+    async def publish(self, height):
+        await asyncio.gather(*[
+            self.publish_one(provider, height)
+            for provider in self.providers
+        ])
+
+    async def run(self, lcd_node, interval=0.50):
+        while True:
+            raw_res = await lcd_node.get_latest_block()
+            if raw_res is not None:
+                height = int(raw_res["block_meta"]["header"]["height"])
+                if height > self.current_height:
+                    self.current_height = height
+                    await self.publish(height)
+            await asyncio.sleep(interval)
+
+
+class SharedPriceBoard:
+    """Reads quotes from a BoardPublisher, same interface as PriceBoard
+
+    Quotes are fresh when they were published for the voter's current
+    height. The publisher polls the same node, so a voter that sees a new
+    height first waits up to `wait` seconds for it. Markets missing from
+    the board or still not published by then are fetched directly so
+    voting carries on without a publisher. Until the voter has seen a
+    height, quotes up to max_age seconds old are used.
+    """
+
+    def __init__(self, path, max_age=6.0, wait=1.0, poll_interval=0.05):
+        self.path = path
+        self.max_age = max_age
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.mm = None
+        self.slots = dict()
+        self.height = None
+
+    def new_height(self, height):
+        self.height = height
+
+    def open(self):
+        try:
+            with open(self.path, "rb") as source:
+                mm = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Publisher not started yet
+            return False
+        magic, version, _, record_size = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            mm.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} board")
+        self.mm = mm
+        return True
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.close()
+            self.mm = None
+
+    def read_slot(self, slot):
+        offset = HEADER_SIZE + slot * RECORD_SIZE
+        for _ in range(READ_RETRIES):
+            seq = SEQ.unpack_from(self.mm, offset)[0]
+            if seq & 1:
+                continue
+            body = BODY.unpack_from(self.mm, offset + SEQ.size)
+            if SEQ.unpack_from(self.mm, offset)[0] == seq:
+                return seq, body
+        return None, None
+
+    def scan(self):
+        # Maps names to slots, redone whenever a name moved
+        self.slots = dict()
+        slots = HEADER.unpack_from(self.mm, 0)[2]
+        slots = min(slots, (len(self.mm) - HEADER_SIZE) // RECORD_SIZE)
+        for slot in range(slots):
+            seq, body = self.read_slot(slot)
+            if seq:
+                name = body[2].rstrip(b"\x00").decode("utf-8")
+                self.slots[name] = slot
+
+    def lookup(self, name):
+        slot = self.slots.get(name, None)
+        if slot is not None:
+            seq, body = self.read_slot(slot)
+            if seq and body[2].rstrip(b"\x00").decode("utf-8") == name:
+                return body
+        self.scan()
+        slot = self.slots.get(name, None)
+        if slot is None:
+            return None
+        return self.read_slot(slot)[1]
+
+    def read(self, name):
+        if self.mm is None and not self.open():
+            return None
+        body = self.lookup(name)
+        if body is None:
+            return None
+        height, flags, _, px, size, source_ts, fetch_ts = body
+        quote = None
+        if not flags & FAILED:
+            quote = Quote(
+                unpack_px(px),
+                unpack_px(size) if flags & HAS_SIZE else None,
+                source_ts if flags & HAS_SOURCE_TS else None,
+            )
+        return BoardEntry(name, height, quote, fetch_ts)
+
+    def fresh(self, entry):
+        if self.height is None:
+            return time.time() - entry.fetch_ts <= self.max_age
+        return entry.height >= self.height
+
+    async def current_entry(self, name):
+        waited = 0.0
+        while True:
+            entry = self.read(name)
+            if entry is None:
+                return None
+            if self.fresh(entry):
+                return entry
+            if self.height is None or waited >= self.wait:
+                return None
+            # Publisher has not seen this height yet
+            await asyncio.sleep(self.poll_interval)
+            waited += self.poll_interval
+
+    async def price(self, market_info):
+        provider = market_info.get("provider", None)
+        entry = None
+        if provider is not None:
+            entry = await self.current_entry(provider.name)
+        if entry is None:
+            return await market_info["feed"]()
+        if entry.quote is None:
+            # Retrying from every voter would only add to the rate limits
+            raise ExchangeErr(f"Feed {entry.name} failed on the board", None)
+        return entry.quote.price
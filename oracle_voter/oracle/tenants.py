@@ -0,0 +1,157 @@
+"""
+Multi-tenant voting
+
+One BlockTracker polls the chain and fans new heights out to an Oracle per
+validator. Feed prices go through a shared PriceBoard and chain wide LCD
+reads through a SharedLCDNode, so exchange and node load grow with the
+number of markets rather than the number of validators.
+
+Config file
+    {
+        "node": "http://127.0.0.1:1317",
+        "chain_id": "soju-0013",
+        "vote_period": 5,
+        "gas_fee": "1000",
+        "gas_denom": "uluna",
+        "validators": [{
+            "validator": "terravaloper1...",
+            "wallet": "feeder",
+            "password_env": "FEEDER_PASSWORD",
+            "home": "/home/user/.terracli",
+            "journal": "/var/lib/oracle-voter/feeder.jsonl"
+        }]
+    }
+"""
+import asyncio
+import os
+import time
+
+import simplejson as json
+
+from oracle_voter.common import scheduler
+
+
+class PriceBoard:
+    """Fetches each feed once per height for every Oracle"""
+
+    def __init__(self):
+        self.height = None
+        self.pending = dict()
+
+    def new_height(self, height):
+        if height != self.height:
+            self.height = height
+            self.pending = dict()
+
+    def feed_key(self, market_info):
+        provider = market_info.get("provider", None)
+        if provider is not None:
+            return provider.name
+        return id(market_info["feed"])
+
+    async def price(self, market_info):
+        key = self.feed_key(market_info)
+        task = self.pending.get(key, None)
+        if task is None:
+            task = asyncio.ensure_future(market_info["feed"]())
+            self.pending[key] = task
+        # Shielded so one caller being cancelled does not cancel the others
+        return await asyncio.shield(task)
+
+
+class SharedLCDNode:
+    """Memoizes chain wide reads per height, everything else passes through"""
+
+    shared_calls = (
+        "get_oracle_rates",
+        "get_oracle_active_denoms",
+        "get_tx",
+    )
+
+    def __init__(self, lcd_node):
+        self.lcd_node = lcd_node
+        self.height = None
+        self.pending = dict()
+
+    def new_height(self, height):
+        if height != self.height:
+            self.height = height
+            self.pending = dict()
+
+    def __getattr__(self, name):
+        attr = getattr(self.lcd_node, name)
+        if name not in self.shared_calls:
+            return attr
+
+        async def shared_call(*args):
+            key = (name, args)
+            task = self.pending.get(key, None)
+            if task is None:
+                task = asyncio.ensure_future(attr(*args))
+                self.pending[key] = task
+            return await asyncio.shield(task)
+        return shared_call
+
+
+class BlockTracker:
+
+    def __init__(self, lcd_node, oracles, shared=()):
+        self.lcd_node = lcd_node
+        self.oracles = list(oracles)
+        # Caches to roll over on every new height
+        self.shared = list(shared)
+        self.current_height = 0
+
+    async def poll(self):
+        polled_at = time.time()
+        with scheduler.priority(scheduler.PRICE_FETCH):
+            raw_res = await self.lcd_node.get_latest_block()
+        if raw_res is None:
+            return False
+        height = int(raw_res["block_meta"]["header"]["height"])
+        if height <= self.current_height:
+            return False
+        self.current_height = height
+        for cache in self.shared:
+            cache.new_height(height)
+        results = await asyncio.gather(
+            *[
+                oracle.on_height(height, polled_at)
+                for oracle in self.oracles
+            ],
+            return_exceptions=True,
+        )
+        # One validator failing should not stop the others
+        for oracle, result in zip(self.oracles, results):
+            if isinstance(result, Exception):
+                print(f"Validator {oracle.validator_addr} failed: {result!r}")
+        return True
+
+    async def run(self, interval=0.50):
+        while True:
+            await self.poll()
+            await asyncio.sleep(interval)
+
+
+def load_config(path):
+    with open(path, "r") as source:
+        config = json.loads(source.read())
+    validators = config.get("validators", [])
+    if len(validators) == 0:
+        raise ValueError(f"No validators configured in {path}")
+    for tenant in validators:
+        if "validator" not in tenant:
+            raise ValueError(f"Validator address missing in {path}")
+        password = tenant.get("password", None)
+        password_env = tenant.get("password_env", None)
+        if password is None and password_env is not None:
+            password = os.environ.get(password_env, None)
+        if password is None:
+            raise ValueError(
+                f"Password not provided for {tenant['validator']}"
+            )
+        tenant["password"] = password
+        tenant.setdefault("wallet", "feeder")
+        tenant["home"] = tenant.get("home", None) or \
+            os.path.expanduser("~/.terracli")
+    return config
@@ -0,0 +1,43 @@
+from oracle_voter.oracle.index import DenomIndex
+from oracle_voter.oracle.fixtures_machine import stub_feed_mocks_success
+from oracle_voter.markets.fixed import FixedPx
+
+
+def test_index_rates_and_pair_types():
+    index = DenomIndex(stub_feed_mocks_success)
+    assert "umnt" in index
+    assert "ueur" not in index
+    assert index.pair_type("ukrw") == "native"
+    assert index.depends_on == {
+        "umnt": "ukrw",
+        "uusd": "ukrw",
+        "usdr": "ukrw",
+    }
+    assert index.rate_info("uusd")["markets"][0]["weight"] == 100
+
+
+def test_index_actives_rebuild_only_on_change():
+    index = DenomIndex(stub_feed_mocks_success)
+    assert index.update_actives(["uusd", "ueur", "ukrw", "umnt"]) is True
+    assert index.vote_denoms == ["uusd", "ukrw", "umnt"]
+    assert index.prevote_stages == [["ukrw"], ["uusd", "umnt"]]
+    assert index.update_actives(["uusd", "ueur", "ukrw", "umnt"]) is False
+
+
+def test_index_adds_missing_dependency():
+    index = DenomIndex(stub_feed_mocks_success)
+    index.update_actives(["usdr"])
+    assert index.vote_denoms == ["usdr"]
+    assert index.prevote_stages == [["ukrw"], ["usdr"]]
+
+
+def test_index_chain_rates():
+    index = DenomIndex(stub_feed_mocks_success)
+    assert index.chain_rate("ukrw") is None
+    index.update_chain_rates([
+        {"denom": "ukrw", "amount": "300.000000000000000000"},
+    ])
+    assert index.chain_rate("ukrw") == FixedPx.from_int(300)
+    assert index.chain_rate("umnt") is None
+    index.update_chain_rates(None)
+    assert index.chain_rate("ukrw") is None
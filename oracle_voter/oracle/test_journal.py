@@ -0,0 +1,103 @@
+import asyncio
+from unittest.mock import Mock
+
+from oracle_voter.chain.core import Transaction
+from oracle_voter.common.util import async_stubber
+from oracle_voter.markets.fixed import FixedPx
+from oracle_voter.oracle.journal import PrevoteJournal
+from oracle_voter.oracle.machine2 import Oracle
+
+validator_addr = "terravaloper1rhrptnx87ufpv62c7ngt9yqlz2hr77xr9nkcr9"
+feeder_addr = "terra1ml3f2yw2yy3u88ch9ye6djf2yd0m3eqwh0s2c4"
+
+
+def journal_prevote(journal, denom, px, vp, seq=1):
+    oracle = Oracle(validator_addr=validator_addr)
+    salt, hashed = oracle.get_prevote_hash(denom, px)
+    journal.append(denom, hashed, salt, px, vp, seq)
+    return salt, hashed
+
+
+def test_flush_and_replay(tmpdir):
+    path = str(tmpdir.join("prevotes.jsonl"))
+    journal = PrevoteJournal(path)
+    px = FixedPx.from_str("300.12")
+    salt, hashed = journal_prevote(journal, "ukrw", px, 3709)
+    assert journal.replay() == []
+    assert journal.flush() == 1
+    assert journal.flush() == 0
+    journal.close()
+
+    entries = PrevoteJournal(path).replay()
+    assert entries == [{
+        "denom": "ukrw",
+        "hash": hashed,
+        "salt": salt,
+        "px": px,
+        "vp": 3709,
+        "seq": 1,
+    }]
+
+
+def test_replay_skips_torn_line(tmpdir):
+    path = tmpdir.join("prevotes.jsonl")
+    journal = PrevoteJournal(str(path))
+    journal_prevote(journal, "ukrw", FixedPx.from_int(300), 3709)
+    journal.flush()
+    journal.close()
+    path.write('{"denom": "umnt", "ha', mode="a")
+    assert len(PrevoteJournal(str(path)).replay()) == 1
+
+
+def test_compact(tmpdir):
+    path = str(tmpdir.join("prevotes.jsonl"))
+    journal = PrevoteJournal(path)
+    for vp in (3707, 3708, 3709):
+        journal_prevote(journal, "ukrw", FixedPx.from_int(300), vp)
+    journal.flush()
+    # 3709 prevotes are revealed in 3710
+    assert journal.compact(3710) == 2
+    assert journal.compact(3710) == 0
+    journal_prevote(journal, "ukrw", FixedPx.from_int(301), 3710)
+    journal.flush()
+    journal.close()
+    assert [entry["vp"] for entry in PrevoteJournal(path).replay()] == [
+        3709,
+        3710,
+    ]
+
+
+def test_restart_reveals_journaled_prevote(tmpdir):
+    path = str(tmpdir.join("prevotes.jsonl"))
+    journal = PrevoteJournal(path)
+    px = FixedPx.from_str("300.12")
+    salt, hashed = journal_prevote(journal, "ukrw", px, 3709)
+    journal.flush()
+    journal.close()
+
+    lcd_node = Mock()
+    lcd_node.get_oracle_prevotes_validator.return_value = async_stubber({
+        "result": [{"hash": hashed, "denom": "ukrw"}],
+    })
+    wallet = Mock()
+    wallet.account_addr = feeder_addr
+    oracle = Oracle(
+        lcd_node=lcd_node,
+        validator_addr=validator_addr,
+        wallet=wallet,
+        journal=PrevoteJournal(path),
+    )
+    oracle.current_vote_period = 3710
+    oracle.vote_msg_builder = Transaction("soju-0013", 1, 1)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(oracle.append_vote_msg("ukrw"))
+    assert oracle.vote_msg_builder.msgs == [{
+        "type": "oracle/MsgExchangeRateVote",
+        "value": {
+            "exchange_rate": "300.120000000000000000",
+            "salt": salt,
+            "denom": "ukrw",
+            "feeder": feeder_addr,
+            "validator": validator_addr,
+        },
+    }]
@@ -13,6 +13,8 @@ from oracle_voter.feeds.markets import ExchangeErr
 from oracle_voter.common.util import async_stubber, async_raiser
 from oracle_voter.chain.mocks.fixture_utils import mock_query_tx_error
 from oracle_voter.common.client import HttpError
+from oracle_voter.common.scheduler import Scheduler
+from oracle_voter.common.tracing import Tracer
 from oracle_voter.oracle.fixtures_machine import (
     stub_feed_mocks_success,
     stub_feed_mock_coinone_exception,
@@ -107,6 +109,45 @@ def test_voting_e2e_3_periods(
         5,  # Vote Period
     ))
 
+@patch('oracle_voter.oracle.machine2.supported_rates', stub_feed_mocks_success)
+@patch('oracle_voter.chain.core.LCDNode', autospec=True)
+@patch('oracle_voter.wallet.cli.CLIWallet', autospec=True)
+def test_voting_traces_periods(
+    CLIWalletMock,
+    LCDNodeMock,
+):
+    tracer = Tracer()
+    tracer.enable()
+    loop = asyncio.get_event_loop()
+    with patch('oracle_voter.oracle.machine2.tracer', tracer):
+        loop.run_until_complete(main_voting_e2e_3_periods(
+            LCDNodeMock,
+            CLIWalletMock,
+            5,
+        ))
+    assert tracer.periods() == [3709, 3710, 3711]
+    (root,) = [
+        node for node in tracer.tree(3710) if node["name"] == "vote_period"
+    ]
+    assert root["attrs"]["height"] == 18550
+    stages = [child["name"] for child in root["children"]]
+    for name in ("block", "chain_state", "reveal_lookup", "price_fetch"):
+        assert name in stages
+    names = {row["name"] for row in tracer.trace(3710)}
+    assert {"feed", "aggregation", "hashing", "signing"} <= names
+    broadcasts = [
+        row for row in tracer.trace(3710) if row["name"] == "broadcast"
+    ]
+    assert len(broadcasts) > 0
+    for row in broadcasts:
+        # Found on chain later and linked back by the txhash
+        inclusions = [
+            span for span in tracer.find(txhash=row["attrs"]["txhash"])
+            if span["name"] == "inclusion"
+        ]
+        assert [span["vote_period"] for span in inclusions] == [3710]
+
+
 async def handle_coinone_exchange_error(
     CLIWalletMock,
     LCDNodeMock,
@@ -212,3 +253,25 @@ def test_handle_broadcast_error(
         LCDNodeMock,
         5,  # Vote Period
     ))
+
+
+def test_deadline_is_prevote_send_by():
+    sched = Scheduler()
+    oracle = Oracle(vote_period=5)
+
+    async def run():
+        with patch("oracle_voter.common.scheduler.scheduler", sched):
+            # First block, the prevote has to go before the last one
+            oracle.update_deadline(18550)
+            start = oracle.last_height_ts
+            assert sched.deadline == start + 4 * oracle.block_time
+            # Once sent the next one goes on the next period's first block
+            oracle.prevoted_period = 3710
+            oracle.set_send_by(18550)
+            assert sched.deadline == start + 5 * oracle.block_time
+            oracle.update_deadline(18554)
+            assert sched.deadline == \
+                oracle.last_height_ts + oracle.block_time
+            sched.set_deadline(None)
+
+    asyncio.get_event_loop().run_until_complete(run())
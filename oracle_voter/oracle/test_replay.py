@@ -0,0 +1,80 @@
+import gzip
+from unittest.mock import patch
+
+import simplejson as json
+
+from oracle_voter.common import client
+from oracle_voter.common.recorder import read_recording
+from oracle_voter.common.virtualclock import run_virtual
+from oracle_voter.oracle.fixtures_replay import (
+    LCD,
+    build_recording,
+    replay_rates,
+)
+from oracle_voter.oracle.replay import Replay, split_blocks
+
+validator = "terravaloper1rhrptnx87ufpv62c7ngt9yqlz2hr77xr9nkcr9"
+
+
+def test_split_blocks():
+    prelude, blocks = split_blocks(build_recording(18549, 3))
+    assert [block.height for block in blocks] == [18549, 18550, 18551]
+    assert len(prelude.responses) == 0
+    # Actives, rates and four exchange quotes
+    assert len(blocks[0].responses) == 6
+
+
+def run_replay(rows):
+    with patch("oracle_voter.oracle.machine2.supported_rates", replay_rates()):
+        replay = Replay(rows, validator, vote_period=5)
+        return replay, run_virtual(replay.run())
+
+
+def test_replay_prevotes_and_reveals():
+    replay, report = run_replay(build_recording(18549, 12))
+    assert replay.lcd_addr == LCD
+    assert "" not in client.transports
+    periods = {row["vote_period"]: row for row in report["periods"]}
+    assert sorted(periods) == [3709, 3710, 3711, 3712]
+
+    first = periods[3710]
+    assert first["prevotes"]["ukrw"] == "300.396000000000000000"
+    assert first["abstains"] == []
+    # Chain state, the 0.3s pause and the 0.25s exchanges, in virtual time
+    assert 0.55 <= first["prevote_at"] < 1.0
+    assert first["budget"] == 30.0
+    assert first["missed"] is False
+
+    # Revealed with the prices prevoted a period earlier
+    assert periods[3711]["votes"] == {
+        denom: px for denom, px in first["prevotes"].items()
+    }
+    assert report["not_recorded"] == {}
+
+
+def test_replay_abstains_on_failed_feeds():
+    rows = build_recording(18549, 12, failing=(18555,))
+    _, report = run_replay(rows)
+    periods = {row["vote_period"]: row for row in report["periods"]}
+    assert sorted(periods[3711]["abstains"]) == [
+        "ukrw",
+        "umnt",
+        "usdr",
+        "uusd",
+    ]
+    assert periods[3712]["abstains"] == []
+    assert report["abstains"] == {"ukrw": 1, "umnt": 1, "usdr": 1, "uusd": 1}
+
+
+def test_replay_reads_recording(tmpdir):
+    path = str(tmpdir.join("requests.jsonl.gz"))
+    with gzip.open(path, "wt") as out:
+        for row in build_recording(18549, 7):
+            out.write(json.dumps(row) + "\n")
+    _, report = run_replay(list(read_recording(path)))
+    assert report["blocks"] == 7
+    assert [row["vote_period"] for row in report["periods"]] == [
+        3709,
+        3710,
+        3711,
+    ]
@@ -0,0 +1,143 @@
+import asyncio
+import time
+import pytest
+from oracle_voter.feeds.base import Quote
+from oracle_voter.feeds.fixtures_registry import StaticFeed
+from oracle_voter.feeds.markets import ExchangeErr
+from oracle_voter.markets.fixed import FixedPx
+from oracle_voter.oracle import sharedboard
+from oracle_voter.oracle.sharedboard import BoardPublisher, SharedPriceBoard
+
+
+class FailingFeed(StaticFeed):
+
+    async def fetch(self):
+        raise ExchangeErr("Exchange down", None)
+
+
+def direct_feed():
+    async def feed():
+        return "1.0"
+    return feed
+
+
+def test_publish_and_read(tmpdir):
+    path = str(tmpdir.join("board"))
+    providers = [
+        StaticFeed("static:a", "ukrw", "300.123"),
+        StaticFeed("static:b", "umnt", "-1.0"),
+        FailingFeed("static:c"),
+    ]
+    publisher = BoardPublisher(path, providers)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(publisher.publish(18549))
+
+    board = SharedPriceBoard(path)
+    entry = board.read("static:a")
+    assert entry.height == 18549
+    assert entry.quote.price == FixedPx.from_str("300.123")
+    assert entry.quote.size == FixedPx.from_int(1)
+    assert entry.quote.source_ts == 1574683544
+    assert board.read("static:b").quote.price == FixedPx.from_int(-1)
+    assert board.read("static:c").quote is None
+    assert board.read("static:d") is None
+
+    # Served from the board, not the feed
+    market_info = providers[0].market_info()
+    market_info["feed"] = direct_feed()
+    px = loop.run_until_complete(board.price(market_info))
+    assert px == FixedPx.from_str("300.123")
+    with pytest.raises(ExchangeErr):
+        loop.run_until_complete(board.price(providers[2].market_info()))
+    board.close()
+    publisher.close()
+
+
+def test_stale_and_missing_fall_back(tmpdir):
+    path = str(tmpdir.join("board"))
+    board = SharedPriceBoard(path)
+    provider = StaticFeed("static:a")
+    market_info = provider.market_info()
+    market_info["feed"] = direct_feed()
+    loop = asyncio.get_event_loop()
+    # Publisher not started
+    assert loop.run_until_complete(board.price(market_info)) == "1.0"
+
+    publisher = BoardPublisher(path, [provider])
+    publisher.write(
+        "static:a",
+        18549,
+        Quote(FixedPx.from_int(2)),
+        time.time() - 60,
+    )
+    assert loop.run_until_complete(board.price(market_info)) == "1.0"
+    publisher.write("static:a", 18550, Quote(FixedPx.from_int(2)))
+    px = loop.run_until_complete(board.price(market_info))
+    assert px == FixedPx.from_int(2)
+
+
+def test_torn_record_is_not_read(tmpdir):
+    path = str(tmpdir.join("board"))
+    publisher = BoardPublisher(path, [StaticFeed("static:a")])
+    publisher.write("static:a", 18549, Quote(FixedPx.from_int(2)))
+    board = SharedPriceBoard(path)
+    assert board.read("static:a").height == 18549
+    # Publisher stopped halfway through a write
+    sharedboard.SEQ.pack_into(publisher.mm, sharedboard.HEADER_SIZE, 3)
+    assert board.read("static:a") is None
+
+
+def test_republish_moves_slots(tmpdir):
+    path = str(tmpdir.join("board"))
+    first = BoardPublisher(
+        path,
+        [StaticFeed("static:a"), StaticFeed("static:b")],
+    )
+    first.write("static:b", 18549, Quote(FixedPx.from_int(2)))
+    board = SharedPriceBoard(path)
+    assert board.read("static:b").quote.price == FixedPx.from_int(2)
+    # Restarted publisher with a different provider order
+    second = BoardPublisher(path, [StaticFeed("static:b")])
+    second.write("static:b", 18550, Quote(FixedPx.from_int(3)))
+    entry = board.read("static:b")
+    assert entry.height == 18550
+    assert entry.quote.price == FixedPx.from_int(3)
+
+
+def test_waits_for_publisher_to_reach_height(tmpdir):
+    path = str(tmpdir.join("board"))
+    provider = StaticFeed("static:a")
+    market_info = provider.market_info()
+    market_info["feed"] = direct_feed()
+    publisher = BoardPublisher(path, [provider])
+    # Published a block ago, older than any fixed age would allow
+    publisher.write(
+        "static:a",
+        18549,
+        Quote(FixedPx.from_int(2)),
+        time.time() - 6,
+    )
+    board = SharedPriceBoard(path, wait=0.5, poll_interval=0.01)
+    board.new_height(18549)
+    loop = asyncio.get_event_loop()
+    assert loop.run_until_complete(board.price(market_info)) == \
+        FixedPx.from_int(2)
+
+    # The voter saw 18550 before the publisher did
+    board.new_height(18550)
+
+    async def publish_later():
+        await asyncio.sleep(0.1)
+        publisher.write("static:a", 18550, Quote(FixedPx.from_int(3)))
+
+    px, _ = loop.run_until_complete(asyncio.gather(
+        board.price(market_info),
+        publish_later(),
+    ))
+    assert px == FixedPx.from_int(3)
+
+    # Publisher stuck, fetched directly after the wait
+    board.new_height(18551)
+    started = time.time()
+    assert loop.run_until_complete(board.price(market_info)) == "1.0"
+    assert time.time() - started >= 0.5
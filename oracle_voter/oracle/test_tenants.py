@@ -0,0 +1,138 @@
+import asyncio
+import pytest
+import simplejson as json
+from oracle_voter.chain.mocks.fixture_utils import mock_block_data
+from oracle_voter.oracle.tenants import (
+    PriceBoard,
+    SharedLCDNode,
+    BlockTracker,
+    load_config,
+)
+
+
+class CountingFeed:
+
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0)
+        return "300.0"
+
+
+class CountingNode:
+
+    def __init__(self, height=18549):
+        self.height = height
+        self.calls = dict()
+
+    def count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    async def get_latest_block(self):
+        self.count("get_latest_block")
+        return mock_block_data(self.height, "AA", "BB")
+
+    async def get_oracle_rates(self):
+        self.count("get_oracle_rates")
+        return {"result": []}
+
+    async def get_account(self, account):
+        self.count("get_account")
+        return {"result": account}
+
+
+class HeightRecorder:
+
+    def __init__(self, validator_addr, fail=False):
+        self.validator_addr = validator_addr
+        self.heights = list()
+        self.fail = fail
+
+    async def on_height(self, height, polled_at=None):
+        self.heights.append(height)
+        if self.fail:
+            raise ValueError("Broken tenant")
+
+
+def test_price_board_fetches_once_per_height():
+    feed = CountingFeed()
+    market_info = {"feed": feed, "weight": 100}
+    board = PriceBoard()
+    board.new_height(1)
+    loop = asyncio.get_event_loop()
+    prices = loop.run_until_complete(asyncio.gather(
+        board.price(market_info),
+        board.price(market_info),
+        board.price(market_info),
+    ))
+    assert prices == ["300.0", "300.0", "300.0"]
+    assert feed.calls == 1
+    board.new_height(2)
+    loop.run_until_complete(board.price(market_info))
+    assert feed.calls == 2
+
+
+def test_shared_lcd_node_memoizes_chain_reads():
+    node = CountingNode()
+    shared = SharedLCDNode(node)
+    shared.new_height(1)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(asyncio.gather(
+        shared.get_oracle_rates(),
+        shared.get_oracle_rates(),
+        shared.get_account("terra1a"),
+        shared.get_account("terra1b"),
+    ))
+    assert node.calls["get_oracle_rates"] == 1
+    assert node.calls["get_account"] == 2
+
+
+def test_block_tracker_fans_out_heights():
+    node = CountingNode()
+    shared = SharedLCDNode(node)
+    oracles = [
+        HeightRecorder("terravaloper1a"),
+        HeightRecorder("terravaloper1b", fail=True),
+        HeightRecorder("terravaloper1c"),
+    ]
+    tracker = BlockTracker(shared, oracles, shared=(shared,))
+    loop = asyncio.get_event_loop()
+    assert loop.run_until_complete(tracker.poll()) is True
+    # Same height is not dispatched twice
+    assert loop.run_until_complete(tracker.poll()) is False
+    node.height = 18550
+    loop.run_until_complete(tracker.poll())
+    assert [oracle.heights for oracle in oracles] == [[18549, 18550]] * 3
+    assert shared.height == 18550
+    assert node.calls["get_latest_block"] == 3
+
+
+def test_load_config(tmpdir, monkeypatch):
+    monkeypatch.setenv("FEEDER_B_PASSWORD", "secret")
+    config = tmpdir.join("tenants.json")
+    config.write(json.dumps({
+        "chain_id": "soju-0013",
+        "validators": [{
+            "validator": "terravaloper1a",
+            "password": "12345678",
+            "home": "/tmp/a",
+        }, {
+            "validator": "terravaloper1b",
+            "wallet": "feeder_b",
+            "password_env": "FEEDER_B_PASSWORD",
+        }],
+    }))
+    result = load_config(str(config))
+    first, second = result["validators"]
+    assert first["wallet"] == "feeder"
+    assert second["password"] == "secret"
+    assert second["home"].endswith(".terracli")
+
+
+def test_load_config_requires_password(tmpdir):
+    config = tmpdir.join("tenants.json")
+    config.write(json.dumps({"validators": [{"validator": "terravaloper1a"}]}))
+    with pytest.raises(ValueError):
+        load_config(str(config))
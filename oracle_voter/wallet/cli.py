@@ -2,17 +2,29 @@ import subprocess
 import os
 import simplejson as json
 from decimal import Decimal, Context, localcontext
+from oracle_voter.common.metrics import registry
 
 
 MICRO_VALUE = Decimal("10.0000000") ** 6
 MICRO_UNIT = Decimal("10.0") ** -6
 MICRO_VAL = MICRO_VALUE.quantize(MICRO_UNIT, context=Context(prec=40))
 
+SIGN_SECONDS = registry.histogram(
+    "wallet_sign_seconds",
+    "terracli offline signing time",
+)
+SEQUENCE_RESYNCS = registry.counter(
+    "wallet_sequence_resyncs_total",
+    "Times the chain account sequence was ahead of the local one",
+)
+
 
 class CLIWallet:
     account_addr = None
     account_num = 0
     account_seq = 0
+    # Account number and sequence read from the chain at least once
+    synced = False
 
     def __init__(
         self,
@@ -21,6 +33,7 @@ class CLIWallet:
         account_addr,
         lcd_node={},
         home_dir=None,
+        identity_cache=None,
     ):
         self.name = name
         self.password = password
@@ -31,6 +44,29 @@ class CLIWallet:
         # If no home directory is given, default to terracli default
         self.home_dir = home_dir or os.path.expanduser("~/.terracli")
         self.account_balance = Decimal("0.0")
+        self.identity_cache = identity_cache
+
+    @classmethod
+    def from_cache(cls, name, password, lcd_node, home_dir, identity_cache):
+        # Skips terracli when the address is already known
+        home_dir = home_dir or os.path.expanduser("~/.terracli")
+        identity = identity_cache.get(name, home_dir)
+        if identity is None:
+            account_addr = cls.get_addr(name, home_dir)
+            identity_cache.put(name, home_dir, account_addr)
+        else:
+            account_addr = identity["account_addr"]
+        wallet = cls(
+            name,
+            password,
+            account_addr,
+            lcd_node=lcd_node,
+            home_dir=home_dir,
+            identity_cache=identity_cache,
+        )
+        if identity is not None and identity["account_num"] is not None:
+            wallet.account_num = identity["account_num"]
+        return wallet
 
     @staticmethod
     def get_addr(name, home_dir):
@@ -48,6 +84,10 @@ class CLIWallet:
 
     async def sync_state(self):
         account_raw = await self.lcd_node.get_account(self.account_addr)
+        if account_raw is None:
+            # Node unreachable or request shed, keep the local state
+            print(f"Unable to sync wallet {self.name}")
+            return
         # Set Account Num
         self.account_num = account_raw["result"]["value"]["account_number"]
         if int(self.account_num) <= 0:
@@ -71,10 +111,20 @@ class CLIWallet:
             )
 
         # Set Account Seq
+        self.synced = True
         if new_seq > self.account_seq:
+            if self.account_seq > 0:
+                SEQUENCE_RESYNCS.inc()
             self.account_seq = new_seq
         # Set Balance
         self.account_balance = balance
+        if self.identity_cache is not None:
+            self.identity_cache.put(
+                self.name,
+                self.home_dir,
+                self.account_addr,
+                self.account_num,
+            )
         """ Print Summary """
         print(f"""Account: {self.name}
 Balance: {self.account_balance} LUNA
@@ -89,6 +139,15 @@ Sequence: {self.account_seq}
         account_number="-1",
         sequence="-1",
     ):
+        with SIGN_SECONDS.time():
+            return self.terracli_sign(
+                payload,
+                chain_id,
+                account_number,
+                sequence,
+            )
+
+    def terracli_sign(self, payload, chain_id, account_number, sequence):
         # Write out the payload as JSON into a temporary file
         with open("cli-to-sign.json", "w") as target:
             target.write(json.dumps(payload))
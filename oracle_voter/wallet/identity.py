@@ -0,0 +1,75 @@
+"""
+Feeder identity cache
+
+The feeder address and account number never change for a key, so they
+are cached on disk by wallet name and terracli home directory. Startup
+then skips the `terracli keys show` subprocess. Entries are dropped when
+the keyring directory changes, e.g. after a key was recreated.
+"""
+import os
+
+import simplejson as json
+
+
+def default_cache_path():
+    cache_dir = os.environ.get("XDG_CACHE_HOME", None) or \
+        os.path.expanduser("~/.cache")
+    return os.path.join(cache_dir, "oracle_voter", "identity.json")
+
+
+def keys_mtime(home_dir):
+    try:
+        return os.stat(os.path.join(home_dir, "keys")).st_mtime
+    except OSError:
+        return None
+
+
+class IdentityCache:
+
+    def __init__(self, path=None):
+        self.path = path or default_cache_path()
+        self.identities = None
+
+    def key(self, name, home_dir):
+        return f"{name}@{os.path.abspath(home_dir)}"
+
+    def load(self):
+        if self.identities is None:
+            try:
+                with open(self.path, "r") as source:
+                    self.identities = json.loads(source.read())
+            except (OSError, json.JSONDecodeError):
+                self.identities = dict()
+        return self.identities
+
+    def get(self, name, home_dir):
+        identity = self.load().get(self.key(name, home_dir), None)
+        if identity is None:
+            return None
+        if identity.get("keys_mtime", None) != keys_mtime(home_dir):
+            return None
+        return identity
+
+    def put(self, name, home_dir, account_addr, account_num=None):
+        identity = {
+            "account_addr": account_addr,
+            "account_num": account_num,
+            "keys_mtime": keys_mtime(home_dir),
+        }
+        key = self.key(name, home_dir)
+        identities = self.load()
+        if identities.get(key, None) == identity:
+            return False
+        identities[key] = identity
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as target:
+                target.write(json.dumps(identities, indent=2))
+            os.replace(tmp_path, self.path)
+        except OSError as err:
+            # Only startup time is lost without the cache
+            print(f"Unable to write identity cache {self.path}")
+            print(err)
+            return False
+        return True
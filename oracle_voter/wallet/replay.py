@@ -0,0 +1,34 @@
+import copy
+
+
+class ReplayWallet:
+    """Stands in for CLIWallet when replaying, txs are left unsigned"""
+
+    # The sequence is only ever moved by the Oracle
+    synced = True
+
+    def __init__(self, account_addr, account_num=0, account_seq=0):
+        self.account_addr = account_addr
+        self.account_num = account_num
+        self.account_seq = account_seq
+        self.signed = 0
+
+    async def sync_state(self):
+        return None
+
+    def offline_sign(
+        self,
+        payload,
+        chain_id="-1",
+        account_number="-1",
+        sequence="-1",
+    ):
+        self.signed += 1
+        signed_tx = copy.deepcopy(payload)
+        signed_tx["value"]["signatures"] = [{
+            "pub_key": None,
+            "signature": "",
+            "account_number": str(account_number),
+            "sequence": str(sequence),
+        }]
+        return signed_tx
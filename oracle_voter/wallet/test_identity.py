@@ -0,0 +1,68 @@
+import asyncio
+import os
+from unittest.mock import patch
+
+from oracle_voter.chain.mocks.fixture_18549 import account_info
+from oracle_voter.wallet.cli import CLIWallet
+from oracle_voter.wallet.identity import IdentityCache
+
+acc_addr = "terra1kk2gcmy6d444jpsg3hyf84lxd3dx0naud0236f"
+
+
+def test_put_and_get(tmpdir):
+    home_dir = str(tmpdir.mkdir("terracli"))
+    path = str(tmpdir.join("cache", "identity.json"))
+    cache = IdentityCache(path)
+    assert cache.get("feeder", home_dir) is None
+    assert cache.put("feeder", home_dir, acc_addr, "52") is True
+    assert cache.put("feeder", home_dir, acc_addr, "52") is False
+
+    identity = IdentityCache(path).get("feeder", home_dir)
+    assert identity["account_addr"] == acc_addr
+    assert identity["account_num"] == "52"
+    assert IdentityCache(path).get("feeder", str(tmpdir)) is None
+
+
+def test_recreated_key_is_not_used(tmpdir):
+    home_dir = tmpdir.mkdir("terracli")
+    keys_dir = home_dir.mkdir("keys")
+    cache = IdentityCache(str(tmpdir.join("identity.json")))
+    cache.put("feeder", str(home_dir), acc_addr)
+    assert cache.get("feeder", str(home_dir)) is not None
+    os.utime(str(keys_dir), (0, 0))
+    assert cache.get("feeder", str(home_dir)) is None
+
+
+@patch('subprocess.check_output', autospec=True)
+def test_from_cache_skips_terracli(mock, tmpdir):
+    mock.return_value = bytes(acc_addr, "utf-8")
+    home_dir = str(tmpdir.mkdir("terracli"))
+    cache = IdentityCache(str(tmpdir.join("identity.json")))
+    wallet = CLIWallet.from_cache("feeder", "", None, home_dir, cache)
+    assert wallet.account_addr == acc_addr
+    assert mock.call_count == 1
+
+    wallet = CLIWallet.from_cache("feeder", "", None, home_dir, cache)
+    assert wallet.account_addr == acc_addr
+    assert mock.call_count == 1
+
+
+@patch('oracle_voter.chain.core.LCDNode', autospec=True)
+def test_sync_state_caches_account_num(LCDNodeMock, tmpdir):
+    LCDNodeMock.get_account.return_value = account_info(acc_addr)
+    home_dir = str(tmpdir.mkdir("terracli"))
+    cache = IdentityCache(str(tmpdir.join("identity.json")))
+    cache.put("feeder", home_dir, acc_addr)
+    wallet = CLIWallet.from_cache("feeder", "", LCDNodeMock, home_dir, cache)
+    assert wallet.account_num == 0
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(wallet.sync_state())
+
+    wallet = CLIWallet.from_cache(
+        "feeder",
+        "",
+        LCDNodeMock,
+        home_dir,
+        IdentityCache(cache.path),
+    )
+    assert wallet.account_num == "52"